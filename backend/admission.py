@@ -0,0 +1,100 @@
+"""
+Admission control for the database lanes.
+
+Each lane admits a bounded number of requests at a time. Requests over the
+limit wait in a short queue. A request is shed with a fast 503 and a
+Retry-After hint when the queue is already full, or when the predicted wait
+(queue length times the lane's recent service time, spread over its
+concurrency) exceeds the lane's deadline. A request that waits past the
+deadline is shed too. Under a burst the service degrades into quick
+rejections that clients can retry, instead of every request queueing for
+the full pool timeout.
+
+The slots are asyncio primitives, so shedding relies on the event loop
+staying responsive: database handlers run in the threadpool, and the
+threadpool is sized to hold every request the lanes admit.
+"""
+
+import asyncio
+import math
+from typing import Any, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Raised when a lane sheds a request"""
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"{lane} lane overloaded ({reason})")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limit plus bounded wait queue for one lane"""
+
+    def __init__(self, name: str, max_in_flight: int = 10, max_queue: int = 50, deadline: float = 2.0):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted_total = 0
+        self.shed_total = 0
+        # Exponentially weighted mean time a request holds its slot
+        self.service_seconds = 0.05
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def predicted_wait(self) -> float:
+        """Expected queueing delay for a request arriving now"""
+        return (self.queued + 1) * self.service_seconds / self.max_in_flight
+
+    def _shed(self, reason: str) -> Overloaded:
+        self.shed_total += 1
+        return Overloaded(self.name, reason, max(1, math.ceil(self.predicted_wait())))
+
+    async def acquire(self):
+        """Take a slot, or raise Overloaded if the lane is saturated"""
+        slots = self._slots()
+        if self.in_flight >= self.max_in_flight:
+            if self.queued >= self.max_queue:
+                raise self._shed("queue_full")
+            if self.predicted_wait() > self.deadline:
+                raise self._shed("predicted_wait")
+        self.queued += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise self._shed("deadline")
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        self.admitted_total += 1
+
+    def release(self, held_seconds: float):
+        """Give the slot back and fold its hold time into the service estimate"""
+        self.in_flight -= 1
+        self.service_seconds += 0.1 * (held_seconds - self.service_seconds)
+        self._slots().release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the lane's admission state"""
+        return {
+            "name": self.name,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "deadline_seconds": self.deadline,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "service_seconds": round(self.service_seconds, 4),
+            "admitted_total": self.admitted_total,
+            "shed_total": self.shed_total,
+        }
+
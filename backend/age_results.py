@@ -0,0 +1,165 @@
+"""
+Option breakdowns by the voter's year_of_birth, for
+/api/results/{question_code}/by_age and /api/blocks/{block_code}/results/by_age.
+
+While vote counters are kept (VOTE_COUNTER_SHARDS > 0) the split is read
+from vote_counters, which carries year_of_birth as part of its key, so an
+age breakdown costs the same as a counters results lookup. Otherwise the
+raw response tables are joined to users.
+
+Voters whose year_of_birth is unknown (users created lazily by a vote) are
+reported under year_of_birth null.
+
+RollupBuilder is the offline side: rebuild_vote_counters.py streams the raw
+votes through it in batches and it sums them per counter key with NumPy.
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:  # rebuild_vote_counters.py falls back to vote_counters.rebuild_sql
+    numpy = None
+
+import vote_counters
+
+UNKNOWN_YEAR = 0
+
+COUNTERS_SQL = """
+    SELECT question_code, year_of_birth, option_select,
+           SUM(responses)::bigint AS responses,
+           SUM(checkbox_weight) AS checkbox_weight,
+           SUM(other_responses)::bigint AS other_responses
+    FROM vote_counters
+    WHERE question_code = ANY(%s)
+    GROUP BY question_code, year_of_birth, option_select
+"""
+
+RAW_SQL = """
+    SELECT s.question_code, COALESCE(u.year_of_birth, 0) AS year_of_birth, s.option_select,
+           SUM(s.responses)::bigint AS responses,
+           SUM(s.checkbox_weight) AS checkbox_weight,
+           SUM(s.other_responses)::bigint AS other_responses
+    FROM (
+        SELECT question_code, option_select, user_uuid, 1 AS responses, 0::float8 AS checkbox_weight, 0 AS other_responses
+        FROM responses WHERE question_code = ANY(%s)
+        UNION ALL
+        SELECT question_code, option_select, user_uuid, 0, weight, 0
+        FROM checkbox_responses WHERE question_code = ANY(%s)
+        UNION ALL
+        SELECT question_code, 'OTHER', user_uuid, 0, 0, 1
+        FROM other_responses WHERE question_code = ANY(%s)
+    ) s
+    LEFT JOIN users u ON u.user_uuid = s.user_uuid
+    GROUP BY s.question_code, COALESCE(u.year_of_birth, 0), s.option_select
+"""
+
+
+def query(use_counters: bool, question_codes: List[str]) -> Tuple[str, Tuple]:
+    """The by-age statement and its parameters for a list of questions"""
+    if use_counters:
+        return COUNTERS_SQL, (question_codes,)
+    return RAW_SQL, (question_codes, question_codes, question_codes)
+
+
+def read_by_age(question_codes: Iterable[str], rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Per question, /api/results rows for each year_of_birth (ascending, unknown last)"""
+    years: Dict[str, Dict[int, List[Dict[str, Any]]]] = {code: {} for code in question_codes}
+    for row in rows:
+        years[row['question_code']].setdefault(row['year_of_birth'], []).append(row)
+
+    by_age = {}
+    for code, groups in years.items():
+        by_age[code] = []
+        for year in sorted(groups, key=lambda y: (y == UNKNOWN_YEAR, y)):
+            results = vote_counters.merge_counts(groups[year])
+            if results:
+                by_age[code].append({
+                    "year_of_birth": None if year == UNKNOWN_YEAR else year,
+                    "results": results,
+                })
+    return by_age
+
+
+# One source table's votes as counter contributions, in id batches up to a
+# high-water mark; the response tables and the compact storage views all have
+# an id column
+BATCH_SQL = {
+    "responses": """
+        SELECT r.id, r.question_code, r.option_select, COALESCE(u.year_of_birth, 0), 1, 0::float8, 0
+        FROM responses r LEFT JOIN users u ON u.user_uuid = r.user_uuid
+        WHERE r.id > %s AND r.id <= %s ORDER BY r.id LIMIT %s
+    """,
+    "checkbox_responses": """
+        SELECT r.id, r.question_code, r.option_select, COALESCE(u.year_of_birth, 0), 0, r.weight::float8, 0
+        FROM checkbox_responses r LEFT JOIN users u ON u.user_uuid = r.user_uuid
+        WHERE r.id > %s AND r.id <= %s ORDER BY r.id LIMIT %s
+    """,
+    "other_responses": """
+        SELECT r.id, r.question_code, 'OTHER', COALESCE(u.year_of_birth, 0), 0, 0::float8, 1
+        FROM other_responses r LEFT JOIN users u ON u.user_uuid = r.user_uuid
+        WHERE r.id > %s AND r.id <= %s ORDER BY r.id LIMIT %s
+    """,
+}
+
+
+class RollupBuilder:
+    """Sum counter contributions per (question_code, option_select, year_of_birth) with NumPy
+
+    Each batch is reduced on its own (np.unique + np.bincount over an
+    integer key) and the partial sums are reduced once more in rows(), so
+    memory stays proportional to the number of counter keys, not votes.
+    """
+
+    def __init__(self):
+        if numpy is None:
+            raise RuntimeError("numpy is required for RollupBuilder")
+        self.pairs: Dict[Tuple[str, str], int] = {}
+        self.partials: List[Tuple[Any, Any]] = []
+
+    def add(self, batch: Sequence[Sequence[Any]]):
+        """Add (id, question_code, option_select, year_of_birth, responses, checkbox_weight, other_responses) rows"""
+        if not batch:
+            return
+        pair_ids = numpy.fromiter(
+            (self.pairs.setdefault((row[1], row[2]), len(self.pairs)) for row in batch),
+            dtype=numpy.int64, count=len(batch),
+        )
+        years = numpy.fromiter((row[3] for row in batch), dtype=numpy.int64, count=len(batch))
+        values = numpy.array([row[4:7] for row in batch], dtype=numpy.float64)
+        self.partials.append(self._reduce(pair_ids * 65536 + years, values))
+
+    @staticmethod
+    def _reduce(keys, values):
+        unique, inverse = numpy.unique(keys, return_inverse=True)
+        sums = numpy.column_stack([
+            numpy.bincount(inverse, weights=values[:, column], minlength=len(unique))
+            for column in range(values.shape[1])
+        ])
+        return unique, sums
+
+    def rows(self) -> List[Tuple[str, str, int, int, float, int]]:
+        """(question_code, option_select, year_of_birth, responses, checkbox_weight, other_responses) totals"""
+        if not self.partials:
+            return []
+        keys, sums = self._reduce(
+            numpy.concatenate([keys for keys, _ in self.partials]),
+            numpy.concatenate([sums for _, sums in self.partials]),
+        )
+        pairs = list(self.pairs)
+        totals = []
+        for key, (responses, checkbox_weight, other_responses) in zip(keys.tolist(), sums.tolist()):
+            question_code, option_select = pairs[key // 65536]
+            totals.append((question_code, option_select, key % 65536,
+                           int(responses), checkbox_weight, int(other_responses)))
+        return totals
+
+
+def insert_rollup_sql(rows: int, table: str = "vote_counters") -> str:
+    """Insert `rows` RollupBuilder totals into a counters table's compacted shard"""
+    values = ", ".join([f"(%s, %s, %s, {vote_counters.COMPACTED_SHARD}, %s, %s, %s)"] * rows)
+    return f"""
+        INSERT INTO {table} (question_code, option_select, year_of_birth, shard,
+                             responses, checkbox_weight, other_responses)
+        VALUES {values}
+    """
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Backfill user_progress bitmaps from the existing responses tables.
+
+Safe to run while the API is live: each batch of users is locked, merged
+with any bits the API has already set, and written back in one transaction.
+A bitmap the API creates after the batch was locked is never overwritten: the
+insert backs off, and that row is then locked and merged like the others.
+Questions are numbered by question_bits; codes the API has not assigned a
+bit yet (the catalog was never loaded since they appeared) get one here.
+Uses the same DB_HOST / DB_NAME / DB_USER / DB_PASSWORD variables as the API.
+
+Usage:
+    python backend/backfill_user_progress.py [batch_size]
+"""
+
+import sys
+import time
+
+from db_config import connect
+import progress
+
+ANSWERED_QUERY = """
+    SELECT a.user_uuid, b.bit
+    FROM (
+        SELECT user_uuid, question_code FROM responses WHERE user_uuid = ANY(%s)
+        UNION
+        SELECT user_uuid, question_code FROM checkbox_responses WHERE user_uuid = ANY(%s)
+        UNION
+        SELECT user_uuid, question_code FROM other_responses WHERE user_uuid = ANY(%s)
+    ) a
+    JOIN question_bits b ON b.question_code = a.question_code
+"""
+
+LOCK_QUERY = "SELECT user_uuid, answered FROM user_progress WHERE user_uuid = ANY(%s) FOR UPDATE"
+
+# Only creates missing bitmaps; a row that appeared concurrently is left to the merge path
+INSERT_QUERY = """
+    INSERT INTO user_progress (user_uuid, answered, updated_at)
+    VALUES (%s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_uuid) DO NOTHING
+    RETURNING user_uuid
+"""
+
+UPDATE_QUERY = "UPDATE user_progress SET answered = %s, updated_at = CURRENT_TIMESTAMP WHERE user_uuid = %s"
+
+def backfill_user_progress(batch_size=1000):
+    """Rebuild every user's progress bitmap, batch by batch"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+
+    cursor.execute(progress.ASSIGN_BITS_SQL)
+    conn.commit()
+
+    started = time.time()
+    last_id = 0
+    total_users = 0
+    while True:
+        cursor.execute(
+            "SELECT id, user_uuid FROM users WHERE id > %s ORDER BY id LIMIT %s",
+            (last_id, batch_size),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        user_uuids = [row[1] for row in rows]
+
+        cursor.execute(ANSWERED_QUERY, (user_uuids, user_uuids, user_uuids))
+        answered = {}
+        for user_uuid, bit in cursor.fetchall():
+            answered.setdefault(user_uuid, []).append(bit)
+
+        # Lock existing bitmaps so bits set by live votes are merged, not lost
+        cursor.execute(LOCK_QUERY, (user_uuids,))
+        existing = {user_uuid: bytes(bitmap) for user_uuid, bitmap in cursor.fetchall()}
+
+        for user_uuid, bits in answered.items():
+            bitmap = progress.encode(bits)
+            if user_uuid not in existing:
+                cursor.execute(INSERT_QUERY, (user_uuid, bitmap))
+                if cursor.fetchall():
+                    continue
+                # The API created the row since the lock was taken; merge into it instead
+                cursor.execute(LOCK_QUERY, ([user_uuid],))
+                existing.update((row_uuid, bytes(row_bitmap)) for row_uuid, row_bitmap in cursor.fetchall())
+            cursor.execute(UPDATE_QUERY, (progress.merge(bitmap, existing[user_uuid]), user_uuid))
+        conn.commit()
+
+        total_users += len(user_uuids)
+        last_id = rows[-1][0]
+        print(f"📁 {total_users} users processed ({len(answered)} with answers in this batch)")
+
+    conn.close()
+    print(f"🎉 Backfilled progress for {total_users} users in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    backfill_user_progress(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Backfill voter_sketches from the existing response tables.
+
+Safe to run while the API is live, and to re-run: sketches only ever take
+the register-wise maximum, so a vote the API has already counted (or an
+earlier run added) changes nothing. Each batch of votes is merged into the
+stored sketches under the same advisory lock the API flushes with.
+Uses the same DB_HOST / DB_NAME / DB_USER / DB_PASSWORD variables as the API.
+
+Usage:
+    python backend/backfill_voter_sketches.py [batch_size]
+"""
+
+import sys
+import time
+
+from db_config import connect
+import voter_sketches
+
+# The response tables and the compact storage views all carry these columns
+VOTES_QUERY = """
+    SELECT id, user_uuid::text, question_code, category_id, block_number, created_at::date
+    FROM {table} WHERE id > %s ORDER BY id LIMIT %s
+"""
+
+TABLES = ("responses", "checkbox_responses", "other_responses")
+
+def backfill_voter_sketches(batch_size=100000):
+    """Add every stored vote to its question, block and category sketches"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+
+    started = time.time()
+    for table in TABLES:
+        last_id = 0
+        total_votes = 0
+        while True:
+            cursor.execute(VOTES_QUERY.format(table=table), (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            sketches = voter_sketches.VoterSketches()
+            for _, user_uuid, question_code, category_id, block_number, day in rows:
+                question = {'question_code': question_code, 'category_id': category_id, 'block_number': block_number}
+                sketches.add(user_uuid, question, day)
+            written = voter_sketches.flush(conn, sketches.take())
+
+            total_votes += len(rows)
+            last_id = rows[-1][0]
+            print(f"📁 {table}: {total_votes} votes processed ({written} sketches merged in this batch)")
+
+    conn.close()
+    print(f"🎉 Backfilled voter sketches in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    backfill_voter_sketches(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,117 @@
+"""
+In-process catalog state for the My World My Say API.
+
+The catalog (categories, blocks, questions, options and soundtracks) only
+changes when /api/setup or /api/import_data runs, so anything derived from it
+is keyed on a catalog version number. Bumping the version invalidates every
+cache built from the previous catalog.
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_lock = threading.Lock()
+_version = 1
+
+
+def get_version() -> int:
+    """Return the current catalog version"""
+    return _version
+
+
+def bump_version() -> int:
+    """Mark the catalog as changed and return the new version"""
+    global _version
+    with _lock:
+        _version += 1
+        return _version
+
+
+_build_lock = threading.Lock()
+_built: Dict[str, Tuple[int, Any]] = {}
+
+
+def load(name: str, builder: Callable[[], Any]) -> Any:
+    """Return the object built by builder for the current catalog version
+
+    Each named object is built once per catalog version and shared by all
+    requests until the catalog changes again.
+    """
+    version = _version
+    entry = _built.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    with _build_lock:
+        entry = _built.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = builder()
+        _built[name] = (version, value)
+        return value
+
+
+def split_tags(value: Optional[str]) -> List[str]:
+    """Split a comma separated tag column such as playlist_tag or mood_tag"""
+    if not value:
+        return []
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+class SoundtrackIndex:
+    """Inverted playlist and mood index over the soundtracks table"""
+
+    def __init__(self, songs: List[Dict[str, Any]]):
+        self.songs = songs
+        self.by_playlist: Dict[str, List[int]] = {}
+        self.by_mood: Dict[str, List[int]] = {}
+        for position, song in enumerate(songs):
+            for playlist in split_tags(song.get("playlist_tag")):
+                postings = self.by_playlist.setdefault(playlist, [])
+                if not postings or postings[-1] != position:
+                    postings.append(position)
+            for mood in split_tags(song.get("mood_tag")):
+                postings = self.by_mood.setdefault(mood.lower(), [])
+                if not postings or postings[-1] != position:
+                    postings.append(position)
+        self.playlists = ["All Songs"] + sorted(self.by_playlist)
+
+    def filter(self, playlist: Optional[str] = None, mood: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return songs tagged with playlist and/or mood, in catalog order"""
+        positions = None
+        if playlist and playlist != "All Songs":
+            positions = set(self.by_playlist.get(playlist, ()))
+        if mood:
+            mood_positions = set(self.by_mood.get(mood.strip().lower(), ()))
+            positions = mood_positions if positions is None else positions & mood_positions
+        if positions is None:
+            return self.songs
+        return [self.songs[position] for position in sorted(positions)]
+
+
+class QuestionIndex:
+    """Questions and their valid options, keyed for vote validation
+
+    Each question row carries the denormalized fields written alongside a
+    vote (question_text, category_name, block_number, ...) so the vote path
+    never has to look them up in the database.
+    """
+
+    def __init__(self, questions: List[Dict[str, Any]], options: List[Dict[str, Any]]):
+        self.questions: Dict[str, Dict[str, Any]] = {q["question_code"]: q for q in questions}
+        # Questions grouped by block code ("category_block"), in answering order
+        self.blocks: Dict[str, List[Dict[str, Any]]] = {}
+        for question in sorted(questions, key=lambda q: (q["category_id"], q["block_number"], q["question_number"])):
+            block_code = f"{question['category_id']}_{question['block_number']}"
+            self.blocks.setdefault(block_code, []).append(question)
+        self.options: Dict[str, Dict[str, Dict[str, Any]]] = {code: {} for code in self.questions}
+        for option in options:
+            if option["question_code"] in self.options:
+                self.options[option["question_code"]][option["option_select"]] = option
+
+    def question(self, question_code: str) -> Optional[Dict[str, Any]]:
+        """Return the question row for a code, or None if it is not in the catalog"""
+        return self.questions.get(question_code)
+
+    def option(self, question_code: str, option_select: str) -> Optional[Dict[str, Any]]:
+        """Return the option row for a question/option pair, or None if it is not valid"""
+        return self.options.get(question_code, {}).get(option_select)
@@ -0,0 +1,227 @@
+"""
+Compact storage mode (STORAGE_MODE=compact) for the response tables.
+
+The wide tables repeat question_text, category_name, option_text and more
+on every vote, several hundred bytes a row that every aggregate scan and
+index has to wade through. In compact mode, votes go to narrow fact tables:
+
+- response_facts: single-choice votes
+- checkbox_response_facts: checkbox votes, with their weight
+- other_response_facts: free-text answers
+
+Facts carry integer ids into response_questions and response_options, a
+smallint block number and a timestamp. The dimension tables are owned by
+the results side, so re-importing the catalog through /api/setup (which
+renumbers the setup tables) cannot orphan old votes.
+
+Views named responses, checkbox_responses and other_responses reproduce
+the wide shape for analysts and for the read queries in this directory.
+They show the latest text recorded for each question and option. The
+columns the API never wrote (option_id, setup_question_code,
+setup_option_id) read as NULL. migrate_compact_storage.py moves existing
+data across and swaps the views in.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+STORAGE_WIDE = "wide"
+STORAGE_COMPACT = "compact"
+
+UPSERT_QUESTION_SQL = """
+    INSERT INTO response_questions (question_code, question_text, question_number, category_id, category_name, block_number)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (question_code) DO UPDATE SET
+        question_text = EXCLUDED.question_text,
+        question_number = EXCLUDED.question_number,
+        category_id = EXCLUDED.category_id,
+        category_name = EXCLUDED.category_name,
+        block_number = EXCLUDED.block_number
+    RETURNING id
+"""
+
+UPSERT_OPTION_SQL = """
+    INSERT INTO response_options (question_id, option_select, option_code, option_text)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (question_id, option_select) DO UPDATE SET
+        option_code = EXCLUDED.option_code,
+        option_text = EXCLUDED.option_text
+    RETURNING id
+"""
+
+INSERT_VOTE_SQL = """
+    INSERT INTO response_facts (user_uuid, question_id, option_id, block_number, created_at)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+INSERT_OTHER_SQL = """
+    INSERT INTO other_response_facts (user_uuid, question_id, block_number, other_text, created_at)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+def insert_checkbox_sql(rows: int) -> str:
+    """Insert `rows` (user_uuid, question_id, option_id, block_number, weight, other_text, created_at) tuples"""
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * rows)
+    return f"""
+        INSERT INTO checkbox_response_facts (user_uuid, question_id, option_id, block_number, weight, other_text, created_at)
+        VALUES {values}
+    """
+
+
+class StorageKeys:
+    """Dimension ids for the questions and options this instance has written
+
+    A miss upserts the dimension row inside the caller's transaction. The id
+    is only remembered once that transaction commits, so a rolled-back vote
+    cannot leave an id behind that was never written.
+    """
+
+    def __init__(self):
+        self.questions: Dict[str, int] = {}
+        self.options: Dict[Tuple[int, str], int] = {}
+
+    def question_id(self, db, question: Dict[str, Any]) -> int:
+        code = question['question_code']
+        question_id = self.questions.get(code)
+        if question_id is None:
+            question_id = db.execute(UPSERT_QUESTION_SQL, (
+                code, question['question_text'], question['question_number'],
+                question['category_id'], question['category_name'], question['block_number'],
+            ))[0]['id']
+            db.on_commit.append(lambda: self.questions.__setitem__(code, question_id))
+        return question_id
+
+    def option_id(self, db, question_id: int, option_select: str, option_code: str, option_text: str) -> int:
+        key = (question_id, option_select)
+        option_id = self.options.get(key)
+        if option_id is None:
+            option_id = db.execute(UPSERT_OPTION_SQL, (question_id, option_select, option_code, option_text))[0]['id']
+            db.on_commit.append(lambda: self.options.__setitem__(key, option_id))
+        return option_id
+
+    def clear(self):
+        """Forget every id, so the next vote re-records changed catalog text"""
+        self.questions = {}
+        self.options = {}
+
+
+# Copy one id range of a wide table into the compact tables; the dimension
+# upserts keep the newest text in the range and never overwrite text the
+# API has already recorded
+COPY_QUESTIONS_SQL = """
+    INSERT INTO response_questions (question_code, question_text, question_number, category_id, category_name,
+                                    category_text, block_number)
+    SELECT DISTINCT ON (question_code) question_code, question_text, question_number, category_id, category_name,
+           category_text, block_number
+    FROM {table} WHERE id > %s AND id <= %s
+    ORDER BY question_code, id DESC
+    ON CONFLICT (question_code) DO NOTHING
+"""
+
+# Checkbox OTHER rows store the user's own text in option_text; the
+# dimension keeps the plain 'OTHER' and the fact keeps the text
+COPY_OPTIONS_SQL = """
+    INSERT INTO response_options (question_id, option_select, option_code, option_text)
+    SELECT DISTINCT ON (q.id, r.option_select) q.id, r.option_select,
+           CASE WHEN %s AND r.option_select = 'OTHER' THEN 'OTHER' ELSE r.option_code END,
+           CASE WHEN %s AND r.option_select = 'OTHER' THEN 'OTHER' ELSE r.option_text END
+    FROM {table} r JOIN response_questions q ON q.question_code = r.question_code
+    WHERE r.id > %s AND r.id <= %s
+    ORDER BY q.id, r.option_select, r.id DESC
+    ON CONFLICT (question_id, option_select) DO NOTHING
+"""
+
+COPY_FACTS_SQL = {
+    "responses": """
+        INSERT INTO response_facts (id, user_uuid, question_id, option_id, block_number, created_at)
+        SELECT r.id, r.user_uuid, q.id, o.id, r.block_number, r.created_at
+        FROM {table} r
+        JOIN response_questions q ON q.question_code = r.question_code
+        JOIN response_options o ON o.question_id = q.id AND o.option_select = r.option_select
+        WHERE r.id > %s AND r.id <= %s
+        ON CONFLICT (id) DO NOTHING
+    """,
+    "checkbox_responses": """
+        INSERT INTO checkbox_response_facts (id, user_uuid, question_id, option_id, block_number, weight, other_text,
+                                             created_at)
+        SELECT r.id, r.user_uuid, q.id, o.id, r.block_number, r.weight,
+               CASE WHEN r.option_select = 'OTHER' THEN NULLIF(r.option_text, 'OTHER') END, r.created_at
+        FROM {table} r
+        JOIN response_questions q ON q.question_code = r.question_code
+        JOIN response_options o ON o.question_id = q.id AND o.option_select = r.option_select
+        WHERE r.id > %s AND r.id <= %s
+        ON CONFLICT (id) DO NOTHING
+    """,
+    "other_responses": """
+        INSERT INTO other_response_facts (id, user_uuid, question_id, block_number, other_text, created_at)
+        SELECT r.id, r.user_uuid, q.id, r.block_number, r.other_text, r.created_at
+        FROM {table} r
+        JOIN response_questions q ON q.question_code = r.question_code
+        WHERE r.id > %s AND r.id <= %s
+        ON CONFLICT (id) DO NOTHING
+    """,
+}
+
+# Wide table -> fact table it is copied into
+FACT_TABLES = {
+    "responses": "response_facts",
+    "checkbox_responses": "checkbox_response_facts",
+    "other_responses": "other_response_facts",
+}
+
+VIEWS_SQL = {
+    "responses": """
+        CREATE VIEW responses AS
+        SELECT f.id, f.user_uuid,
+               q.question_code, q.question_text, q.question_number,
+               q.category_id, q.category_name, q.category_text,
+               NULL::integer AS option_id, o.option_select, o.option_code, o.option_text,
+               f.block_number::integer AS block_number, f.created_at,
+               NULL::varchar(50) AS setup_question_code, NULL::integer AS setup_option_id
+        FROM response_facts f
+        JOIN response_questions q ON q.id = f.question_id
+        JOIN response_options o ON o.id = f.option_id
+    """,
+    "checkbox_responses": """
+        CREATE VIEW checkbox_responses AS
+        SELECT f.id, f.user_uuid,
+               q.question_code, q.question_text, q.question_number,
+               q.category_id, q.category_name, q.category_text,
+               NULL::integer AS option_id, o.option_select, o.option_code,
+               COALESCE(f.other_text, o.option_text) AS option_text,
+               f.block_number::integer AS block_number, f.created_at, f.weight,
+               NULL::varchar(50) AS setup_question_code, NULL::integer AS setup_option_id
+        FROM checkbox_response_facts f
+        JOIN response_questions q ON q.id = f.question_id
+        JOIN response_options o ON o.id = f.option_id
+    """,
+    "other_responses": """
+        CREATE VIEW other_responses AS
+        SELECT f.id, f.user_uuid,
+               q.question_code, q.question_text, q.question_number,
+               q.category_id, q.category_name, q.category_text,
+               f.block_number::integer AS block_number, f.other_text, f.created_at,
+               NULL::varchar(50) AS setup_question_code
+        FROM other_response_facts f
+        JOIN response_questions q ON q.id = f.question_id
+    """,
+}
+
+
+def copy_range(cursor, table: str, source: str, low: int, high: int) -> int:
+    """Copy rows low < id <= high of one wide table (named `source`); returns facts written"""
+    cursor.execute(COPY_QUESTIONS_SQL.format(table=source), (low, high))
+    if table != "other_responses":
+        checkbox = table == "checkbox_responses"
+        cursor.execute(COPY_OPTIONS_SQL.format(table=source), (checkbox, checkbox, low, high))
+    cursor.execute(COPY_FACTS_SQL[table].format(table=source), (low, high))
+    return cursor.rowcount
+
+
+def relation_sizes(cursor, tables: List[str]) -> Dict[str, Optional[int]]:
+    """Total on-disk bytes (heap, indexes, TOAST) per table; None if it does not exist"""
+    sizes = {}
+    for table in tables:
+        cursor.execute("SELECT pg_total_relation_size(to_regclass(%s))", (table,))
+        sizes[table] = cursor.fetchone()[0]
+    return sizes
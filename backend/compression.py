@@ -0,0 +1,81 @@
+"""
+Content negotiation and compression helpers for cached response bodies.
+
+Bodies are compressed once when they are cached, so serving a compressed
+response is a dictionary lookup. Brotli is used when the package is
+installed; gzip is always available. Bodies smaller than the minimum size
+are served uncompressed because the framing overhead outweighs the savings.
+"""
+
+import gzip
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Preferred order when the client weighs several codings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: quality}"""
+    qualities: Dict[str, float] = {}
+    for part in header.split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[token.lower()] = quality
+    return qualities
+
+
+def negotiate(header: str, available) -> Optional[str]:
+    """Pick the best available coding for an Accept-Encoding header
+
+    Returns None when the identity representation should be served.
+    """
+    if not header:
+        return None
+    qualities = parse_accept_encoding(header)
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding not in available:
+            continue
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with the given content-coding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    raise ValueError(f"Unsupported content-coding: {encoding}")
+
+
+def encode_variants(body: bytes, min_size: int) -> Dict[str, bytes]:
+    """Precompute every supported compressed variant of a body
+
+    Returns an empty dict for bodies below min_size, and drops variants that
+    do not come out smaller than the original.
+    """
+    if len(body) < min_size:
+        return {}
+    variants = {}
+    for encoding in SUPPORTED_ENCODINGS:
+        encoded = compress(body, encoding)
+        if len(encoded) < len(body):
+            variants[encoding] = encoded
+    return variants
@@ -0,0 +1,50 @@
+"""
+Database connection settings read from the environment.
+
+Shared by the API's connection pools and the maintenance scripts in this
+directory, so everything connects to AWS RDS the same way.
+"""
+
+import os
+import ssl
+from typing import Any, Dict
+
+import pg8000
+
+
+def database_params(prefix: str = "DB_") -> Dict[str, Any]:
+    """Build pg8000 connection parameters from {prefix}HOST, {prefix}PORT, ...
+
+    Anything other than the host that is not set under the prefix falls back
+    to the primary's DB_ setting, so a replica only needs DB_REPLICA_HOST.
+    """
+    def setting(name: str, default: str = None) -> str:
+        return os.getenv(f"{prefix}{name}") or os.getenv(f"DB_{name}", default)
+
+    host = os.getenv(f"{prefix}HOST")
+    port = int(setting("PORT", "5432"))
+    database = setting("NAME")
+    user = setting("USER")
+    password = setting("PASSWORD")
+
+    if not all([host, database, user, password]):
+        raise Exception("Database environment variables are not set!")
+
+    # Create SSL context for AWS RDS
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+
+    return {
+        'host': host,
+        'port': port,
+        'database': database,
+        'user': user,
+        'password': password,
+        'ssl_context': ssl_context
+    }
+
+
+def connect(prefix: str = "DB_"):
+    """Open a standalone connection (for scripts and listeners)"""
+    return pg8000.connect(**database_params(prefix))
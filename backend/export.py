@@ -0,0 +1,293 @@
+"""
+Streaming export of the response tables and users for research.
+
+Rows are read through a server-side cursor (DECLARE ... / FETCH FORWARD),
+one batch at a time, and each batch is encoded and handed on before the
+next is fetched, so memory stays at one batch whatever the table size. The
+same generator backs the CLI (export_data.py) and /api/admin/export.
+
+Formats:
+
+- csv: header row, then one line per row
+- ndjson: one JSON object per line
+- parquet: one row group per batch (needs pyarrow)
+- arrow: Arrow IPC stream, one record batch per batch (needs pyarrow)
+
+Arrow column types come from the PostgreSQL column types, so every batch
+(including all-NULL ones) shares one schema. COPY ... TO STDOUT would skip
+the cursor for CSV, but COPY takes no bind parameters and the filters
+would have to be spliced into the SQL text.
+"""
+
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # parquet and arrow exports are unavailable without it
+    pyarrow = None
+
+TABLES = ("responses", "checkbox_responses", "other_responses", "users")
+FORMATS = ("csv", "ndjson", "parquet", "arrow")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+CURSOR_NAME = "export_rows"
+
+
+class ExportFilters:
+    """Row filters for an export; users can only be filtered by date"""
+
+    def __init__(self, since: Optional[date] = None, until: Optional[date] = None,
+                 category_id: Optional[int] = None, question_code: Optional[str] = None):
+        self.since = since
+        self.until = until
+        self.category_id = category_id
+        self.question_code = question_code
+
+
+def build_query(table: str, filters: ExportFilters) -> Tuple[str, Tuple]:
+    """SELECT for one table with the filters applied, in id order"""
+    if table not in TABLES:
+        raise ValueError(f"table must be one of {', '.join(TABLES)}")
+    if table == "users" and (filters.category_id is not None or filters.question_code is not None):
+        raise ValueError("users can only be filtered by date")
+
+    conditions, params = [], []
+    if filters.since is not None:
+        conditions.append("created_at >= %s")
+        params.append(filters.since)
+    if filters.until is not None:
+        # until is inclusive of the whole day
+        conditions.append("created_at < %s::date + 1")
+        params.append(filters.until)
+    if filters.category_id is not None:
+        conditions.append("category_id = %s")
+        params.append(filters.category_id)
+    if filters.question_code is not None:
+        conditions.append("question_code = %s")
+        params.append(filters.question_code)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT * FROM {table}{where} ORDER BY id", tuple(params)
+
+
+class ExportStats:
+    """Rows and bytes written so far, for progress reports"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.bytes = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(self.elapsed, 1e-9)
+
+
+def fetch_batches(conn, query: str, params: Tuple, batch_size: int) -> Iterator[Tuple[List[Tuple[str, int]], List[Sequence]]]:
+    """Yield (columns, rows) batches from a server-side cursor; columns are (name, type oid)
+
+    Runs in its own read-only transaction, rolled back at the end.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET TRANSACTION READ ONLY")
+        cursor.execute(f"DECLARE {CURSOR_NAME} NO SCROLL CURSOR FOR {query}", params)
+        columns = None
+        while True:
+            cursor.execute(f"FETCH FORWARD {int(batch_size)} FROM {CURSOR_NAME}")
+            if columns is None:
+                columns = [(description[0], description[1]) for description in cursor.description]
+            rows = cursor.fetchall()
+            if not rows:
+                if columns is not None:
+                    # Let the encoders emit a header (or schema) for an empty export
+                    yield columns, []
+                break
+            yield columns, rows
+            if len(rows) < batch_size:
+                break
+    finally:
+        conn.rollback()
+
+
+def plain_value(value: Any) -> Any:
+    """A value as CSV/JSON/Arrow can hold it"""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_csv(batches) -> Iterator[bytes]:
+    header_written = False
+    for columns, rows in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow([name for name, _ in columns])
+            header_written = True
+        writer.writerows([[plain_value(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(batches) -> Iterator[bytes]:
+    for columns, rows in batches:
+        names = [name for name, _ in columns]
+        lines = [json.dumps(dict(zip(names, map(plain_value, row))), default=json_default) for row in rows]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+# PostgreSQL type oid -> Arrow type; anything else is exported as a string
+ARROW_TYPES = {
+    16: "bool_",
+    20: "int64", 21: "int16", 23: "int32",
+    700: "float32", 701: "float64", 1700: "float64",
+    1082: "date32",
+    17: "binary",
+}
+
+
+def arrow_schema(columns: List[Tuple[str, int]]):
+    fields = []
+    for name, type_oid in columns:
+        if type_oid in (1114, 1184):
+            arrow_type = pyarrow.timestamp("us", tz="UTC" if type_oid == 1184 else None)
+        else:
+            arrow_type = getattr(pyarrow, ARROW_TYPES.get(type_oid, "string"))()
+        fields.append(pyarrow.field(name, arrow_type))
+    return pyarrow.schema(fields)
+
+
+def arrow_batch(schema, rows: List[Sequence]):
+    arrays = []
+    for position, field in enumerate(schema):
+        values = [plain_value(row[position]) for row in rows]
+        if pyarrow.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pyarrow.array(values, type=field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that collects bytes until the encoder drains them"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def encode_columnar(batches, export_format: str) -> Iterator[bytes]:
+    sink = ChunkSink()
+    writer = None
+    for columns, rows in batches:
+        if writer is None:
+            schema = arrow_schema(columns)
+            if export_format == "parquet":
+                writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+            else:
+                writer = pyarrow.ipc.new_stream(sink, schema)
+        if rows:
+            batch = arrow_batch(schema, rows)
+            if export_format == "parquet":
+                writer.write_table(pyarrow.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def stream_export(conn, table: str, export_format: str, filters: ExportFilters,
+                  batch_size: int = 10000, stats: Optional[ExportStats] = None) -> Iterator[bytes]:
+    """Encoded chunks of one table's export; updates stats as rows go out
+
+    Arguments are only checked once the first chunk is requested; call
+    validate() first to reject a bad request before streaming starts.
+    """
+    query, params = validate(table, export_format, filters)
+    stats = stats if stats is not None else ExportStats()
+
+    def counted(batches):
+        for columns, rows in batches:
+            stats.rows += len(rows)
+            yield columns, rows
+
+    batches = counted(fetch_batches(conn, query, params, batch_size))
+    if export_format == "csv":
+        chunks = encode_csv(batches)
+    elif export_format == "ndjson":
+        chunks = encode_ndjson(batches)
+    else:
+        chunks = encode_columnar(batches, export_format)
+    for chunk in chunks:
+        stats.bytes += len(chunk)
+        yield chunk
+
+
+def validate(table: str, export_format: str, filters: ExportFilters) -> Tuple[str, Tuple]:
+    """Check an export request; returns its query, raises ValueError otherwise"""
+    if export_format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if export_format in COLUMNAR_FORMATS and pyarrow is None:
+        raise ValueError(f"{export_format} export needs pyarrow installed")
+    return build_query(table, filters)
+
+
+def filename(table: str, export_format: str) -> str:
+    return f"{table}.{export_format}"
+
+
+def describe(stats: ExportStats) -> Dict[str, Any]:
+    return {
+        "rows": stats.rows,
+        "bytes": stats.bytes,
+        "seconds": round(stats.elapsed, 2),
+        "rows_per_second": round(stats.rows_per_second),
+    }
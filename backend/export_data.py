@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Export the response tables and users for analysis, streaming at constant
+memory (see export.py). Each table goes to <output_dir>/<table>.<format>;
+progress and the final rows/sec are printed as it runs.
+
+Uses the same DB_HOST / DB_NAME / DB_USER / DB_PASSWORD variables as the
+API. The users table can only be filtered by date.
+
+Usage:
+    python backend/export_data.py [table ...] [--format csv|ndjson|parquet|arrow]
+        [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--category ID] [--question CODE]
+        [--batch-size N] [--output-dir DIR]
+
+    With no tables, exports responses, checkbox_responses and
+    other_responses (plus users when no category or question is given).
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+from db_config import connect
+import export
+
+PROGRESS_INTERVAL = 5
+
+def export_table(conn, table, export_format, filters, batch_size, output_dir):
+    """Stream one table into a file and report its throughput"""
+    path = os.path.join(output_dir, export.filename(table, export_format))
+    stats = export.ExportStats()
+    last_report = time.monotonic()
+    with open(path, "wb") as output:
+        for chunk in export.stream_export(conn, table, export_format, filters, batch_size, stats):
+            output.write(chunk)
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                print(f"📦 {table}: {stats.rows:,} rows ({stats.rows_per_second:,.0f} rows/s)")
+    print(f"✅ {table}: {stats.rows:,} rows, {stats.bytes / 1024 / 1024:.1f} MB in {stats.elapsed:.1f}s "
+          f"({stats.rows_per_second:,.0f} rows/s) -> {path}")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream research exports of the response tables and users")
+    parser.add_argument("tables", nargs="*", help=f"any of {', '.join(export.TABLES)}")
+    parser.add_argument("--format", default="csv", choices=export.FORMATS)
+    parser.add_argument("--since", type=date.fromisoformat, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--category", type=int, help="category_id")
+    parser.add_argument("--question", help="question_code")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    filters = export.ExportFilters(args.since, args.until, args.category, args.question)
+    tables = args.tables or [
+        table for table in export.TABLES
+        if table != "users" or (args.category is None and args.question is None)
+    ]
+    try:
+        for table in tables:
+            export.validate(table, args.format, filters)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    conn = connect()
+    print("✅ Connected")
+    started = time.time()
+    total_rows = 0
+    for table in tables:
+        total_rows += export_table(conn, table, args.format, filters, args.batch_size, args.output_dir).rows
+    conn.close()
+    print(f"🎉 Exported {total_rows:,} rows in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
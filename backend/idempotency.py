@@ -0,0 +1,71 @@
+"""
+Idempotency keys for the vote endpoints.
+
+Clients send an Idempotency-Key header (or an idempotency_key body field)
+that stays the same across double taps and retries of one answer. The key is
+scoped to the endpoint and user and hashed to 16 bytes, which is what the
+vote_idempotency_keys table stores as its primary key. Recently seen keys
+are also kept in a bounded in-memory LRU so most retries are answered
+without touching the database. Keys only need to outlive client retries, so
+prune() deletes old rows in small batches.
+"""
+
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Delete one batch of expired keys; batches keep each transaction short
+PRUNE_SQL = """
+    DELETE FROM vote_idempotency_keys
+    WHERE key_hash IN (
+        SELECT key_hash FROM vote_idempotency_keys
+        WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        LIMIT %s
+    )
+"""
+
+
+def key_digest(scope: str, user_uuid: str, key: str) -> str:
+    """Hash an idempotency key into the compact uuid stored in the database"""
+    digest = hashlib.sha256(f"{scope}\x00{user_uuid}\x00{key}".encode()).digest()
+    return str(uuid.UUID(bytes=digest[:16]))
+
+
+class IdempotencyCache:
+    """Bounded LRU of recently completed idempotency keys and their responses"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[Any]:
+        """Return the stored response for a key, or None if it has not been seen"""
+        with self.lock:
+            response = self.entries.get(digest)
+            if response is not None:
+                self.entries.move_to_end(digest)
+            return response
+
+    def put(self, digest: str, response: Any):
+        """Remember the response for a completed key"""
+        with self.lock:
+            self.entries[digest] = response
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def prune(conn, retention_seconds: float, batch_size: int = 5000) -> int:
+    """Delete keys older than the retention period on conn, committing per batch"""
+    cursor = conn.cursor()
+    deleted = 0
+    while True:
+        cursor.execute(PRUNE_SQL, (retention_seconds, batch_size))
+        batch = cursor.rowcount
+        conn.commit()
+        deleted += batch
+        if batch < batch_size:
+            return deleted
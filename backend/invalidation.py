@@ -0,0 +1,151 @@
+"""
+Cross-instance cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Every App Runner instance keeps one dedicated listener connection. Writers
+NOTIFY inside their own transaction, so the message is delivered only if the
+write commits:
+
+- catalog_version: payload is the new catalog version, published by
+  /api/setup and /api/import_data after bumping the cache_versions row;
+- question_tally: payload is a question_code whose vote tally changed.
+
+Notifications are lost while the listener is disconnected, so the
+cache_versions table doubles as a polling fallback. The listener re-reads it
+every poll interval and after each reconnect. On reconnect it also tells
+tally subscribers that anything may have changed. While the listener is
+down, `listening` is False and callers should not trust local caches of
+data that other instances write.
+"""
+
+import logging
+import select
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CHANNEL = "catalog_version"
+TALLY_CHANNEL = "question_tally"
+
+# Payload sent to tally subscribers when individual notifications may have been missed
+ALL_QUESTIONS = "*"
+
+BUMP_CATALOG_VERSION_SQL = """
+    INSERT INTO cache_versions (name, version, updated_at) VALUES ('catalog', 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING version
+"""
+
+NOTIFY_SQL = "SELECT pg_notify(%s, %s)"
+
+
+class InvalidationBus:
+    """One LISTEN connection per instance, dispatching to local subscribers"""
+
+    def __init__(self, connect: Callable[[], object], poll_interval: float = 5.0, wait_timeout: float = 1.0):
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.handlers: Dict[str, List[Callable[[str], None]]] = {}
+        # Last cache_versions value seen per name, from a notification, a poll or a local write
+        self.versions: Dict[str, int] = {}
+        self.listening = False
+        self.notifications_total = 0
+        self.reconnects_total = 0
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]):
+        """Call handler(payload) for every notification on channel"""
+        self.handlers.setdefault(channel, []).append(handler)
+
+    def record_version(self, name: str, version: int) -> bool:
+        """Record a version; True if it replaces a different one seen earlier
+
+        The first version an instance sees is its baseline (it loaded its
+        caches from the database at startup), and writers record the version
+        they publish so their own notification is not applied twice.
+        """
+        with self.lock:
+            previous = self.versions.get(name)
+            self.versions[name] = version
+            return previous is not None and previous != version
+
+    def start(self):
+        """Run the listener in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="invalidation-listener", daemon=True)
+            self._thread.start()
+
+    def _dispatch(self, channel: str, payload: str):
+        if channel == CATALOG_CHANNEL:
+            try:
+                if not self.record_version("catalog", int(payload)):
+                    return
+            except ValueError:
+                pass
+        for handler in self.handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {channel} failed: {e}")
+
+    def _poll_versions(self, cursor):
+        cursor.execute("SELECT name, version FROM cache_versions")
+        for name, version in cursor.fetchall():
+            if name == "catalog":
+                self._dispatch(CATALOG_CHANNEL, str(version))
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = self.connect()
+                conn.autocommit = True
+                cursor = conn.cursor()
+                for channel in (CATALOG_CHANNEL, TALLY_CHANNEL):
+                    cursor.execute(f"LISTEN {channel}")
+                # Catch up on anything missed while disconnected
+                self._poll_versions(cursor)
+                if self.reconnects_total:
+                    self._dispatch(TALLY_CHANNEL, ALL_QUESTIONS)
+                self.listening = True
+                logger.info("Cache invalidation listener connected")
+
+                last_poll = time.monotonic()
+                while True:
+                    # Sleep until the server sends something, then let pg8000 read it
+                    sock = getattr(conn, "_usock", None)
+                    if sock is not None:
+                        select.select([sock], [], [], self.wait_timeout)
+                    else:
+                        time.sleep(self.wait_timeout)
+                    cursor.execute("SELECT 1")
+                    while conn.notifications:
+                        _, channel, payload = conn.notifications.popleft()
+                        self.notifications_total += 1
+                        self._dispatch(channel, payload)
+                    if time.monotonic() - last_poll >= self.poll_interval:
+                        self._poll_versions(cursor)
+                        last_poll = time.monotonic()
+            except Exception as e:
+                if self.listening:
+                    logger.warning(f"Cache invalidation listener dropped: {e}")
+                self.listening = False
+                self.reconnects_total += 1
+                try:
+                    if conn is not None:
+                        conn.close()
+                except Exception:
+                    pass
+                time.sleep(self.poll_interval)
+
+    def stats(self):
+        """Snapshot of the listener's state"""
+        return {
+            "listening": self.listening,
+            "versions": dict(self.versions),
+            "notifications_total": self.notifications_total,
+            "reconnects_total": self.reconnects_total,
+        }
@@ -0,0 +1,41 @@
+"""
+In-process set of users known to exist in the users table.
+
+Landing.jsx posts /api/users on every visit and every vote insert pays a
+foreign key check against users(user_uuid). Users confirmed in this process
+are remembered in an exact LRU, which lets the vote path skip the lazy
+"create user" statement and lets /api/users skip its write.
+
+A user created lazily by a vote has no year of birth yet, so the LRU also
+records whether the year was written. /api/users only short-circuits for
+users whose year is known; everyone else still gets the write that fills it.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class KnownUsers:
+    """Exact LRU of users confirmed in the database"""
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        # user_uuid -> whether the row's year_of_birth is known to be set
+        self.recent: "OrderedDict[str, bool]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, user_uuid: str, with_year: bool = False):
+        """Remember a user whose row is committed"""
+        with self.lock:
+            self.recent[user_uuid] = with_year or self.recent.get(user_uuid, False)
+            self.recent.move_to_end(user_uuid)
+            while len(self.recent) > self.max_entries:
+                self.recent.popitem(last=False)
+
+    def contains(self, user_uuid: str, with_year: bool = False) -> bool:
+        """True only for users recently confirmed in the database (with their year, if asked)"""
+        with self.lock:
+            if user_uuid not in self.recent:
+                return False
+            self.recent.move_to_end(user_uuid)
+            return self.recent[user_uuid] or not with_year
@@ -0,0 +1,60 @@
+"""
+Priority lanes for database work.
+
+Each lane has its own connection pool so a slow import or a full table dump
+cannot starve live votes:
+
+- write: vote and user submissions
+- read: catalog, results and soundtrack reads
+- admin: setup, import, debug and admin endpoints
+
+The lane is chosen per endpoint from the matched route and carried in a
+context variable, so the data access helpers pick the right pool without
+every handler passing it along.
+"""
+
+from contextvars import ContextVar
+
+WRITE = "write"
+READ = "read"
+ADMIN = "admin"
+LANES = (WRITE, READ, ADMIN)
+
+WRITE_ROUTES = {
+    ("POST", "/api/users"),
+    ("POST", "/api/vote"),
+    ("POST", "/api/checkbox_vote"),
+    ("POST", "/api/other"),
+}
+
+ADMIN_ROUTES = {
+    ("GET", "/api/users"),
+    ("GET", "/db-check"),
+    ("POST", "/api/setup"),
+    ("POST", "/api/import_data"),
+}
+
+ADMIN_PREFIXES = ("/api/admin/", "/api/debug/")
+
+
+def lane_for(method: str, route: str) -> str:
+    """Pick the lane for a request from its method and route template"""
+    if (method, route) in WRITE_ROUTES:
+        return WRITE
+    if (method, route) in ADMIN_ROUTES or route.startswith(ADMIN_PREFIXES):
+        return ADMIN
+    return READ
+
+
+# Work outside a request (catalog warm-up threads) runs in the read lane
+_current_lane: ContextVar[str] = ContextVar("db_lane", default=READ)
+
+
+def current_lane() -> str:
+    """Return the lane of the request being served"""
+    return _current_lane.get()
+
+
+def set_lane(lane: str):
+    """Route the current request's database work to a lane"""
+    _current_lane.set(lane)
@@ -0,0 +1,156 @@
+"""
+Live results for /api/results/{question_code}/stream.
+
+Each watched question has one aggregator task per instance. Tally changes
+only mark the aggregator dirty; it recomputes the results at most once per
+min_interval and sends the options whose counts changed to every subscriber.
+A thousand watchers of one question therefore cost one aggregate query per
+interval, not a thousand. While tally notifications cannot be trusted (the
+invalidation listener is down), aggregators fall back to refreshing every
+poll_interval.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from invalidation import ALL_QUESTIONS
+
+logger = logging.getLogger(__name__)
+
+# Buffered messages per subscriber before it is resynced with a snapshot
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+def format_event(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=float)}\n\n"
+
+
+def _counts(payload: Dict[str, Any]) -> Dict[str, float]:
+    return {row['option_select']: row['count'] for row in payload['results']}
+
+
+class ResultsAggregator:
+    """Recomputes one question's results on change and fans them out"""
+
+    def __init__(self, hub: "LiveResultsHub", question_code: str):
+        self.hub = hub
+        self.question_code = question_code
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.payload: Optional[Dict[str, Any]] = None
+        self.dirty = asyncio.Event()
+        self.ready = asyncio.Event()
+        self.refreshes_total = 0
+        # A fresh context so the task does not inherit the first watcher's request state
+        self.task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.payload is not None:
+            queue.put_nowait(format_event("snapshot", self.payload))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            self.task.cancel()
+            self.hub.aggregators.pop(self.question_code, None)
+
+    def _broadcast(self, message: str):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow reader: drop its backlog and resync it from a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_event("snapshot", self.payload))
+
+    async def _refresh(self):
+        payload = await asyncio.to_thread(self.hub.compute, self.question_code)
+        self.refreshes_total += 1
+        if payload is None:
+            return
+        previous, self.payload = self.payload, payload
+        if previous is None:
+            self._broadcast(format_event("snapshot", payload))
+            self.ready.set()
+            return
+        old, new = _counts(previous), _counts(payload)
+        changed: List[Dict[str, Any]] = [
+            {"option_select": option, "count": count} for option, count in new.items() if old.get(option) != count
+        ]
+        if changed:
+            self._broadcast(format_event("update", {"question_code": self.question_code, "changed": changed}))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self._refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Live results refresh for {self.question_code} failed: {e}")
+            # Coalesce every change that arrives during the interval into one refresh
+            await asyncio.sleep(self.hub.min_interval)
+            deadline = loop.time() + self.hub.poll_interval
+            while not self.dirty.is_set():
+                try:
+                    await asyncio.wait_for(self.dirty.wait(), timeout=max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    if not self.hub.notifications_trusted():
+                        break
+                    deadline = loop.time() + self.hub.poll_interval
+            self.dirty.clear()
+
+
+class LiveResultsHub:
+    """Registry of per-question aggregators for this instance"""
+
+    def __init__(self, compute: Callable[[str], Optional[Dict[str, Any]]],
+                 notifications_trusted: Callable[[], bool],
+                 min_interval: float = 1.0, poll_interval: float = 5.0):
+        self.compute = compute
+        self.notifications_trusted = notifications_trusted
+        self.min_interval = min_interval
+        self.poll_interval = poll_interval
+        self.aggregators: Dict[str, ResultsAggregator] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def aggregator(self, question_code: str) -> ResultsAggregator:
+        """Return the question's aggregator, starting it if nobody watches it yet"""
+        self.loop = asyncio.get_running_loop()
+        aggregator = self.aggregators.get(question_code)
+        if aggregator is None:
+            aggregator = self.aggregators[question_code] = ResultsAggregator(self, question_code)
+        return aggregator
+
+    def _mark_dirty(self, question_code: str):
+        if question_code == ALL_QUESTIONS:
+            targets = list(self.aggregators.values())
+        else:
+            targets = [self.aggregators[question_code]] if question_code in self.aggregators else []
+        for aggregator in targets:
+            aggregator.dirty.set()
+
+    def notify(self, question_code: str):
+        """Mark a question's tally as changed; safe to call from any thread"""
+        if self.loop is None or not self.aggregators:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._mark_dirty, question_code)
+        except RuntimeError:
+            # Event loop already closed during shutdown
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Watched questions and their subscriber counts"""
+        return {
+            code: {"subscribers": len(aggregator.subscribers), "refreshes_total": aggregator.refreshes_total}
+            for code, aggregator in list(self.aggregators.items())
+        }
@@ -1,92 +1,210 @@
 
 import os
+import asyncio
+import hmac
 import queue
 import threading
+import time
 import logging
 import ssl
 from contextlib import contextmanager
-from typing import Dict, Any
-from fastapi import FastAPI, HTTPException
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from datetime import date, datetime, timedelta
+import anyio
 import pg8000
 
+import msgspec
+
+import age_results
+import catalog
+import compact_storage
+import export
+import invalidation
+import lanes
+import metrics
+import progress
+import results_query
+import results_view
+import schemas
+import trending
+import vote_counters
+import voter_sketches
+from admission import AdmissionController, Overloaded
+from db_config import connect as db_connect, database_params
+from idempotency import IdempotencyCache, key_digest, prune as prune_idempotency_keys
+from invalidation import InvalidationBus
+from known_users import KnownUsers
+from live_results import LiveResultsHub
+from replica import ReplicaRouter
+from response_cache import ResponseCache, cache_key, is_cacheable
+from results_cache import ResultsCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Catalog responses are cached in memory and revalidated with ETags
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1024")),
+    max_age=int(os.getenv("CATALOG_CACHE_MAX_AGE", "60")),
+    stale_while_revalidate=int(os.getenv("CATALOG_CACHE_STALE_WHILE_REVALIDATE", "600")),
+    min_compress_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+)
+
+# Paths that must answer even when every database lane is saturated
+ADMISSION_EXEMPT_PATHS = {"/", "/health", "/metrics"}
+
+@app.middleware("http")
+async def load_shedding_middleware(request: Request, call_next):
+    """Shed requests with a fast 503 when their database lane is saturated"""
+    if request.url.path in ADMISSION_EXEMPT_PATHS:
+        return await call_next(request)
+
+    controller = admission_controllers[lanes.current_lane()]
+    try:
+        await controller.acquire()
+    except Overloaded as e:
+        metrics.http_requests_shed_total.inc(lane=e.lane, reason=e.reason)
+        logger.warning(f"Shedding {request.method} {request.url.path}: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service is busy, please retry shortly"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        controller.release(time.perf_counter() - started)
+
+@app.middleware("http")
+async def catalog_cache_middleware(request: Request, call_next):
+    """Serve catalog GETs from memory and answer If-None-Match with 304"""
+    if request.method != "GET" or not is_cacheable(request.url.path):
+        return await call_next(request)
+
+    key = cache_key(request.url.path, request.query_params)
+    version = catalog.get_version()
+
+    entry = response_cache.get(key, version)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = response_cache.put(key, version, body, response.headers.get("content-type", "application/json"))
+
+    return response_cache.build_response(entry, request.headers)
+
+def route_template(request: Request) -> str:
+    """Resolve the route pattern for a request so metrics don't explode per path value"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Record per-route latency and database usage for /metrics"""
+    route = route_template(request)
+    lanes.set_lane(lanes.lane_for(request.method, route))
+    stats = metrics.start_request()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.observe_request(request.method, route, status, time.perf_counter() - started, stats)
+
 # Simple connection pool using pg8000
 class SimpleConnectionPool:
-    def __init__(self, max_connections=5):
+    def __init__(self, max_connections=5, timeout=30, name="default", db_prefix="DB_"):
+        self.name = name
+        self.db_prefix = db_prefix
         self.max_connections = max_connections
+        self.timeout = timeout
         self.pool = queue.Queue(maxsize=max_connections)
         self.active_connections = 0
+        self.waiting = 0
+        self.created_total = 0
+        self.closed_total = 0
+        self.timeouts_total = 0
         self.lock = threading.Lock()
         self.db_params = None
+        metrics.track_pool(self)
         
     def _create_connection(self):
         """Create a new database connection"""
         if not self.db_params:
             # Use individual environment variables for AWS App Runner
-            host = os.getenv("DB_HOST")
-            port = int(os.getenv("DB_PORT", "5432"))
-            database = os.getenv("DB_NAME")
-            user = os.getenv("DB_USER")
-            password = os.getenv("DB_PASSWORD")
-            
-            print(f"🔍 DEBUG: DB_HOST = {host}")
-            logger.info(f"🔍 DEBUG: DB_HOST = {host}")
-            
-            if not all([host, database, user, password]):
-                raise Exception("Database environment variables are not set!")
-            
-            # Create SSL context for AWS RDS
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            
-            self.db_params = {
-                'host': host,
-                'port': port,
-                'database': database,
-                'user': user,
-                'password': password,
-                'ssl_context': ssl_context
-            }
+            print(f"🔍 DEBUG: {self.db_prefix}HOST = {os.getenv(self.db_prefix + 'HOST')}")
+            logger.info(f"🔍 DEBUG: {self.db_prefix}HOST = {os.getenv(self.db_prefix + 'HOST')}")
+            self.db_params = database_params(self.db_prefix)
             logger.info(f"Database params initialized for host: {self.db_params['host']}")
         
         return pg8000.connect(**self.db_params)
     
     def get_connection(self):
         """Get a connection from the pool"""
+        started = time.perf_counter()
         try:
             # Try to get an existing connection from the pool
-            return self.pool.get_nowait()
+            conn = self.pool.get_nowait()
         except queue.Empty:
             # No connections available, create a new one if under limit
             with self.lock:
-                if self.active_connections < self.max_connections:
+                can_create = self.active_connections < self.max_connections
+                if can_create:
                     self.active_connections += 1
-                    try:
-                        conn = self._create_connection()
-                        logger.info(f"Created new teen site connection. Active: {self.active_connections}")
-                        return conn
-                    except Exception as e:
-                        self.active_connections -= 1
-                        raise e
                 else:
-                    # Wait for a connection to become available
-                    logger.info("Production pool full, waiting for connection...")
-                    return self.pool.get(timeout=30)
+                    self.waiting += 1
+            if can_create:
+                try:
+                    conn = self._create_connection()
+                except Exception as e:
+                    with self.lock:
+                        self.active_connections -= 1
+                    raise e
+                with self.lock:
+                    self.created_total += 1
+                metrics.db_pool_connections_created_total.inc(pool=self.name)
+                logger.info(f"Created new teen site connection. Active: {self.active_connections}")
+            else:
+                # Wait for a connection to become available
+                logger.info(f"{self.name} pool full, waiting for connection ({self.waiting} waiting)...")
+                try:
+                    conn = self.pool.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self.lock:
+                        self.timeouts_total += 1
+                    metrics.db_pool_timeouts_total.inc(pool=self.name)
+                    raise Exception(f"Timed out after {self.timeout}s waiting for a {self.name} pool connection")
+                finally:
+                    with self.lock:
+                        self.waiting -= 1
+        metrics.db_pool_acquire_wait_seconds.observe(time.perf_counter() - started, pool=self.name)
+        return conn
     
     def return_connection(self, conn):
         """Return a connection to the pool"""
         try:
-            # Test if connection is still valid
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
+            # Always make one round trip: pg8000's rollback() is a local no-op
+            # outside a transaction, so it alone would re-pool dead sockets
+            if conn._in_transaction:
+                conn.rollback()
+            else:
+                conn.execute_simple("SELECT 1")
             # Connection is good, return to pool
             self.pool.put_nowait(conn)
         except:
@@ -97,50 +215,246 @@ class SimpleConnectionPool:
                 pass
             with self.lock:
                 self.active_connections -= 1
+                self.closed_total += 1
+            metrics.db_pool_connections_closed_total.inc(pool=self.name)
             logger.info(f"Closed bad production connection. Active: {self.active_connections}")
 
-# Global connection pool
-connection_pool = SimpleConnectionPool(max_connections=5)
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool's saturation counters"""
+        with self.lock:
+            idle = self.pool.qsize()
+            return {
+                "name": self.name,
+                "max_connections": self.max_connections,
+                "timeout_seconds": self.timeout,
+                "open": self.active_connections,
+                "in_use": max(self.active_connections - idle, 0),
+                "idle": idle,
+                "waiting": self.waiting,
+                "created_total": self.created_total,
+                "closed_total": self.closed_total,
+                "timeouts_total": self.timeouts_total,
+            }
+
+# Default size and timeout per lane, overridable with DB_POOL_<LANE>_MAX_CONNECTIONS
+# and DB_POOL_<LANE>_TIMEOUT; DB_POOL_MAX_CONNECTIONS/DB_POOL_TIMEOUT set the
+# write and read lane defaults
+LANE_POOL_DEFAULTS = {
+    lanes.WRITE: (os.getenv("DB_POOL_MAX_CONNECTIONS", "5"), os.getenv("DB_POOL_TIMEOUT", "30")),
+    lanes.READ: (os.getenv("DB_POOL_MAX_CONNECTIONS", "5"), os.getenv("DB_POOL_TIMEOUT", "30")),
+    lanes.ADMIN: ("2", "120"),
+}
+
+# One connection pool per lane, sized per App Runner instance
+connection_pools = {
+    lane: SimpleConnectionPool(
+        max_connections=int(os.getenv(f"DB_POOL_{lane.upper()}_MAX_CONNECTIONS", max_connections)),
+        timeout=float(os.getenv(f"DB_POOL_{lane.upper()}_TIMEOUT", timeout)),
+        name=lane,
+    )
+    for lane, (max_connections, timeout) in LANE_POOL_DEFAULTS.items()
+}
+
+# Admission control per lane, configured with ADMISSION_<LANE>_MAX_IN_FLIGHT,
+# ADMISSION_<LANE>_MAX_QUEUE and ADMISSION_<LANE>_DEADLINE
+admission_controllers = {
+    lane: AdmissionController(
+        lane,
+        max_in_flight=int(os.getenv(f"ADMISSION_{lane.upper()}_MAX_IN_FLIGHT", pool.max_connections * 2)),
+        max_queue=int(os.getenv(f"ADMISSION_{lane.upper()}_MAX_QUEUE", "50")),
+        deadline=float(os.getenv(f"ADMISSION_{lane.upper()}_DEADLINE", "30" if lane == lanes.ADMIN else "2")),
+    )
+    for lane, pool in connection_pools.items()
+}
+for _controller in admission_controllers.values():
+    metrics.track_admission(_controller)
+
+# Spare worker threads beyond what the lanes can admit, for exempt paths,
+# streaming responses and background hand-offs
+THREADPOOL_HEADROOM = int(os.getenv("THREADPOOL_HEADROOM", "10"))
+
+def size_threadpool():
+    """Give every request the lanes admit its own worker thread
+
+    Database handlers run in AnyIO's default threadpool (40 threads). If the
+    lanes together admitted more than that, admitted requests would queue for
+    a thread where admission control cannot see or shed them.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    admitted = sum(controller.max_in_flight for controller in admission_controllers.values())
+    limiter.total_tokens = max(limiter.total_tokens, admitted + THREADPOOL_HEADROOM)
+
+def current_pool() -> SimpleConnectionPool:
+    """Return the connection pool for the current request's lane"""
+    return connection_pools[lanes.current_lane()]
+
+# Optional read replica for the read lane, enabled by DB_REPLICA_HOST
+replica_router = None
+if os.getenv("DB_REPLICA_HOST"):
+    replica_router = ReplicaRouter(
+        SimpleConnectionPool(
+            max_connections=int(os.getenv("DB_POOL_REPLICA_MAX_CONNECTIONS", connection_pools[lanes.READ].max_connections)),
+            timeout=float(os.getenv("DB_POOL_REPLICA_TIMEOUT", "5")),
+            name="replica",
+            db_prefix="DB_REPLICA_",
+        ),
+        max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", "5")),
+        check_interval=float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "5")),
+    )
+    metrics.track_replica(replica_router)
+
+# Cross-instance invalidation of the catalog and results caches
+invalidation_bus = InvalidationBus(
+    db_connect,
+    poll_interval=float(os.getenv("CACHE_INVALIDATION_POLL_INTERVAL", "5")),
+)
+results_cache = ResultsCache(max_entries=int(os.getenv("RESULTS_CACHE_MAX_ENTRIES", "2048")))
+invalidation_bus.subscribe(invalidation.CATALOG_CHANNEL, lambda version: catalog_changed(publish=False))
+invalidation_bus.subscribe(invalidation.TALLY_CHANNEL, results_cache.invalidate)
+
+def acquire_connection(replica_ok: bool = False):
+    """Check out a connection for the current lane as (pool, conn)
+
+    Read-only work in the read lane goes to the replica while it is healthy
+    and falls back to the lane's primary pool otherwise.
+    """
+    if replica_ok and replica_router is not None and lanes.current_lane() == lanes.READ and replica_router.available():
+        try:
+            return replica_router.pool, replica_router.pool.get_connection()
+        except Exception as e:
+            replica_router.mark_failed(e)
+    pool = current_pool()
+    return pool, pool.get_connection()
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Guard admin endpoints with ADMIN_TOKEN; they stay closed while it is unset"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(x_admin_token or "", admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
 
 @contextmanager
-def get_db_connection():
+def get_db_connection(replica_ok: bool = False):
     """Get database connection from the pool"""
-    conn = None
+    pool = conn = None
     try:
-        conn = connection_pool.get_connection()
+        started = time.perf_counter()
+        pool, conn = acquire_connection(replica_ok)
+        metrics.record_pool_wait(time.perf_counter() - started)
         yield conn
     finally:
         if conn:
-            connection_pool.return_connection(conn)
+            pool.return_connection(conn)
+
+def run_query(conn, query: str, params: tuple = None, fetch: bool = True):
+    """Run one statement on a connection without committing"""
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    
+    if fetch:
+        # Get column names
+        columns = [desc[0] for desc in cursor.description]
+        # Fetch all rows and convert to list of dicts
+        rows = cursor.fetchall()
+        results = []
+        for row in rows:
+            results.append(dict(zip(columns, row)))
+        metrics.record_query(time.perf_counter() - started, len(results))
+        return results
+    else:
+        metrics.record_query(time.perf_counter() - started, 0)
+        return True
 
 # Database query execution function with connection pooling
-def execute_query(query: str, params: tuple = None, fetch: bool = True):
-    """Execute database query using connection pool"""
+def execute_query(query: str, params: tuple = None, fetch: bool = True, allow_replica: bool = True):
+    """Execute database query using connection pool
+
+    Reads may be served by the read replica; pass allow_replica=False when
+    the caller must see its own recent writes, or when the result is cached
+    or pushed to subscribers and so outlives the request.
+    """
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            if fetch:
-                # Get column names
-                columns = [desc[0] for desc in cursor.description]
-                # Fetch all rows and convert to list of dicts
-                rows = cursor.fetchall()
-                results = []
-                for row in rows:
-                    results.append(dict(zip(columns, row)))
-                return results
-            else:
+        with get_db_connection(replica_ok=fetch and allow_replica) as conn:
+            results = run_query(conn, query, params, fetch)
+            if not fetch:
                 conn.commit()
-                return True
+            return results
                 
     except Exception as e:
         logger.error(f"Database operation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Database operation failed: {e}")
 
+class DbSession:
+    """One pooled connection and one transaction shared by a whole request
+
+    The connection is checked out on the first statement and returned when
+    the request finishes. Nothing is committed until the handler calls
+    commit(); anything left uncommitted is rolled back.
+    """
+
+    def __init__(self, replica_ok: bool = True):
+        self.pool = None
+        self.conn = None
+        # Whether read-lane work may use the replica; checked on the first statement
+        self.replica_ok = replica_ok
+        # Callbacks run once the transaction commits, or once it is abandoned
+        self.on_commit = []
+        self.on_rollback = []
+
+    def execute(self, query: str, params: tuple = None, fetch: bool = True):
+        """Execute a statement inside the request transaction"""
+        try:
+            if self.conn is None:
+                started = time.perf_counter()
+                # Only read-lane sessions (results) are ever routed to the replica
+                self.pool, self.conn = acquire_connection(replica_ok=self.replica_ok)
+                metrics.record_pool_wait(time.perf_counter() - started)
+            return run_query(self.conn, query, params, fetch)
+        except Exception as e:
+            logger.error(f"Database operation failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Database operation failed: {e}")
+
+    def commit(self):
+        """Commit everything executed so far"""
+        if self.conn is not None:
+            self.conn.commit()
+        callbacks, self.on_commit, self.on_rollback = self.on_commit, [], []
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        """Roll back uncommitted work and return the connection to the pool"""
+        callbacks, self.on_rollback, self.on_commit = self.on_rollback, [], []
+        for callback in callbacks:
+            callback()
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        # return_connection rolls back anything still open
+        self.pool.return_connection(conn)
+
+def get_db_session():
+    """FastAPI dependency providing a request-scoped database session"""
+    session = DbSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+async def request_body(request: Request) -> bytes:
+    """FastAPI dependency reading the raw body on the event loop
+
+    Handlers that talk to the database are plain functions, so FastAPI runs
+    them in its threadpool and their blocking pg8000 calls never stall the
+    loop; they get the body through this dependency instead of awaiting it.
+    """
+    return await request.body()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -150,6 +464,63 @@ async def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/api/admin/pool", dependencies=[Depends(require_admin)])
+def get_pool_stats():
+    """Live per-lane connection pool saturation for right-sizing the pools"""
+    return {
+        "pools": [pool.stats() for pool in connection_pools.values()]
+                 + ([replica_router.pool.stats()] if replica_router is not None else []),
+        "admission": [controller.stats() for controller in admission_controllers.values()],
+        "replica": replica_router.stats() if replica_router is not None else None,
+        "invalidation": invalidation_bus.stats(),
+        "live_results": live_results.stats(),
+    }
+
+# Rows fetched per server-side cursor round trip in /api/admin/export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+def export_table(table: str, export_format: str = Query("csv", alias="format"),
+                 since: Optional[date] = None, until: Optional[date] = None,
+                 category_id: Optional[int] = None, question_code: Optional[str] = None):
+    """Stream a research export of one table as CSV, NDJSON, Parquet or Arrow
+
+    The export runs on its own connection, not a pooled one, so a long
+    download never holds a connection the API needs.
+    """
+    filters = export.ExportFilters(since, until, category_id, question_code)
+    try:
+        export.validate(table, export_format, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def chunks():
+        conn = db_connect()
+        stats = export.ExportStats()
+        try:
+            yield from export.stream_export(conn, table, export_format, filters, EXPORT_BATCH_SIZE, stats)
+            logger.info(f"Exported {table} as {export_format}: {export.describe(stats)}")
+        except Exception as e:
+            logger.error(f"Export of {table} failed after {stats.rows} rows: {e}")
+            raise
+        finally:
+            conn.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type=export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{export.filename(table, export_format)}"'},
+    )
+
+# Exports read whole tables, so the route only exists once ADMIN_TOKEN is set
+if os.getenv("ADMIN_TOKEN"):
+    app.add_api_route("/api/admin/export/{table}", export_table, methods=["GET"],
+                      dependencies=[Depends(require_admin)])
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics for request latency and database usage"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/db-check")
 def db_check():
     """Test database connectivity without crashing on startup"""
@@ -183,62 +554,155 @@ def db_check():
     except Exception as e:
         return {"error": f"Database connection failed: {str(e)}", "status": "error"}
 
+def load_question_index() -> catalog.QuestionIndex:
+    """Build the vote validation index from the questions and options tables"""
+    # Codes new to this catalog get their user_progress bit before it is read
+    execute_query(progress.ASSIGN_BITS_SQL, fetch=False)
+    questions = execute_query("""
+        SELECT q.id, q.question_code, q.question_text, q.question_number, c.category_name,
+               c.id as category_id, q.block_number, q.check_box, q.max_select, b.bit
+        FROM questions q
+        JOIN categories c ON q.category_id = c.id
+        JOIN question_bits b ON b.question_code = q.question_code
+    """, allow_replica=False)
+    options = execute_query("SELECT question_code, option_select, option_text, option_code FROM options",
+                            allow_replica=False)
+    index = catalog.QuestionIndex(questions, options)
+    logger.info(f"Indexed {len(questions)} questions and {len(options)} options for vote validation")
+    return index
+
+def get_question_index() -> catalog.QuestionIndex:
+    """Get the vote validation index for the current catalog version"""
+    return catalog.load("questions", load_question_index)
+
+def warm_response_cache():
+    """Render and compress every catalog response once, ahead of the first request"""
+    version = catalog.get_version()
+
+    def prime(path, handler, *args):
+        payload = handler(*args)
+        body = JSONResponse(content=jsonable_encoder(payload)).body
+        response_cache.put(path, version, body, "application/json")
+        return payload
+
+    prime("/api/soundtracks", get_soundtracks)
+    prime("/api/soundtracks/playlists", get_playlists)
+    categories = prime("/api/categories", get_categories)
+    for category in categories:
+        blocks = prime(f"/api/categories/{category['id']}/blocks", get_blocks_by_category, category['id'])
+        for block in blocks:
+            block_code = f"{block['category_id']}_{block['block_number']}"
+            questions = prime(f"/api/blocks/{block_code}/questions", get_questions_by_block, block_code)
+            for question in questions:
+                code = question['question_code']
+                prime(f"/api/questions/{code}/options", get_options_by_question, code)
+    logger.info(f"Warmed {len(response_cache.entries)} catalog responses")
+
+def warm_catalog():
+    """Build the in-memory catalog indexes and responses ahead of the first request"""
+    try:
+        get_question_index()
+        get_soundtrack_index()
+        warm_response_cache()
+    except Exception as e:
+        # The indexes are built lazily on first use if the database is not reachable yet
+        logger.warning(f"Catalog warm-up skipped: {e}")
+
+def publish_catalog_change():
+    """Bump the shared catalog version and notify the other instances"""
+    try:
+        with get_db_connection() as conn:
+            version = run_query(conn, invalidation.BUMP_CATALOG_VERSION_SQL)[0]['version']
+            # Recorded first so this instance ignores its own notification
+            invalidation_bus.record_version("catalog", version)
+            run_query(conn, invalidation.NOTIFY_SQL, (invalidation.CATALOG_CHANNEL, str(version)), fetch=False)
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Could not publish catalog change to other instances: {e}")
+
+def catalog_changed(publish: bool = True):
+    """Invalidate everything built from the old catalog and warm the new one"""
+    if publish:
+        publish_catalog_change()
+    catalog.bump_version()
+    results_cache.invalidate(invalidation.ALL_QUESTIONS)
+    storage_keys.clear()
+    if replica_router is not None:
+        # Give the replica time to replay the change before reading the new catalog from it
+        replica_router.use_primary_for(replica_router.max_lag + replica_router.check_interval)
+    threading.Thread(target=warm_catalog, daemon=True).start()
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database connection pool on startup"""
-    # The original code had db_pool, but it's removed.
-    # This function is kept as it was not explicitly removed by the new_code.
-    # However, the new_code removed the db_pool logic.
-    # This function will now effectively do nothing if db_pool is removed.
-    pass
+    """Warm the in-memory catalog indexes without blocking startup"""
+    size_threadpool()
+    threading.Thread(target=warm_catalog, daemon=True).start()
+    if os.getenv("DB_HOST"):
+        invalidation_bus.start()
+        if IDEMPOTENCY_PRUNE_INTERVAL > 0:
+            threading.Thread(target=prune_idempotency_keys_forever, daemon=True).start()
+        if VOTE_COUNTER_SHARDS > 0:
+            threading.Thread(target=compact_vote_counters_forever, daemon=True).start()
+        if RESULTS_SOURCE == "matview":
+            threading.Thread(target=refresh_results_view_forever, daemon=True).start()
+        if VOTER_SKETCH_FLUSH_INTERVAL > 0:
+            threading.Thread(target=flush_voter_sketches_forever, daemon=True).start()
+        if TRENDING_SNAPSHOT_INTERVAL > 0:
+            if TRENDING_SNAPSHOT_INTERVAL > trending.max_snapshot_interval():
+                logger.warning(f"TRENDING_SNAPSHOT_INTERVAL above {trending.max_snapshot_interval()}s: "
+                               "other instances' counts drop out of the 1m window between snapshots")
+            threading.Thread(target=snapshot_vote_rates_forever, daemon=True).start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection pool on shutdown"""
-    # The original code had db_pool, but it's removed.
-    # This function is kept as it was not explicitly removed by the new_code.
-    # However, the new_code removed the db_pool logic.
-    # This function will now effectively do nothing if db_pool is removed.
-    pass
+    """Flush the voter sketches this instance has not written yet"""
+    if os.getenv("DB_HOST") and VOTER_SKETCH_FLUSH_INTERVAL > 0:
+        conn = None
+        try:
+            conn = db_connect()
+            flush_voter_sketches(conn)
+        except Exception as e:
+            logger.warning(f"Final voter sketch flush failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
 
 # Request validation functions (replacing pydantic)
-def validate_user_request(data: Dict[str, Any]) -> Dict[str, Any]:
+def decode_request(decoder: msgspec.json.Decoder, body: bytes):
+    """Decode and type-check a JSON body in one pass, mapping failures to 400"""
+    try:
+        return decoder.decode(body)
+    except msgspec.ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+
+def normalize_user_uuid(request):
+    """Lower-case the (already pattern-checked) user_uuid, as PostgreSQL prints uuids"""
+    request.user_uuid = request.user_uuid.lower()
+    return request
+
+def parse_user_uuid(user_uuid: str) -> str:
+    """Validate a user_uuid from a path or free-form body, 400 if it is not a UUID"""
+    if not isinstance(user_uuid, str) or not schemas.uuid_regex.match(user_uuid):
+        raise HTTPException(status_code=400, detail="user_uuid must be a UUID")
+    return user_uuid.lower()
+
+def validate_user_request(body: bytes) -> schemas.UserRequest:
     """Validate user creation request"""
-    if not isinstance(data.get('user_uuid'), str):
-        raise HTTPException(status_code=400, detail="user_uuid must be a string")
-    if not isinstance(data.get('year_of_birth'), int):
-        raise HTTPException(status_code=400, detail="year_of_birth must be an integer")
-    return data
+    return normalize_user_uuid(decode_request(schemas.user_decoder, body))
 
-def validate_vote_request(data: Dict[str, Any]) -> Dict[str, Any]:
+def validate_vote_request(body: bytes) -> schemas.VoteRequest:
     """Validate vote request"""
-    if not isinstance(data.get('question_code'), str):
-        raise HTTPException(status_code=400, detail="question_code must be a string")
-    if not isinstance(data.get('option_select'), str):
-        raise HTTPException(status_code=400, detail="option_select must be a string")
-    if not isinstance(data.get('user_uuid'), str):
-        raise HTTPException(status_code=400, detail="user_uuid must be a string")
-    return data
-
-def validate_checkbox_vote_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    return normalize_user_uuid(decode_request(schemas.vote_decoder, body))
+
+def validate_checkbox_vote_request(body: bytes) -> schemas.CheckboxVoteRequest:
     """Validate checkbox vote request"""
-    if not isinstance(data.get('question_code'), str):
-        raise HTTPException(status_code=400, detail="question_code must be a string")
-    if not isinstance(data.get('option_selects'), list):
-        raise HTTPException(status_code=400, detail="option_selects must be a list")
-    if not isinstance(data.get('user_uuid'), str):
-        raise HTTPException(status_code=400, detail="user_uuid must be a string")
-    return data
-
-def validate_other_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    return normalize_user_uuid(decode_request(schemas.checkbox_vote_decoder, body))
+
+def validate_other_request(body: bytes) -> schemas.OtherRequest:
     """Validate other text request"""
-    if not isinstance(data.get('question_code'), str):
-        raise HTTPException(status_code=400, detail="question_code must be a string")
-    if not isinstance(data.get('user_uuid'), str):
-        raise HTTPException(status_code=400, detail="user_uuid must be a string")
-    if not isinstance(data.get('other_text'), str):
-        raise HTTPException(status_code=400, detail="other_text must be a string")
-    return data
+    return normalize_user_uuid(decode_request(schemas.other_decoder, body))
 
 # API endpoints
 @app.get("/test")
@@ -251,7 +715,7 @@ async def test():
     return {"message": "Test endpoint working", "timestamp": str(datetime.now())}
 
 @app.get("/api/categories")
-async def get_categories():
+def get_categories():
     """Get all categories - Updated to use correct database with 14 categories"""
     print("🔍 PRINT: Categories endpoint called!")
     logger.info("🔍 LOG: Categories endpoint called!")
@@ -261,7 +725,7 @@ async def get_categories():
         logger.info("🔍 LOG: About to execute database query")
         
         query = "SELECT * FROM categories ORDER BY id"
-        results = execute_query(query)
+        results = execute_query(query, allow_replica=False)
         
         print(f"🔍 PRINT: Query successful, got {len(results)} results")
         logger.info(f"🔍 LOG: Query successful, got {len(results)} results")
@@ -273,14 +737,14 @@ async def get_categories():
         raise HTTPException(status_code=500, detail="Failed to fetch categories")
 
 @app.get("/api/categories/{category_id}/blocks")
-async def get_blocks_by_category(category_id: int):
+def get_blocks_by_category(category_id: int):
     """Get blocks for a specific category"""
     query = "SELECT * FROM blocks WHERE category_id = %s ORDER BY block_number"
-    results = execute_query(query, (category_id,))
+    results = execute_query(query, (category_id,), allow_replica=False)
     return results
 
 @app.get("/api/blocks/{block_code}/questions")
-async def get_questions_by_block(block_code: str):
+def get_questions_by_block(block_code: str):
     """Get questions for a specific block"""
     # Extract category_id and block_number from block_code (e.g., "1_1" -> category_id=1, block_number=1)
     try:
@@ -294,51 +758,100 @@ async def get_questions_by_block(block_code: str):
         raise HTTPException(status_code=400, detail="Invalid block_code format. Expected format: category_block (e.g., 1_1)")
     
     query = "SELECT * FROM questions WHERE category_id = %s AND block_number = %s ORDER BY question_number"
-    results = execute_query(query, (category_id, block_number))
+    results = execute_query(query, (category_id, block_number), allow_replica=False)
     return results
 
 @app.get("/api/questions/{question_code}/options")
-async def get_options_by_question(question_code: str):
+def get_options_by_question(question_code: str):
     """Get options for a specific question"""
     query = "SELECT * FROM options WHERE question_code = %s ORDER BY option_select"
-    results = execute_query(query, (question_code,))
+    results = execute_query(query, (question_code,), allow_replica=False)
     return results
 
+# Users known to have a row in the users table
+known_users = KnownUsers(max_entries=int(os.getenv("KNOWN_USERS_CACHE_SIZE", "50000")))
+
 @app.post("/api/users")
-async def create_user(user: Dict[str, Any]):
+def create_user(body: bytes = Depends(request_body), db: DbSession = Depends(get_db_session)):
     """Create a new user with age validation"""
     try:
-        validated_data = validate_user_request(user)
+        user = validate_user_request(body)
         
         # Validate age (2005-2012)
-        if validated_data['year_of_birth'] < 2005 or validated_data['year_of_birth'] > 2012:
+        if user.year_of_birth < 2005 or user.year_of_birth > 2012:
             raise HTTPException(status_code=400, detail="Invalid year of birth. Must be between 2005-2012.")
         
+        response = {"message": "User created successfully", "user_uuid": user.user_uuid}
+        # Repeat visits from a user whose year this instance already wrote skip the database
+        if known_users.contains(user.user_uuid, with_year=True):
+            return response
+        
+        # Fill in the year of birth for users created lazily by a vote; a row
+        # comes back only when the year was actually written
         query = """
             INSERT INTO users (user_uuid, year_of_birth, created_at)
             VALUES (%s, %s, %s)
-            ON CONFLICT (user_uuid) DO NOTHING
+            ON CONFLICT (user_uuid) DO UPDATE SET year_of_birth = EXCLUDED.year_of_birth
+            WHERE users.year_of_birth IS NULL
+            RETURNING user_uuid
         """
-        execute_query(query, (validated_data['user_uuid'], validated_data['year_of_birth'], datetime.now()), fetch=False)
-        return {"message": "User created successfully", "user_uuid": validated_data['user_uuid']}
+        written = db.execute(query, (user.user_uuid, user.year_of_birth, datetime.now()))
+        if written and VOTE_COUNTER_SHARDS > 0:
+            # Votes counted while the year was unknown move out of year 0 with it
+            db.execute(
+                vote_counters.move_year_sql(VOTE_COUNTER_SHARD_BY, VOTE_COUNTER_SHARDS),
+                vote_counters.move_year_params(VOTE_COUNTER_SHARD_BY, user.user_uuid, user.year_of_birth,
+                                               VOTE_COUNTER_SHARDS),
+                fetch=False,
+            )
+        db.commit()
+        known_users.add(user.user_uuid, with_year=True)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"User creation failed: {e}")
         raise HTTPException(status_code=500, detail="User creation failed")
 
 @app.get("/api/users")
-async def get_users():
+def get_users():
     """Get all users (for debugging)"""
     query = "SELECT user_uuid, year_of_birth, created_at FROM users"
     results = execute_query(query)
     return {"users": results}
 
+@app.get("/api/users/{user_uuid}/progress")
+def get_user_progress(user_uuid: str):
+    """Answered and remaining questions per block, from the user's progress bitmap"""
+    user_uuid = parse_user_uuid(user_uuid)
+    query = "SELECT answered FROM user_progress WHERE user_uuid = %s"
+    # Read from the primary so a vote shows up in the user's progress immediately
+    rows = execute_query(query, (user_uuid,), allow_replica=False)
+    answered = progress.answered_bits(bytes(rows[0]['answered'])) if rows else set()
+    
+    blocks = []
+    for block_code, questions in get_question_index().blocks.items():
+        blocks.append({
+            "block_code": block_code,
+            "answered": [q['question_code'] for q in questions if q['bit'] in answered],
+            "remaining": [q['question_code'] for q in questions if q['bit'] not in answered],
+        })
+    
+    return {
+        "user_uuid": user_uuid,
+        "answered_count": sum(len(block["answered"]) for block in blocks),
+        "total_questions": sum(len(questions) for questions in get_question_index().blocks.values()),
+        "blocks": blocks,
+    }
+
 @app.post("/api/debug/ensure_user")
-async def debug_ensure_user(user_data: Dict[str, Any]):
+def debug_ensure_user(user_data: Dict[str, Any]):
     """Debug endpoint to manually ensure a user exists"""
     try:
         user_uuid = user_data.get('user_uuid')
         if not user_uuid:
             raise HTTPException(status_code=400, detail="user_uuid is required")
+        user_uuid = parse_user_uuid(user_uuid)
         
         # Check current status
         check_query = "SELECT user_uuid, year_of_birth, created_at FROM users WHERE user_uuid = %s"
@@ -360,62 +873,256 @@ async def debug_ensure_user(user_data: Dict[str, Any]):
         logger.error(f"Debug ensure_user failed: {e}")
         raise HTTPException(status_code=500, detail=f"Debug operation failed: {str(e)}")
 
+# Recently completed vote idempotency keys, so retries skip the database
+idempotency_cache = IdempotencyCache(max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")))
+
+# How long stored idempotency keys are kept, and how often (seconds) expired
+# ones are pruned (0 disables pruning)
+IDEMPOTENCY_KEY_RETENTION_DAYS = float(os.getenv("IDEMPOTENCY_KEY_RETENTION_DAYS", "7"))
+IDEMPOTENCY_PRUNE_INTERVAL = float(os.getenv("IDEMPOTENCY_PRUNE_INTERVAL", "3600"))
+
+def idempotency_digest(request: Request, scope: str, user_uuid: str, body_key: Optional[str]) -> Optional[str]:
+    """Resolve the client's idempotency key for this submission, if it sent one"""
+    key = request.headers.get("idempotency-key") or body_key
+    if not key:
+        return None
+    return key_digest(scope, user_uuid, key)
+
+def claim_idempotency_key(db: DbSession, digest: str) -> bool:
+    """Record a key in the request transaction; False if it was already used"""
+    rows = db.execute("""
+        INSERT INTO vote_idempotency_keys (key_hash) VALUES (%s)
+        ON CONFLICT (key_hash) DO NOTHING
+        RETURNING key_hash
+    """, (digest,))
+    return bool(rows)
+
+# How votes are stored: "wide" denormalized tables or "compact" fact tables
+# (after backend/migrate_compact_storage.py cutover)
+STORAGE_MODE = os.getenv("STORAGE_MODE", compact_storage.STORAGE_WIDE)
+storage_keys = compact_storage.StorageKeys()
+
+# Sharded vote counters, kept alongside the response tables (0 shards, the
+# default, disables them; enable after migrate_vote_counters.sql and a rebuild)
+VOTE_COUNTER_SHARDS = int(os.getenv("VOTE_COUNTER_SHARDS", "0"))
+VOTE_COUNTER_SHARD_BY = os.getenv("VOTE_COUNTER_SHARD_BY", vote_counters.SHARD_BY_CONNECTION)
+VOTE_COUNTER_COMPACT_INTERVAL = float(os.getenv("VOTE_COUNTER_COMPACT_INTERVAL", "300"))
+
+# Where /api/results reads tallies from: "raw" response tables, "counters",
+# or the "matview" materialized view
+RESULTS_SOURCE = os.getenv("RESULTS_SOURCE", "raw")
+if RESULTS_SOURCE == "counters" and VOTE_COUNTER_SHARDS <= 0:
+    logger.warning("RESULTS_SOURCE=counters but VOTE_COUNTER_SHARDS is 0; the counters are not being updated")
+
+# Materialized view refresh cadence, and the staleness (seconds) past which
+# /api/results reads the raw tables instead
+RESULTS_MATVIEW_REFRESH_INTERVAL = float(os.getenv("RESULTS_MATVIEW_REFRESH_INTERVAL", "10"))
+RESULTS_MATVIEW_MAX_STALENESS = float(os.getenv("RESULTS_MATVIEW_MAX_STALENESS", "60"))
+
+# Distinct-voter HyperLogLog sketches, flushed to voter_sketches this often
+# (seconds; 0 disables them)
+VOTER_SKETCH_FLUSH_INTERVAL = float(os.getenv("VOTER_SKETCH_FLUSH_INTERVAL", "10"))
+voter_sketch_store = voter_sketches.VoterSketches()
+
+# Sliding-window vote rates behind /api/trending: questions tracked per
+# window slot, and how often (seconds) instances exchange snapshots
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", "256"))
+TRENDING_SNAPSHOT_INTERVAL = float(os.getenv("TRENDING_SNAPSHOT_INTERVAL", str(trending.max_snapshot_interval())))
+vote_rates = trending.VoteRates(capacity=TRENDING_CAPACITY)
+
+def count_votes(db: DbSession, user_uuid: str, rows: List[Tuple[str, str, int, float, int]]):
+    """Add (question_code, option_select, responses, checkbox_weight, other_responses) to the vote counters"""
+    if VOTE_COUNTER_SHARDS <= 0:
+        return
+    db.execute(
+        vote_counters.increment_sql(len(rows), VOTE_COUNTER_SHARD_BY, VOTE_COUNTER_SHARDS),
+        vote_counters.increment_params(rows, VOTE_COUNTER_SHARD_BY, user_uuid, VOTE_COUNTER_SHARDS),
+        fetch=False,
+    )
+
+def prune_idempotency_keys_forever():
+    """Periodically delete idempotency keys older than the retention period"""
+    while True:
+        time.sleep(IDEMPOTENCY_PRUNE_INTERVAL)
+        conn = None
+        try:
+            conn = db_connect()
+            pruned = prune_idempotency_keys(conn, IDEMPOTENCY_KEY_RETENTION_DAYS * 86400)
+            if pruned:
+                logger.info(f"Pruned {pruned} expired idempotency keys")
+        except Exception as e:
+            logger.warning(f"Idempotency key pruning failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+def compact_vote_counters_forever():
+    """Periodically fold the counter shards together so reads stay small"""
+    while True:
+        time.sleep(VOTE_COUNTER_COMPACT_INTERVAL)
+        conn = None
+        try:
+            conn = db_connect()
+            folded = vote_counters.compact(conn)
+            if folded is not None:
+                logger.info(f"Compacted vote counters into {folded} rows")
+        except Exception as e:
+            logger.warning(f"Vote counter compaction failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+def flush_voter_sketches(conn) -> int:
+    """Write this instance's pending voter sketches; they are kept for the next try on failure"""
+    sketches = voter_sketch_store.take()
+    try:
+        return voter_sketches.flush(conn, sketches)
+    except Exception:
+        voter_sketch_store.restore(sketches)
+        raise
+
+def flush_voter_sketches_forever():
+    """Periodically merge the in-memory voter sketches into the database"""
+    while True:
+        time.sleep(VOTER_SKETCH_FLUSH_INTERVAL)
+        conn = None
+        try:
+            conn = db_connect()
+            flush_voter_sketches(conn)
+        except Exception as e:
+            logger.warning(f"Voter sketch flush failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+def snapshot_vote_rates_forever():
+    """Periodically publish this instance's vote rates and pick up the others'"""
+    while True:
+        time.sleep(TRENDING_SNAPSHOT_INTERVAL)
+        conn = None
+        try:
+            conn = db_connect()
+            trending.snapshot(conn, vote_rates, TRENDING_SNAPSHOT_INTERVAL)
+        except Exception as e:
+            logger.warning(f"Vote rate snapshot failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+def refresh_results_view_forever():
+    """Periodically refresh the materialized results view"""
+    while True:
+        conn = None
+        try:
+            conn = db_connect()
+            started = time.monotonic()
+            if results_view.refresh(conn):
+                logger.info(f"Refreshed results view in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logger.warning(f"Results view refresh failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+        time.sleep(RESULTS_MATVIEW_REFRESH_INTERVAL)
+
+def mark_answered(db: DbSession, user_uuid: str, question: Dict[str, Any]):
+    """Set the question's bit in the user's progress bitmap"""
+    db.execute(progress.MARK_ANSWERED_SQL, progress.mark_answered_params(user_uuid, question['bit']), fetch=False)
+
+def count_voter(db: DbSession, user_uuid: str, question: Dict[str, Any]):
+    """Add the user to the question's, block's and category's voter sketches on commit"""
+    if VOTER_SKETCH_FLUSH_INTERVAL > 0:
+        db.on_commit.append(lambda: voter_sketch_store.add(user_uuid, question))
+
+def ensure_user(db: DbSession, user_uuid: str):
+    """Create a missing user lazily inside the vote transaction"""
+    if not known_users.contains(user_uuid):
+        db.execute("""
+            INSERT INTO users (user_uuid, created_at) VALUES (%s, %s)
+            ON CONFLICT (user_uuid) DO NOTHING
+        """, (user_uuid, datetime.now()), fetch=False)
+    db.on_commit.append(lambda: known_users.add(user_uuid))
+
+def notify_tally(db: DbSession, question_code: str):
+    """Tell every instance, on commit, that a question's tally changed, and count the vote as trending"""
+    db.execute(invalidation.NOTIFY_SQL, (invalidation.TALLY_CHANNEL, question_code), fetch=False)
+    db.on_commit.append(lambda: results_cache.invalidate(question_code))
+    db.on_commit.append(lambda: live_results.notify(question_code))
+    db.on_commit.append(lambda: vote_rates.record(question_code))
+
+def require_question(question_code: str) -> Dict[str, Any]:
+    """Look up a question in the in-memory catalog, 404 if it does not exist"""
+    question = get_question_index().question(question_code)
+    if question is None:
+        logger.error(f"Question not found: {question_code}")
+        raise HTTPException(status_code=404, detail="Question not found")
+    return question
+
 @app.post("/api/vote")
-async def vote(vote_data: Dict[str, Any]):
+def vote(request: Request, body: bytes = Depends(request_body), db: DbSession = Depends(get_db_session)):
     """Record a single-choice vote"""
     try:
-        logger.info(f"Received vote request: {vote_data}")
-        
         # Validate vote data
-        validated_data = validate_vote_request(vote_data)
-        
-        # Get question and category details for denormalization
-        question_query = """
-            SELECT q.question_text, q.question_number, c.category_name, c.id as category_id, q.block_number
-            FROM questions q
-            JOIN categories c ON q.category_id = c.id
-            WHERE q.question_code = %s
-        """
-        question_info = execute_query(question_query, (vote_data['question_code'],))
-        
-        if not question_info:
-            logger.error(f"Question not found: {vote_data['question_code']}")
-            raise HTTPException(status_code=404, detail="Question not found")
+        vote_data = validate_vote_request(body)
+        logger.info(f"Received vote request: {vote_data}")
         
-        question = question_info[0]
-        logger.info(f"Question info: {question}")
+        response = {"message": "Vote recorded successfully"}
+        digest = idempotency_digest(request, "vote", vote_data.user_uuid, vote_data.idempotency_key)
+        cached = idempotency_cache.get(digest) if digest else None
+        if cached is not None:
+            return cached
         
-        # Get option details
-        option_query = """
-            SELECT option_text, option_code
-            FROM options
-            WHERE question_code = %s AND option_select = %s
-        """
-        option_info = execute_query(option_query, (vote_data['question_code'], vote_data['option_select']))
+        # Question and option details for denormalization come from the catalog index
+        question = require_question(vote_data.question_code)
+        if question['check_box']:
+            raise HTTPException(status_code=400, detail="Checkbox questions must be answered via /api/checkbox_vote")
         
-        if not option_info:
-            logger.error(f"Option not found: question_code={vote_data['question_code']}, option_select={vote_data['option_select']}")
+        option = get_question_index().option(vote_data.question_code, vote_data.option_select)
+        if option is None:
+            logger.error(f"Option not found: question_code={vote_data.question_code}, option_select={vote_data.option_select}")
             raise HTTPException(status_code=404, detail="Option not found")
         
-        option = option_info[0]
-        logger.info(f"Option info: {option}")
+        if digest and not claim_idempotency_key(db, digest):
+            logger.info(f"Duplicate vote submission ignored for user {vote_data.user_uuid}")
+            idempotency_cache.put(digest, response)
+            return response
         
-        # Insert vote with denormalized data
-        insert_query = """
-            INSERT INTO responses (
-                question_code, option_select, option_code, option_text, user_uuid,
-                question_text, question_number, category_name, category_id, block_number, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        execute_query(insert_query, (
-            vote_data['question_code'], vote_data['option_select'], option['option_code'], option['option_text'],
-            vote_data['user_uuid'], question['question_text'], question['question_number'],
-            question['category_name'], question['category_id'], question['block_number'], datetime.now()
-        ), fetch=False)
+        ensure_user(db, vote_data.user_uuid)
+        
+        if STORAGE_MODE == compact_storage.STORAGE_COMPACT:
+            question_id = storage_keys.question_id(db, question)
+            option_id = storage_keys.option_id(
+                db, question_id, vote_data.option_select, option['option_code'], option['option_text']
+            )
+            db.execute(compact_storage.INSERT_VOTE_SQL, (
+                vote_data.user_uuid, question_id, option_id, question['block_number'], datetime.now()
+            ), fetch=False)
+        else:
+            # Insert vote with denormalized data
+            insert_query = """
+                INSERT INTO responses (
+                    question_code, option_select, option_code, option_text, user_uuid,
+                    question_text, question_number, category_name, category_id, block_number, created_at
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            db.execute(insert_query, (
+                vote_data.question_code, vote_data.option_select, option['option_code'], option['option_text'],
+                vote_data.user_uuid, question['question_text'], question['question_number'],
+                question['category_name'], question['category_id'], question['block_number'], datetime.now()
+            ), fetch=False)
+        count_votes(db, vote_data.user_uuid, [(vote_data.question_code, vote_data.option_select, 1, 0.0, 0)])
         
-        logger.info(f"Vote recorded successfully for user {vote_data['user_uuid']}")
-        return {"message": "Vote recorded successfully"}
+        mark_answered(db, vote_data.user_uuid, question)
+        count_voter(db, vote_data.user_uuid, question)
+        notify_tally(db, vote_data.question_code)
+        db.commit()
+        if digest:
+            idempotency_cache.put(digest, response)
+        logger.info(f"Vote recorded successfully for user {vote_data.user_uuid}")
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Vote recording failed: {e}")
         logger.error(f"Exception type: {type(e)}")
@@ -423,140 +1130,188 @@ async def vote(vote_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail="Vote recording failed")
 
 @app.post("/api/checkbox_vote")
-async def checkbox_vote(vote_data: Dict[str, Any]):
+def checkbox_vote(request: Request, body: bytes = Depends(request_body), db: DbSession = Depends(get_db_session)):
     """Record a checkbox vote with weights"""
     try:
         # Validate vote data
-        validated_data = validate_checkbox_vote_request(vote_data)
-        
-        # Get question and category details for denormalization
-        question_query = """
-            SELECT q.question_text, q.question_number, c.category_name, c.id as category_id, q.block_number, q.max_select
-            FROM questions q
-            JOIN categories c ON q.category_id = c.id
-            WHERE q.question_code = %s
-        """
-        question_info = execute_query(question_query, (vote_data['question_code'],))
+        vote_data = validate_checkbox_vote_request(body)
         
-        if not question_info:
-            raise HTTPException(status_code=404, detail="Question not found")
+        response = {"message": "Checkbox vote recorded successfully"}
+        digest = idempotency_digest(request, "checkbox_vote", vote_data.user_uuid, vote_data.idempotency_key)
+        cached = idempotency_cache.get(digest) if digest else None
+        if cached is not None:
+            return cached
         
-        question = question_info[0]
+        # Question details for denormalization come from the catalog index
+        question = require_question(vote_data.question_code)
+        if not question['check_box']:
+            raise HTTPException(status_code=400, detail="Single-choice questions must be answered via /api/vote")
+        
+        option_selects = vote_data.option_selects
+        if not option_selects:
+            raise HTTPException(status_code=400, detail="At least one option must be selected")
+        if len(set(option_selects)) != len(option_selects):
+            raise HTTPException(status_code=400, detail="Options may only be selected once")
         
         # Validate max_select limit
-        if question['max_select'] and len(vote_data['option_selects']) > question['max_select']:
+        if question['max_select'] and len(option_selects) > question['max_select']:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Too many options selected. Maximum allowed: {question['max_select']}"
             )
         
         # Calculate weight for each option
-        weight = 1.0 / len(vote_data['option_selects'])
+        weight = 1.0 / len(option_selects)
+        created_at = datetime.now()
         
-        # Insert votes for each selected option
-        for option_select in vote_data['option_selects']:
+        rows = []
+        for option_select in option_selects:
             # Handle "OTHER" option specially for checkbox questions
             if option_select == "OTHER":
                 # For "OTHER" in checkbox questions, we need to get the actual text
                 # This should come from the frontend as a separate field
-                other_text = vote_data.get('other_text', 'OTHER')
-                
-                # Insert "OTHER" as a checkbox response with proper weight
-                insert_query = """
-                    INSERT INTO checkbox_responses (
-                        question_code, option_select, option_code, option_text, user_uuid,
-                        question_text, question_number, category_name, category_id, block_number, weight, created_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_query(insert_query, (
-                    vote_data['question_code'], "OTHER", "OTHER", other_text,
-                    vote_data['user_uuid'], question['question_text'], question['question_number'],
-                    question['category_name'], question['category_id'], question['block_number'], weight, datetime.now()
-                ), fetch=False)
+                option_code, option_text = "OTHER", vote_data.other_text or 'OTHER'
             else:
-                # Get option details for regular options
-                option_query = """
-                    SELECT option_text, option_code
-                    FROM options
-                    WHERE question_code = %s AND option_select = %s
-                """
-                option_info = execute_query(option_query, (vote_data['question_code'], option_select))
-                
-                if not option_info:
-                    continue  # Skip invalid options
-                
-                option = option_info[0]
-                
-                # Insert checkbox vote with denormalized data
-                insert_query = """
-                    INSERT INTO checkbox_responses (
-                        question_code, option_select, option_code, option_text, user_uuid,
-                        question_text, question_number, category_name, category_id, block_number, weight, created_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_query(insert_query, (
-                    vote_data['question_code'], option_select, option['option_code'], option['option_text'],
-                    vote_data['user_uuid'], question['question_text'], question['question_number'],
-                    question['category_name'], question['category_id'], question['block_number'], weight, datetime.now()
-                ), fetch=False)
-        
-        return {"message": "Checkbox vote recorded successfully"}
+                option = get_question_index().option(vote_data.question_code, option_select)
+                if option is None:
+                    raise HTTPException(status_code=400, detail=f"Invalid option: {option_select}")
+                option_code, option_text = option['option_code'], option['option_text']
+            rows.append((
+                vote_data.question_code, option_select, option_code, option_text,
+                vote_data.user_uuid, question['question_text'], question['question_number'],
+                question['category_name'], question['category_id'], question['block_number'], weight, created_at
+            ))
+        
+        if digest and not claim_idempotency_key(db, digest):
+            logger.info(f"Duplicate checkbox vote submission ignored for user {vote_data.user_uuid}")
+            idempotency_cache.put(digest, response)
+            return response
+        
+        ensure_user(db, vote_data.user_uuid)
+        
+        if STORAGE_MODE == compact_storage.STORAGE_COMPACT:
+            question_id = storage_keys.question_id(db, question)
+            facts = []
+            for _, option_select, option_code, option_text, *_ in rows:
+                # A checked OTHER box keeps the user's text on the fact, not the option
+                other_text = option_text if option_select == "OTHER" and vote_data.other_text else None
+                if option_select == "OTHER":
+                    option_code = option_text = "OTHER"
+                option_id = storage_keys.option_id(db, question_id, option_select, option_code, option_text)
+                facts.append((
+                    vote_data.user_uuid, question_id, option_id, question['block_number'], weight, other_text, created_at
+                ))
+            db.execute(
+                compact_storage.insert_checkbox_sql(len(facts)),
+                tuple(value for fact in facts for value in fact),
+                fetch=False,
+            )
+        else:
+            # Insert all selected options with denormalized data in one statement
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+            insert_query = f"""
+                INSERT INTO checkbox_responses (
+                    question_code, option_select, option_code, option_text, user_uuid,
+                    question_text, question_number, category_name, category_id, block_number, weight, created_at
+                ) VALUES {placeholders}
+            """
+            db.execute(insert_query, tuple(value for row in rows for value in row), fetch=False)
+        count_votes(db, vote_data.user_uuid, [
+            (vote_data.question_code, option_select, 0, weight, 0) for option_select in option_selects
+        ])
         
+        mark_answered(db, vote_data.user_uuid, question)
+        count_voter(db, vote_data.user_uuid, question)
+        notify_tally(db, vote_data.question_code)
+        db.commit()
+        if digest:
+            idempotency_cache.put(digest, response)
+        return response
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Checkbox vote recording failed: {e}")
         raise HTTPException(status_code=500, detail="Checkbox vote recording failed")
 
 @app.post("/api/other")
-async def submit_other(other_data: Dict[str, Any]):
+def submit_other(request: Request, body: bytes = Depends(request_body), db: DbSession = Depends(get_db_session)):
     """Record a free-text response"""
     try:
         # Validate other data
-        validated_data = validate_other_request(other_data)
-        
-        # Get question and category details for denormalization
-        question_query = """
-            SELECT q.question_text, q.question_number, c.category_name, c.id as category_id, q.block_number
-            FROM questions q
-            JOIN categories c ON q.category_id = c.id
-            WHERE q.question_code = %s
-        """
-        question_info = execute_query(question_query, (other_data['question_code'],))
+        other_data = validate_other_request(body)
         
-        if not question_info:
-            raise HTTPException(status_code=404, detail="Question not found")
+        response = {"message": "Other response recorded successfully"}
+        digest = idempotency_digest(request, "other", other_data.user_uuid, other_data.idempotency_key)
+        cached = idempotency_cache.get(digest) if digest else None
+        if cached is not None:
+            return cached
         
-        question = question_info[0]
+        # Question details for denormalization come from the catalog index
+        question = require_question(other_data.question_code)
         
-        # Insert other response with denormalized data
-        insert_query = """
-            INSERT INTO other_responses (
-                question_code, user_uuid, other_text, question_text, question_number,
-                category_name, category_id, block_number, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        execute_query(insert_query, (
-            other_data['question_code'], other_data['user_uuid'], other_data['other_text'],
-            question['question_text'], question['question_number'], question['category_name'],
-            question['category_id'], question['block_number'], datetime.now()
-        ), fetch=False)
+        if digest and not claim_idempotency_key(db, digest):
+            logger.info(f"Duplicate other response submission ignored for user {other_data.user_uuid}")
+            idempotency_cache.put(digest, response)
+            return response
         
-        return {"message": "Other response recorded successfully"}
+        ensure_user(db, other_data.user_uuid)
+        
+        if STORAGE_MODE == compact_storage.STORAGE_COMPACT:
+            db.execute(compact_storage.INSERT_OTHER_SQL, (
+                other_data.user_uuid, storage_keys.question_id(db, question), question['block_number'],
+                other_data.other_text, datetime.now()
+            ), fetch=False)
+        else:
+            # Insert other response with denormalized data
+            insert_query = """
+                INSERT INTO other_responses (
+                    question_code, user_uuid, other_text, question_text, question_number,
+                    category_name, category_id, block_number, created_at
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            db.execute(insert_query, (
+                other_data.question_code, other_data.user_uuid, other_data.other_text,
+                question['question_text'], question['question_number'], question['category_name'],
+                question['category_id'], question['block_number'], datetime.now()
+            ), fetch=False)
+        count_votes(db, other_data.user_uuid, [(other_data.question_code, 'OTHER', 0, 0.0, 1)])
         
+        mark_answered(db, other_data.user_uuid, question)
+        count_voter(db, other_data.user_uuid, question)
+        notify_tally(db, other_data.question_code)
+        db.commit()
+        if digest:
+            idempotency_cache.put(digest, response)
+        return response
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Other response recording failed: {e}")
         raise HTTPException(status_code=500, detail="Other response recording failed")
 
+def load_soundtrack_index() -> catalog.SoundtrackIndex:
+    """Build the playlist/mood index from the soundtracks table"""
+    query = """
+    SELECT song_id, song_title, mood_tag, playlist_tag, lyrics_snippet, 
+           featured, featured_order, file_url
+    FROM soundtracks 
+    ORDER BY featured_order, song_title
+    """
+    index = catalog.SoundtrackIndex(execute_query(query, allow_replica=False))
+    logger.info(f"Indexed {len(index.songs)} soundtracks across {len(index.by_playlist)} playlists")
+    return index
+
+def get_soundtrack_index() -> catalog.SoundtrackIndex:
+    """Get the soundtrack index for the current catalog version"""
+    return catalog.load("soundtracks", load_soundtrack_index)
+
 @app.get("/api/soundtracks")
-async def get_soundtracks():
-    """Get all soundtracks"""
+def get_soundtracks(playlist: Optional[str] = None, mood: Optional[str] = None):
+    """Get all soundtracks, optionally filtered by playlist and/or mood"""
     try:
-        query = """
-        SELECT song_id, song_title, mood_tag, playlist_tag, lyrics_snippet, 
-               featured, featured_order, file_url
-        FROM soundtracks 
-        ORDER BY featured_order, song_title
-        """
-        results = execute_query(query)
+        results = get_soundtrack_index().filter(playlist=playlist, mood=mood)
         logger.info(f"Retrieved {len(results)} soundtracks")
         return {"soundtracks": results}
     except Exception as e:
@@ -564,112 +1319,247 @@ async def get_soundtracks():
         raise HTTPException(status_code=500, detail=f"Failed to retrieve soundtracks: {str(e)}")
 
 @app.get("/api/soundtracks/playlists")
-async def get_playlists():
+def get_playlists():
     """Get all unique playlists"""
     try:
-        query = """
-        SELECT DISTINCT unnest(string_to_array(playlist_tag, ', ')) as playlist
-        FROM soundtracks 
-        WHERE playlist_tag IS NOT NULL AND playlist_tag != ''
-        ORDER BY playlist
-        """
-        results = execute_query(query)
-        playlists = ['All Songs'] + [r['playlist'] for r in results]
+        playlists = get_soundtrack_index().playlists
         logger.info(f"Retrieved {len(playlists)} playlists")
         return {"playlists": playlists}
     except Exception as e:
         logger.error(f"Error retrieving playlists: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve playlists: {str(e)}")
 
+def compute_results(db: DbSession, question_code: str) -> Optional[Dict[str, Any]]:
+    """Tally a question's votes, or None if the question does not exist"""
+    if RESULTS_SOURCE == "counters":
+        if get_question_index().question(question_code) is None:
+            return None
+        rows = db.execute(vote_counters.RESULTS_SQL, (question_code, question_code))
+        return {"question_code": question_code, "results": vote_counters.merge_counts(rows, keep_zero=True)}
+    
+    if RESULTS_SOURCE == "matview":
+        if get_question_index().question(question_code) is None:
+            return None
+        rows = db.execute(results_view.RESULTS_SQL, (question_code, question_code))
+        payload = results_view.read_results(rows, RESULTS_MATVIEW_MAX_STALENESS)
+        if payload is not None:
+            return {"question_code": question_code, **payload}
+        logger.warning(f"Results view is missing or older than {RESULTS_MATVIEW_MAX_STALENESS}s, reading raw tables")
+    
+    results = results_query.read_results(db.execute(results_query.RESULTS_SQL, (question_code,)))
+    if results is None:
+        return None
+    return {"question_code": question_code, "results": results}
+
+def load_results(question_code: str) -> Optional[Dict[str, Any]]:
+    """Compute results on a private session, for work outside a request
+
+    These results are pushed to every stream subscriber, so they are read from
+    the primary: a lagging replica could send a tally older than the vote that
+    triggered the refresh.
+    """
+    db = DbSession(replica_ok=False)
+    try:
+        return compute_results(db, question_code)
+    finally:
+        db.close()
+
+# One aggregator per watched question feeds every live results stream
+live_results = LiveResultsHub(
+    load_results,
+    notifications_trusted=lambda: invalidation_bus.listening,
+    min_interval=float(os.getenv("RESULTS_STREAM_MIN_INTERVAL", "1")),
+    poll_interval=float(os.getenv("RESULTS_STREAM_POLL_INTERVAL", "5")),
+)
+invalidation_bus.subscribe(invalidation.TALLY_CHANNEL, live_results.notify)
+
+# Seconds between disconnect checks on an idle stream, and between keep-alive comments
+STREAM_DISCONNECT_POLL_INTERVAL = 1.0
+STREAM_KEEPALIVE_INTERVAL = 15.0
+
 @app.get("/api/results/{question_code}")
-async def get_results(question_code: str):
+def get_results(question_code: str, db: DbSession = Depends(get_db_session)):
     """Get results for a specific question"""
     try:
-        # Check if it's a checkbox question by looking at the question type
-        question_query = "SELECT * FROM questions WHERE question_code = %s"
-        question_info = execute_query(question_query, (question_code,))
+        # Cached results are only trusted while votes from other instances invalidate
+        # them; view results are not cached because their staleness keeps growing
+        cacheable = invalidation_bus.listening and RESULTS_SOURCE != "matview"
+        # A cached tally must include every vote before the invalidation that
+        # bumped the generation, which a lagging replica cannot promise
+        db.replica_ok = not cacheable
+        generation = results_cache.generation(question_code)
+        if cacheable:
+            cached = results_cache.get(question_code)
+            if cached is not None:
+                return cached
         
-        if not question_info:
+        payload = compute_results(db, question_code)
+        if payload is None:
             raise HTTPException(status_code=404, detail="Question not found")
+        if cacheable:
+            results_cache.put(question_code, generation, payload)
+        return payload
         
-        question = question_info[0]
-        
-        # For now, assume all questions can have both types of responses
-        # Get single-choice responses
-        single_query = """
-            SELECT option_select, COUNT(*) as count
-            FROM responses
-            WHERE question_code = %s
-            GROUP BY option_select
-            ORDER BY option_select
-        """
-        single_results = execute_query(single_query, (question_code,))
-        
-        # Get checkbox responses (sum of weights)
-        checkbox_query = """
-            SELECT option_select, SUM(weight) as count
-            FROM checkbox_responses
-            WHERE question_code = %s
-            GROUP BY option_select
-            ORDER BY option_select
-        """
-        checkbox_results = execute_query(checkbox_query, (question_code,))
-        
-        # Get OTHER responses with proper weighting
-        other_query = """
-            SELECT COUNT(*) as count
-            FROM other_responses
-            WHERE question_code = %s
-        """
-        other_results = execute_query(other_query, (question_code,))
-        
-        # Combine results
-        all_results = {}
-        
-        # Add single-choice results
-        for result in single_results:
-            option = result['option_select']
-            if option in all_results:
-                all_results[option]['count'] += result['count']
-            else:
-                all_results[option] = {'option_select': option, 'count': result['count']}
-        
-        # Add checkbox results
-        for result in checkbox_results:
-            option = result['option_select']
-            if option in all_results:
-                all_results[option]['count'] += result['count']
-            else:
-                all_results[option] = {'option_select': option, 'count': result['count']}
-        
-        # Add OTHER responses with proper weighting
-        if other_results and other_results[0]['count'] > 0:
-            other_count = other_results[0]['count']
-            # For OTHER responses, we need to check if they came from checkbox questions
-            # and apply the same weighting logic
-            if 'OTHER' in all_results:
-                # If OTHER already exists from checkbox votes, don't double-count
-                # The checkbox_responses already includes the properly weighted OTHER votes
-                pass
-            else:
-                # If OTHER only exists from "other" responses, treat as single choice (full vote)
-                all_results['OTHER'] = {'option_select': 'OTHER', 'count': other_count}
-        
-        # Convert to list and sort
-        final_results = list(all_results.values())
-        final_results.sort(key=lambda x: x['option_select'])
-        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching results: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching results")
+
+def results_by_age(question_codes: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Per-year results for questions known to exist, from the counters while they are kept"""
+    query, params = age_results.query(VOTE_COUNTER_SHARDS > 0, question_codes)
+    return age_results.read_by_age(question_codes, execute_query(query, params))
+
+@app.get("/api/results/{question_code}/by_age")
+def get_results_by_age(question_code: str):
+    """Get results for a question split by the voters' year of birth"""
+    try:
+        if get_question_index().question(question_code) is None:
+            raise HTTPException(status_code=404, detail="Question not found")
+        by_age = results_by_age([question_code])
+        return {"question_code": question_code, "by_age": by_age[question_code]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching results by age: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching results")
+
+@app.get("/api/blocks/{block_code}/results/by_age")
+def get_block_results_by_age(block_code: str):
+    """Get results for every question in a block split by the voters' year of birth"""
+    try:
+        questions = get_question_index().blocks.get(block_code)
+        if questions is None:
+            raise HTTPException(status_code=404, detail="Block not found")
+        codes = [q['question_code'] for q in questions]
+        by_age = results_by_age(codes)
         return {
-            "question_code": question_code,
-            "results": final_results
+            "block_code": block_code,
+            "questions": [{"question_code": code, "by_age": by_age[code]} for code in codes],
         }
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching results: {e}")
+        logger.error(f"Error fetching block results by age: {e}")
         raise HTTPException(status_code=500, detail="Error fetching results")
 
+def distinct_voters(scope: str, scope_key: str, days: Optional[int]) -> Dict[str, Any]:
+    """Distinct-voter estimate for one sketch scope, over the last `days` UTC days or all time"""
+    if days is not None and days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
+    since = voter_sketches.today() - timedelta(days=days - 1) if days else date.min
+    rows = execute_query(voter_sketches.READ_SQL, (scope, scope_key, since))
+    unflushed = voter_sketch_store.unflushed(scope, scope_key, since)
+    return {
+        "distinct_voters": voter_sketches.estimate(rows, unflushed),
+        "standard_error": round(voter_sketches.STANDARD_ERROR, 4),
+        "days": days,
+    }
+
+@app.get("/api/results/{question_code}/voters")
+def get_question_voters(question_code: str, days: Optional[int] = None):
+    """Estimated number of distinct users who answered a question"""
+    try:
+        require_question(question_code)
+        return {"question_code": question_code,
+                **distinct_voters(voter_sketches.SCOPE_QUESTION, question_code, days)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error estimating voters: {e}")
+        raise HTTPException(status_code=500, detail="Error estimating voters")
+
+@app.get("/api/blocks/{block_code}/voters")
+def get_block_voters(block_code: str, days: Optional[int] = None):
+    """Estimated number of distinct users who answered any question in a block"""
+    try:
+        if block_code not in get_question_index().blocks:
+            raise HTTPException(status_code=404, detail="Block not found")
+        return {"block_code": block_code, **distinct_voters(voter_sketches.SCOPE_BLOCK, block_code, days)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error estimating voters: {e}")
+        raise HTTPException(status_code=500, detail="Error estimating voters")
+
+@app.get("/api/categories/{category_id}/voters")
+def get_category_voters(category_id: int, days: Optional[int] = None):
+    """Estimated number of distinct users who answered any question in a category"""
+    try:
+        if not any(q['category_id'] == category_id for q in get_question_index().questions.values()):
+            raise HTTPException(status_code=404, detail="Category not found")
+        return {"category_id": category_id,
+                **distinct_voters(voter_sketches.SCOPE_CATEGORY, str(category_id), days)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error estimating voters: {e}")
+        raise HTTPException(status_code=500, detail="Error estimating voters")
+
+@app.get("/api/trending")
+def get_trending(window: str = "15m", limit: int = 10):
+    """Questions with the most votes over the last minute, 15 minutes or hour"""
+    if window not in trending.WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(trending.WINDOWS)}")
+    if limit < 1 or limit > TRENDING_CAPACITY:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {TRENDING_CAPACITY}")
+    
+    index = get_question_index()
+    questions = []
+    for question_code, votes in vote_rates.trending(window, limit):
+        question = index.question(question_code)
+        if question is None:
+            continue
+        questions.append({
+            "question_code": question_code,
+            "question_text": question['question_text'],
+            "block_code": f"{question['category_id']}_{question['block_number']}",
+            "votes": votes,
+        })
+    return {"window": window, "questions": questions}
+
+@app.get("/api/results/{question_code}/stream")
+async def stream_results(question_code: str, request: Request):
+    """Push live results for a question as Server-Sent Events
+
+    The first event is a full snapshot; later "update" events carry only the
+    options whose counts changed.
+    """
+    # A cold catalog index loads from the database, so look it up off the loop
+    await run_in_threadpool(require_question, question_code)
+
+    async def events():
+        # Subscribe only once the response is streaming, so a client that is
+        # gone before then never leaves an aggregator running
+        aggregator = live_results.aggregator(question_code)
+        queue = aggregator.subscribe()
+        loop = asyncio.get_running_loop()
+        try:
+            yield "retry: 3000\n\n"
+            last_sent = loop.time()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=STREAM_DISCONNECT_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    if loop.time() - last_sent < STREAM_KEEPALIVE_INTERVAL:
+                        continue
+                    message = ": keep-alive\n\n"
+                yield message
+                last_sent = loop.time()
+        finally:
+            aggregator.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/api/import_data")
-async def import_data():
+def import_data():
     """Import CSV data to the current database"""
     try:
         logger.info("🔄 Starting data import...")
@@ -679,6 +1569,7 @@ async def import_data():
         
         # Run the import
         import_to_render()
+        catalog_changed()
         
         return {"message": "Data import completed successfully"}
         
@@ -687,7 +1578,7 @@ async def import_data():
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
 
 @app.post("/api/setup")
-async def setup_database():
+def setup_database():
     """Setup database with initial data (categories, blocks, questions, options)"""
     try:
         logger.info("🔄 Starting database setup...")
@@ -707,7 +1598,8 @@ async def setup_database():
             return value
         
         # Get database connection
-        conn = get_db_connection()
+        pool = current_pool()
+        conn = pool.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -815,6 +1707,7 @@ async def setup_database():
             
             # Commit all changes
             conn.commit()
+            catalog_changed()
             logger.info("🎉 Database setup completed successfully!")
             
             return {
@@ -834,7 +1727,7 @@ async def setup_database():
             raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
         finally:
             cursor.close()
-            conn.close()
+            pool.return_connection(conn)
             
     except Exception as e:
         logger.error(f"❌ Setup endpoint error: {e}")
@@ -0,0 +1,301 @@
+"""
+Minimal Prometheus-style metrics for the My World My Say API.
+
+Metrics live in a process-wide registry and are rendered in the Prometheus
+text exposition format by the /metrics endpoint. Per-request database
+statistics (round trips, pool wait, SQL time, rows) are accumulated in a
+context variable by execute_query and folded into per-route histograms when
+the request finishes.
+"""
+
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for labelled metrics"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            items = sorted(self.callback().items())
+        else:
+            with self.lock:
+                items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    """Cumulative bucketed observations with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            # One slot per bucket, then sum and count
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, list(state)) for key, state in self.values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests_total = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_request_duration_seconds = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_request_db_round_trips = REGISTRY.register(Histogram(
+    "http_request_db_round_trips", "Database round trips per request", ("route",), COUNT_BUCKETS))
+http_request_db_pool_wait_seconds = REGISTRY.register(Histogram(
+    "http_request_db_pool_wait_seconds", "Time per request spent waiting for a pooled connection", ("route",)))
+http_request_db_query_seconds = REGISTRY.register(Histogram(
+    "http_request_db_query_seconds", "Time per request spent executing SQL", ("route",)))
+http_request_db_rows = REGISTRY.register(Histogram(
+    "http_request_db_rows", "Rows returned by the database per request", ("route",), ROW_BUCKETS))
+
+
+class RequestStats:
+    """Database work done on behalf of one HTTP request"""
+
+    __slots__ = ("db_round_trips", "pool_wait_seconds", "db_seconds", "rows")
+
+    def __init__(self):
+        self.db_round_trips = 0
+        self.pool_wait_seconds = 0.0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def start_request() -> RequestStats:
+    """Begin collecting database statistics for the current request"""
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def record_pool_wait(seconds: float):
+    """Record time spent waiting for a pooled connection"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def record_query(seconds: float, rows: int):
+    """Record one SQL round trip and the rows it returned"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_round_trips += 1
+        stats.db_seconds += seconds
+        stats.rows += rows
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    """Fold a finished request into the per-route metrics"""
+    http_requests_total.inc(method=method, route=route, status=str(status))
+    http_request_duration_seconds.observe(seconds, method=method, route=route)
+    http_request_db_round_trips.observe(stats.db_round_trips, route=route)
+    http_request_db_pool_wait_seconds.observe(stats.pool_wait_seconds, route=route)
+    http_request_db_query_seconds.observe(stats.db_seconds, route=route)
+    http_request_db_rows.observe(stats.rows, route=route)
+
+
+# Connection pool instrumentation. Pools register themselves with track_pool
+# and expose a stats() dict; gauges are read from it at scrape time.
+_pools = []
+
+db_pool_acquire_wait_seconds = REGISTRY.register(Histogram(
+    "db_pool_acquire_wait_seconds", "Time spent acquiring a pooled connection", ("pool",)))
+db_pool_timeouts_total = REGISTRY.register(Counter(
+    "db_pool_timeouts_total", "Connection acquisitions that timed out", ("pool",)))
+db_pool_connections_created_total = REGISTRY.register(Counter(
+    "db_pool_connections_created_total", "Connections opened by the pool", ("pool",)))
+db_pool_connections_closed_total = REGISTRY.register(Counter(
+    "db_pool_connections_closed_total", "Connections closed by the pool", ("pool",)))
+
+
+def _pool_gauge(field: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    return lambda: {(pool.name,): pool.stats()[field] for pool in list(_pools)}
+
+
+for _field, _documentation in (
+    ("max_connections", "Configured pool size"),
+    ("in_use", "Connections checked out of the pool"),
+    ("idle", "Open connections waiting in the pool"),
+    ("waiting", "Threads waiting for a connection"),
+):
+    REGISTRY.register(Gauge(f"db_pool_{_field}", _documentation, ("pool",), callback=_pool_gauge(_field)))
+
+
+def track_pool(pool):
+    """Expose a connection pool's live gauges through /metrics"""
+    _pools.append(pool)
+
+
+# Admission control instrumentation, read from each lane's controller
+_admission = []
+
+http_requests_shed_total = REGISTRY.register(Counter(
+    "http_requests_shed_total", "Requests rejected with 503 by admission control", ("lane", "reason")))
+
+
+def _admission_gauge(field: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    return lambda: {(controller.name,): controller.stats()[field] for controller in list(_admission)}
+
+
+for _field, _documentation in (
+    ("in_flight", "Requests holding an admission slot"),
+    ("queued", "Requests waiting for an admission slot"),
+    ("service_seconds", "Recent mean time a request holds its admission slot"),
+):
+    REGISTRY.register(Gauge(f"admission_{_field}", _documentation, ("lane",), callback=_admission_gauge(_field)))
+
+
+def track_admission(controller):
+    """Expose a lane's admission state through /metrics"""
+    _admission.append(controller)
+
+
+# Read replica instrumentation
+_replicas = []
+
+db_replica_lag_seconds = REGISTRY.register(Gauge(
+    "db_replica_lag_seconds", "Last measured replication lag (-1 if unreachable)",
+    callback=lambda: {(): (-1 if r.lag_seconds is None else r.lag_seconds) for r in list(_replicas)}))
+db_replica_healthy = REGISTRY.register(Gauge(
+    "db_replica_healthy", "1 while reads are routed to the replica",
+    callback=lambda: {(): (1 if r.healthy else 0) for r in list(_replicas)}))
+
+
+def track_replica(router):
+    """Expose the read replica's lag and routing state through /metrics"""
+    _replicas.append(router)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Move the response tables to compact storage (see compact_storage.py).
+
+Run database-scripts/migrate_compact_storage.sql first, then:
+
+    copy     Copy the wide tables into the fact tables in id batches, one
+             transaction per batch. Safe while the API is live and
+             resumable: each run continues after the highest id already
+             copied.
+    cutover  With the API stopped, lock the wide tables, copy whatever
+             arrived since the last copy, rename them to *_wide and create
+             the compatibility views in their place (results_mv is rebuilt
+             on top of the views if it exists). Start the API again with
+             STORAGE_MODE=compact.
+    measure  Print on-disk size and a warm full-scan aggregate time for the
+             wide tables, the fact tables and the views, for before/after
+             comparisons.
+
+The *_wide tables are left in place; drop them once the views have been
+checked.
+
+Usage:
+    python backend/migrate_compact_storage.py copy [batch_size]
+    python backend/migrate_compact_storage.py cutover
+    python backend/migrate_compact_storage.py measure
+"""
+
+import sys
+import time
+
+from db_config import connect
+import compact_storage
+import results_view
+
+WIDE_TABLES = list(compact_storage.FACT_TABLES)
+
+
+def wide_table(cursor, table: str) -> str:
+    """The wide table's current name: itself before cutover, *_wide after"""
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"{table}_wide",))
+    return f"{table}_wide" if cursor.fetchone()[0] else table
+
+
+def copied_through(cursor, table: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {compact_storage.FACT_TABLES[table]}")
+    return cursor.fetchone()[0]
+
+
+def copy_table(conn, table: str, batch_size: int) -> int:
+    """Copy every row of one wide table that is not in its fact table yet"""
+    cursor = conn.cursor()
+    # Leave the last minute for cutover: ids are handed out before commit, so
+    # a recent vote can still commit after a later id has been copied
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table} WHERE created_at < now() - interval '1 minute'")
+    high = cursor.fetchone()[0]
+    low = copied_through(cursor, table)
+    total = 0
+    started = time.time()
+    while low < high:
+        upper = min(low + batch_size, high)
+        total += compact_storage.copy_range(cursor, table, table, low, upper)
+        conn.commit()
+        low = upper
+        elapsed = time.time() - started
+        print(f"📦 {table}: copied through id {low:,} of {high:,} ({total:,} rows, {total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total
+
+
+def copy(batch_size=50000):
+    """Copy the wide tables into the fact tables, batch by batch"""
+    conn = connect()
+    print("✅ Connected")
+    for table in WIDE_TABLES:
+        if wide_table(conn.cursor(), table) != table:
+            print(f"⚠️  {table} has already been cut over")
+            continue
+        copy_table(conn, table, batch_size)
+    conn.close()
+    print("🎉 Copy finished; run cutover with the API stopped")
+
+
+def cutover():
+    """Swap the compatibility views in for the wide tables in one transaction"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+
+    started = time.time()
+    cursor.execute("LOCK TABLE responses, checkbox_responses, other_responses IN EXCLUSIVE MODE")
+    for table in WIDE_TABLES:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        high = cursor.fetchone()[0]
+        rows = compact_storage.copy_range(cursor, table, table, copied_through(cursor, table), high)
+        print(f"📦 {table}: copied {rows:,} remaining rows")
+
+    cursor.execute("SELECT to_regclass('results_mv') IS NOT NULL")
+    had_results_view = cursor.fetchone()[0]
+    if had_results_view:
+        cursor.execute("DROP MATERIALIZED VIEW results_mv")
+
+    for table in WIDE_TABLES:
+        facts = compact_storage.FACT_TABLES[table]
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_wide")
+        cursor.execute(compact_storage.VIEWS_SQL[table])
+        # New votes continue the wide table's ids
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{facts}', 'id'), GREATEST(MAX(id), 1)) FROM {facts}")
+
+    if had_results_view:
+        cursor.execute(results_view.CREATE_SQL)
+        cursor.execute(results_view.CREATE_INDEX_SQL)
+        print("📊 Rebuilt results_mv on the compatibility views")
+
+    conn.commit()
+    conn.close()
+    print(f"🎉 Cut over in {time.time() - started:.1f}s; start the API with STORAGE_MODE=compact")
+
+
+def measure():
+    """Compare on-disk size and full-scan aggregate time, wide vs compact"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+
+    # Compare heap scans: after a vacuum the wide tables' question_code index
+    # answers the aggregate index-only, which would measure the index instead
+    cursor.execute("SET LOCAL enable_indexscan = off")
+    cursor.execute("SET LOCAL enable_indexonlyscan = off")
+    cursor.execute("SET LOCAL enable_bitmapscan = off")
+
+    print(f"{'table':>26} {'size MB':>10} {'rows':>12} {'scan ms':>10}")
+    for table in WIDE_TABLES:
+        facts = compact_storage.FACT_TABLES[table]
+        wide = wide_table(cursor, table)
+        sizes = compact_storage.relation_sizes(cursor, [wide, facts])
+        scans = [
+            (wide, f"SELECT question_code, COUNT(*) FROM {wide} GROUP BY question_code"),
+            (facts, f"SELECT question_id, COUNT(*) FROM {facts} GROUP BY question_id"),
+        ]
+        if wide != table:
+            # The same aggregate through the compatibility view
+            scans.append((f"{table} (view)", f"SELECT question_code, COUNT(*) FROM {table} GROUP BY question_code"))
+        for name, query in scans:
+            # Also loads the relation into cache, so every scan is timed warm
+            cursor.execute(f"SELECT COUNT(*) FROM {name.split()[0]}")
+            rows = cursor.fetchone()[0]
+            cursor.execute(query)
+            cursor.fetchall()
+            started = time.perf_counter()
+            cursor.execute(query)
+            cursor.fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+            size = sizes.get(name)
+            size_text = f"{size / 1024 / 1024:.1f}" if size is not None else "-"
+            print(f"{name:>26} {size_text:>10} {rows:>12,} {elapsed:>10.1f}")
+    conn.rollback()
+    conn.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "copy":
+        copy(int(sys.argv[2]) if len(sys.argv) > 2 else 50000)
+    elif command == "cutover":
+        cutover()
+    elif command == "measure":
+        measure()
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Convert every TEXT user_uuid column to native uuid, online.
+
+Works on each table in the current schema that has a TEXT user_uuid column
+(users, the response tables or the compact fact tables, user_progress).
+The steps are:
+
+    check     Count users.user_uuid values that are not valid UUIDs; they
+              must be fixed or deleted before converting.
+    prepare   Add a nullable user_uuid_native column (instant), plus a
+              trigger that fills it for new and updated rows.
+    backfill  Fill user_uuid_native for existing rows in key-range batches,
+              one transaction per batch, then build a copy of every
+              user_uuid index on the new column with CREATE INDEX
+              CONCURRENTLY and prove it NOT NULL with a validated CHECK.
+              Safe while the API is live, and resumable.
+    swap      In one short transaction: drop the foreign keys to
+              users(user_uuid), drop the TEXT column, rename the uuid one
+              into its place, turn the copied indexes back into the
+              original indexes and constraints, and re-add the foreign keys
+              as NOT VALID. The compact storage views (and results_mv) are
+              recreated if they exist. Then each foreign key is validated
+              without blocking writes.
+
+The API accepts only canonical UUIDs from the boundary on, and sends
+user_uuid as untyped text, so it works against either column type
+throughout. Deploy that first, then run the steps in order. user_uuid moves
+to the last column of each table.
+
+Usage:
+    python backend/migrate_uuid_storage.py check|prepare|swap
+    python backend/migrate_uuid_storage.py backfill [batch_size]
+"""
+
+import re
+import sys
+import time
+from typing import List, Tuple
+
+from db_config import connect
+import compact_storage
+import results_view
+
+NATIVE = "user_uuid_native"
+NOT_NULL_CHECK = "user_uuid_native_not_null"
+
+INVALID_UUIDS_SQL = r"""
+    SELECT COUNT(*) FROM users
+    WHERE user_uuid !~ '^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$'
+"""
+
+SYNC_FUNCTION_SQL = f"""
+    CREATE OR REPLACE FUNCTION sync_user_uuid_native() RETURNS trigger AS $$
+    BEGIN
+        NEW.{NATIVE} := NEW.user_uuid::uuid;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+# Tables still holding a TEXT user_uuid; users first so it is converted
+# before the tables that reference it
+TEXT_TABLES_SQL = """
+    SELECT c.table_name FROM information_schema.columns c
+    JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+    WHERE c.table_schema = current_schema() AND c.column_name = 'user_uuid'
+      AND c.data_type = 'text' AND t.table_type = 'BASE TABLE'
+    ORDER BY c.table_name <> 'users', c.table_name
+"""
+
+# Indexes on the TEXT column, with the constraint each one backs (if any)
+USER_UUID_INDEXES_SQL = """
+    SELECT i.relname, pg_get_indexdef(i.oid), con.conname, con.contype
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attname = 'user_uuid'
+    LEFT JOIN pg_constraint con ON con.conindid = i.oid AND con.contype IN ('p', 'u')
+    WHERE x.indrelid = to_regclass(%s) AND a.attnum = ANY(x.indkey)
+"""
+
+FOREIGN_KEYS_SQL = """
+    SELECT con.conrelid::regclass::text, con.conname, pg_get_constraintdef(con.oid)
+    FROM pg_constraint con
+    WHERE con.contype = 'f' AND con.confrelid = to_regclass('users')
+      AND pg_get_constraintdef(con.oid) LIKE '%%(user_uuid)%%'
+"""
+
+
+def text_tables(cursor) -> List[str]:
+    cursor.execute(TEXT_TABLES_SQL)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def native_index_name(name: str) -> str:
+    return f"{name[:56]}_native"
+
+
+def native_indexes(cursor, table: str) -> List[Tuple[str, str, str, str]]:
+    """(original index, CREATE INDEX for its uuid copy, constraint name, constraint type)"""
+    cursor.execute(USER_UUID_INDEXES_SQL, (table,))
+    indexes = []
+    for name, definition, constraint, constraint_type in cursor.fetchall():
+        unique = "UNIQUE " if definition.startswith("CREATE UNIQUE") else ""
+        target = re.sub(r"\buser_uuid\b", NATIVE, definition.split(" ON ", 1)[1])
+        create = f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {native_index_name(name)} ON {target}"
+        indexes.append((name, create, constraint, constraint_type))
+    return indexes
+
+
+def check():
+    """Report user_uuid values that cannot be cast to uuid"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+    cursor.execute(INVALID_UUIDS_SQL)
+    invalid = cursor.fetchone()[0]
+    print(f"📋 Tables to convert: {', '.join(text_tables(cursor)) or 'none'}")
+    if invalid:
+        print(f"❌ {invalid} users have a user_uuid that is not a UUID")
+        sys.exit(1)
+    print("🎉 Every user_uuid is a valid UUID")
+    conn.close()
+
+
+def prepare():
+    """Add the uuid shadow column and the trigger that keeps it filled"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+    cursor.execute(SYNC_FUNCTION_SQL)
+    for table in text_tables(cursor):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {NATIVE} uuid")
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_user_uuid_native ON {table}")
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_sync_user_uuid_native BEFORE INSERT OR UPDATE OF user_uuid ON {table}
+            FOR EACH ROW EXECUTE FUNCTION sync_user_uuid_native()
+        """)
+        print(f"📐 {table}: added {NATIVE}")
+    conn.commit()
+    conn.close()
+
+
+def backfill_table(conn, table: str, batch_size: int):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+        "AND table_name = %s AND column_name = 'id'", (table,)
+    )
+    # user_progress has no id; its primary key is user_uuid itself
+    key = "id" if cursor.fetchone() else "user_uuid"
+    last = None
+    total = 0
+    started = time.time()
+    while True:
+        where = f"WHERE {key} > %s" if last is not None else ""
+        cursor.execute(
+            f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} {where} ORDER BY {key} LIMIT %s) batch",
+            ((last,) if last is not None else ()) + (batch_size,),
+        )
+        upper = cursor.fetchone()[0]
+        if upper is None:
+            break
+        lower_bound = f"{key} > %s AND " if last is not None else ""
+        cursor.execute(
+            f"UPDATE {table} SET {NATIVE} = user_uuid::uuid WHERE {lower_bound}{key} <= %s AND {NATIVE} IS NULL",
+            ((last,) if last is not None else ()) + (upper,),
+        )
+        total += cursor.rowcount
+        conn.commit()
+        last = upper
+        print(f"📦 {table}: {total:,} rows filled ({total / max(time.time() - started, 1e-9):,.0f} rows/s)")
+
+
+def backfill(batch_size=20000):
+    """Fill the uuid columns, then build their indexes and NOT NULL proof online"""
+    conn = connect()
+    print("✅ Connected")
+    tables = text_tables(conn.cursor())
+    for table in tables:
+        backfill_table(conn, table, batch_size)
+
+    # CREATE INDEX CONCURRENTLY and VALIDATE must run outside a transaction block
+    conn.autocommit = True
+    cursor = conn.cursor()
+    for table in tables:
+        for name, create, _, _ in native_indexes(cursor, table):
+            started = time.time()
+            cursor.execute(create)
+            print(f"🗂️  {table}: built {native_index_name(name)} in {time.time() - started:.1f}s")
+        cursor.execute(
+            "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s", (table, NOT_NULL_CHECK)
+        )
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {NOT_NULL_CHECK} CHECK ({NATIVE} IS NOT NULL) NOT VALID")
+        cursor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {NOT_NULL_CHECK}")
+    conn.close()
+    print("🎉 Backfill finished; run swap")
+
+
+def swap():
+    """Replace the TEXT columns with the uuid ones in one transaction"""
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+
+    started = time.time()
+    tables = text_tables(cursor)
+    plans = {table: native_indexes(cursor, table) for table in tables}
+    for table, plan in plans.items():
+        for name, _, _, _ in plan:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (native_index_name(name),))
+            if not cursor.fetchone()[0]:
+                print(f"❌ {native_index_name(name)} is missing on {table}; run backfill first")
+                sys.exit(1)
+    cursor.execute(FOREIGN_KEYS_SQL)
+    foreign_keys = cursor.fetchall()
+    cursor.execute("SELECT table_name FROM information_schema.views WHERE table_schema = current_schema()")
+    compact_views = [name for (name,) in cursor.fetchall() if name in compact_storage.VIEWS_SQL]
+    cursor.execute("SELECT to_regclass('results_mv') IS NOT NULL")
+    rebuild_results_view = bool(compact_views) and cursor.fetchone()[0]
+
+    # The compact views (and results_mv on top of them) depend on the column
+    if rebuild_results_view:
+        cursor.execute("DROP MATERIALIZED VIEW results_mv")
+    for view in compact_views:
+        cursor.execute(f"DROP VIEW {view}")
+    for table, name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+
+    for table in tables:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_user_uuid_native ON {table}")
+        cursor.execute(f"ALTER TABLE {table} DROP COLUMN user_uuid")
+        cursor.execute(f"ALTER TABLE {table} RENAME COLUMN {NATIVE} TO user_uuid")
+        # Instant: the validated CHECK already proves there are no NULLs
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN user_uuid SET NOT NULL")
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {NOT_NULL_CHECK}")
+        for name, _, constraint, constraint_type in plans[table]:
+            native = native_index_name(name)
+            if constraint:
+                # Renames the index to the constraint's name
+                kind = "PRIMARY KEY" if constraint_type == "p" else "UNIQUE"
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} {kind} USING INDEX {native}")
+            else:
+                cursor.execute(f"ALTER INDEX {native} RENAME TO {name}")
+        print(f"🔁 {table}: user_uuid is now uuid")
+
+    for table, name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID")
+    for view in compact_views:
+        cursor.execute(compact_storage.VIEWS_SQL[view])
+    if rebuild_results_view:
+        cursor.execute(results_view.CREATE_SQL)
+        cursor.execute(results_view.CREATE_INDEX_SQL)
+    conn.commit()
+    print(f"🎉 Swapped {len(tables)} tables in {time.time() - started:.1f}s")
+
+    # Checks existing rows under a lock that lets votes keep flowing
+    for table, name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+        conn.commit()
+        print(f"✅ Validated {table}.{name}")
+    cursor.execute("DROP FUNCTION IF EXISTS sync_user_uuid_native()")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "check":
+        check()
+    elif command == "prepare":
+        prepare()
+    elif command == "backfill":
+        backfill(int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    elif command == "swap":
+        swap()
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,76 @@
+"""
+Per-user answered-question bitmaps.
+
+Each user's progress is one bytea row in user_progress, with bit n set once
+the user has answered the question that question_bits maps to n.
+questions.id cannot be used: /api/setup drops and recreates the questions
+table, renumbering it. question_bits lives with the results tables and is
+only ever appended to, so a question_code keeps its bit across catalog
+reloads. ASSIGN_BITS_SQL gives new codes the next bits when the catalog
+is loaded.
+
+Bits follow PostgreSQL's set_bit/get_bit numbering: bit n lives in byte
+n // 8 at position n % 8, least significant bit first.
+"""
+
+from typing import Iterable, Set, Tuple
+
+# Give every catalog question without a bit the next one; codes that lost
+# a race to another instance are skipped by ON CONFLICT
+ASSIGN_BITS_SQL = """
+    INSERT INTO question_bits (question_code)
+    SELECT q.question_code FROM questions q
+    WHERE NOT EXISTS (SELECT 1 FROM question_bits b WHERE b.question_code = q.question_code)
+    ORDER BY q.id
+    ON CONFLICT (question_code) DO NOTHING
+"""
+
+# Upsert that sets one bit, growing the bitmap with zero bytes when needed
+MARK_ANSWERED_SQL = """
+    INSERT INTO user_progress (user_uuid, answered, updated_at)
+    VALUES (%s, set_bit(decode(repeat('00', %s), 'hex'), %s, 1), CURRENT_TIMESTAMP)
+    ON CONFLICT (user_uuid) DO UPDATE SET
+        answered = set_bit(
+            user_progress.answered || decode(repeat('00', GREATEST(%s - length(user_progress.answered), 0)), 'hex'),
+            %s, 1
+        ),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def mark_answered_params(user_uuid: str, bit: int) -> Tuple:
+    """Parameters for MARK_ANSWERED_SQL"""
+    size = bit // 8 + 1
+    return (user_uuid, size, bit, size, bit)
+
+
+def answered_bits(bitmap: bytes) -> Set[int]:
+    """Decode a bitmap into the set of answered question bits"""
+    bits = set()
+    for byte_index, byte in enumerate(bitmap):
+        while byte:
+            low_bit = byte & -byte
+            bits.add(byte_index * 8 + low_bit.bit_length() - 1)
+            byte ^= low_bit
+    return bits
+
+
+def encode(bits: Iterable[int]) -> bytes:
+    """Encode question bits into a bitmap"""
+    bits = list(bits)
+    if not bits:
+        return b""
+    bitmap = bytearray(max(bits) // 8 + 1)
+    for bit in bits:
+        bitmap[bit // 8] |= 1 << (bit % 8)
+    return bytes(bitmap)
+
+
+def merge(left: bytes, right: bytes) -> bytes:
+    """Union of two bitmaps"""
+    if len(left) < len(right):
+        left, right = right, left
+    merged = bytearray(left)
+    for index, byte in enumerate(right):
+        merged[index] |= byte
+    return bytes(merged)
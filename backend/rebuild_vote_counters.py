@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Rebuild vote_counters from the response tables.
+
+Votes keep arriving while it runs. The rebuild records each response
+table's highest id, sums every vote up to that mark into a temporary
+staging table from one snapshot, then swaps the staging rows in under a
+brief lock: votes past the mark are added, votes of users who reported
+their year_of_birth since the snapshot move out of year 0, and
+vote_counters is replaced in the same transaction. Only the swap holds
+the response tables (and users) against writes, so no vote is counted
+twice or missed and votes wait for the swap alone.
+
+Run once after migrate_vote_counters.sql, before switching RESULTS_SOURCE
+to counters, and again after migrate_age_rollup.sql. /api/users moves a
+user's counted votes when it sets their year; run it again only to
+recount votes that raced that move into year 0.
+
+The votes are read in id batches, joined to users for year_of_birth, and
+summed per counter key with NumPy (age_results.RollupBuilder). Without
+NumPy installed, or with --sql, the database does the whole aggregation
+in one statement instead.
+
+Usage:
+    python backend/rebuild_vote_counters.py [batch_size]
+    python backend/rebuild_vote_counters.py --sql
+"""
+
+import sys
+import time
+
+from db_config import connect
+import age_results
+import vote_counters
+
+INSERT_CHUNK = 1000
+
+STAGING_TABLE = "vote_counters_rebuild"
+UNKNOWN_YEAR_TABLE = "vote_counters_rebuild_unknown_year"
+
+HIGH_WATER_SQL = """
+    SELECT (SELECT COALESCE(MAX(id), 0) FROM responses),
+           (SELECT COALESCE(MAX(id), 0) FROM checkbox_responses),
+           (SELECT COALESCE(MAX(id), 0) FROM other_responses)
+"""
+
+# Votes lock users (lazy creation) before the response tables; take them in the same order
+SWAP_LOCK_SQL = "LOCK TABLE users, responses, checkbox_responses, other_responses IN SHARE MODE"
+
+def bounds(low: tuple, high: tuple) -> tuple:
+    """vote_counters.VOTES_SQL parameters for low < id <= high in each table"""
+    return tuple(value for pair in zip(low, high) for value in pair)
+
+def rebuild_in_database(cursor, marks: tuple) -> int:
+    cursor.execute(vote_counters.rebuild_sql(STAGING_TABLE), bounds((0, 0, 0), marks))
+    return cursor.rowcount
+
+def rebuild_with_numpy(cursor, marks: tuple, batch_size: int) -> int:
+    rollup = age_results.RollupBuilder()
+    for (table, query), high in zip(age_results.BATCH_SQL.items(), marks):
+        last_id = 0
+        votes = 0
+        while True:
+            cursor.execute(query, (last_id, high, batch_size))
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            rollup.add(batch)
+            last_id = batch[-1][0]
+            votes += len(batch)
+        print(f"📦 {table}: summed {votes:,} votes")
+
+    rows = rollup.rows()
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        cursor.execute(age_results.insert_rollup_sql(len(chunk), STAGING_TABLE),
+                       tuple(value for row in chunk for value in row))
+    return len(rows)
+
+def rebuild_vote_counters(batch_size=100000, in_database=False):
+    """Replace every counter with totals recomputed from the raw votes"""
+    if age_results.numpy is None and not in_database:
+        print("⚠️  numpy is not installed; aggregating in the database")
+        in_database = True
+
+    conn = connect()
+    cursor = conn.cursor()
+    print("✅ Connected")
+
+    started = time.time()
+    # The marks split votes between the snapshot and the swap; in-flight
+    # votes commit before the lock is granted so none hides below a mark
+    cursor.execute("LOCK TABLE responses, checkbox_responses, other_responses IN SHARE MODE")
+    cursor.execute(HIGH_WATER_SQL)
+    marks = tuple(cursor.fetchone())
+    conn.commit()
+    print(f"📍 High-water marks: {marks}")
+
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+    cursor.execute(f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE vote_counters INCLUDING ALL)")
+    cursor.execute(f"CREATE TEMP TABLE {UNKNOWN_YEAR_TABLE} AS "
+                   "SELECT user_uuid FROM users WHERE year_of_birth IS NULL")
+    cursor.execute(f"ALTER TABLE {UNKNOWN_YEAR_TABLE} ADD PRIMARY KEY (user_uuid)")
+    rows = rebuild_in_database(cursor, marks) if in_database else rebuild_with_numpy(cursor, marks, batch_size)
+    conn.commit()
+    print(f"📦 Staged {rows} counter rows in {time.time() - started:.1f}s")
+
+    swap_started = time.time()
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (vote_counters.COMPACT_LOCK_KEY,))
+    cursor.execute(SWAP_LOCK_SQL)
+    cursor.execute(HIGH_WATER_SQL)
+    latest = tuple(cursor.fetchone())
+    cursor.execute(vote_counters.rebuild_sql(STAGING_TABLE), bounds(marks, latest))
+    cursor.execute(vote_counters.move_known_years_sql(STAGING_TABLE, UNKNOWN_YEAR_TABLE), bounds((0, 0, 0), marks))
+    cursor.execute("DELETE FROM vote_counters")
+    cursor.execute(f"""
+        INSERT INTO vote_counters (question_code, option_select, year_of_birth, shard,
+                                   responses, checkbox_weight, other_responses)
+        SELECT question_code, option_select, year_of_birth, shard,
+               responses, checkbox_weight, other_responses
+        FROM {STAGING_TABLE}
+    """)
+    rows = cursor.rowcount
+    conn.commit()
+    conn.close()
+    print(f"🔒 Caught up to {latest} and swapped in {time.time() - swap_started:.1f}s")
+    print(f"🎉 Rebuilt {rows} counter rows in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--sql":
+        rebuild_vote_counters(in_database=True)
+    else:
+        rebuild_vote_counters(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
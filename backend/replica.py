@@ -0,0 +1,101 @@
+"""
+Read-replica routing with a lag-aware fallback to the primary.
+
+When DB_REPLICA_HOST is set, read-only statements from the read lane are
+sent to a replica pool. The router measures replication lag at most once
+per check interval. It falls back to the primary while the lag is over the
+limit, while the replica cannot be reached, and for a short window after
+the catalog changes.
+
+Only reads whose result is used once and then discarded qualify. Anything
+cached (results, catalog responses and indexes) or pushed to stream
+subscribers reads from the primary. Otherwise a replica that has not
+replayed the latest write could pin a stale value past the invalidation
+that was meant to replace it.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind. Zero when it has replayed everything it
+# received, so an idle primary does not look like lag. Also zero on a server
+# that is not in recovery, so any second PostgreSQL instance can stand in
+# for a replica locally.
+LAG_SQL = """
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END, 0) AS lag_seconds
+"""
+
+
+class ReplicaRouter:
+    """Decides whether read-only work may use the replica pool"""
+
+    def __init__(self, pool, max_lag: float = 5.0, check_interval: float = 5.0):
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self.last_check = 0.0
+        self.primary_until = 0.0
+        self.fallbacks_total = 0
+        self.lock = threading.Lock()
+
+    def available(self) -> bool:
+        """True if a read may go to the replica right now"""
+        now = time.monotonic()
+        if now < self.primary_until:
+            return False
+        # One request refreshes the lag; everyone else uses the last reading
+        if now - self.last_check >= self.check_interval and self.lock.acquire(blocking=False):
+            try:
+                self.last_check = now
+                self._measure()
+            finally:
+                self.lock.release()
+        return self.healthy
+
+    def _measure(self):
+        conn = None
+        try:
+            conn = self.pool.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(LAG_SQL)
+            self.lag_seconds = float(cursor.fetchone()[0])
+            self.healthy = self.lag_seconds <= self.max_lag
+            if not self.healthy:
+                logger.warning(f"Replica lag {self.lag_seconds:.1f}s is over {self.max_lag}s, reading from primary")
+        except Exception as e:
+            self.lag_seconds = None
+            self.healthy = False
+            logger.warning(f"Replica lag check failed, reading from primary: {e}")
+        finally:
+            if conn is not None:
+                self.pool.return_connection(conn)
+
+    def mark_failed(self, error: Exception):
+        """Stop using the replica until the next lag check"""
+        self.healthy = False
+        self.last_check = time.monotonic()
+        self.fallbacks_total += 1
+        logger.warning(f"Replica unavailable, reading from primary: {error}")
+
+    def use_primary_for(self, seconds: float):
+        """Send all reads to the primary for a while, e.g. after a catalog change"""
+        self.primary_until = max(self.primary_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the replica's routing state"""
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag,
+            "primary_only_seconds": max(0.0, round(self.primary_until - time.monotonic(), 1)),
+            "fallbacks_total": self.fallbacks_total,
+        }
@@ -0,0 +1,140 @@
+"""
+HTTP response cache for catalog and soundtrack endpoints.
+
+Catalog payloads are identical for every client until the catalog version
+changes, so the first 200 response for a path is kept in memory together with
+a strong ETag and its precomputed compressed variants. Later requests are
+served from memory, and clients that send a matching If-None-Match get a bare
+304.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+from fastapi import Response
+
+from compression import encode_variants, negotiate
+
+# GET routes whose payload only depends on the catalog, with the query
+# parameters each one actually reads
+CACHEABLE_PATHS = [
+    (re.compile(r"^/api/categories$"), ()),
+    (re.compile(r"^/api/categories/[^/]+/blocks$"), ()),
+    (re.compile(r"^/api/blocks/[^/]+/questions$"), ()),
+    (re.compile(r"^/api/questions/[^/]+/options$"), ()),
+    (re.compile(r"^/api/soundtracks$"), ("mood", "playlist")),
+    (re.compile(r"^/api/soundtracks/playlists$"), ()),
+]
+
+
+def is_cacheable(path: str) -> bool:
+    """Check whether a request path serves catalog-only data"""
+    return any(pattern.match(path) for pattern, _ in CACHEABLE_PATHS)
+
+
+def cache_key(path: str, query_params: Mapping[str, str]) -> str:
+    """Build a cache key from the path and only the query parameters the route reads
+
+    Unknown parameters are ignored by the handlers, so keeping them in the key
+    would only let arbitrary ?x= values push real entries out of the LRU.
+    """
+    for pattern, params in CACHEABLE_PATHS:
+        if pattern.match(path):
+            # Mapping.get returns the last value for repeated parameters, like FastAPI does
+            pairs = [(name, query_params.get(name)) for name in params if query_params.get(name) is not None]
+            return f"{path}?{urlencode(pairs)}" if pairs else path
+    return path
+
+
+class CachedResponse:
+    """A cached response body with its validators and encoded variants"""
+
+    def __init__(self, version: int, body: bytes, media_type: str, min_compress_size: int = 1024):
+        self.version = version
+        self.body = body
+        self.media_type = media_type
+        self.encoded = encode_variants(body, min_compress_size)
+        # Hash the body only, so every instance hands out the same ETag for the
+        # same payload regardless of its local catalog version counter
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags must differ per content-coding
+        self.etag = f'"{digest}"'
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.encoded}
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """ETag of the representation served for a content-coding"""
+        return self.etags[encoding] if encoding else self.etag
+
+    def matches(self, if_none_match: str, encoding: Optional[str] = None) -> bool:
+        """Evaluate If-None-Match against the variant being served (weak comparison, as RFC 9110 requires)"""
+        etag = self.etag_for(encoding)
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == etag:
+                return True
+        return False
+
+
+class ResponseCache:
+    """Bounded LRU of catalog responses, invalidated by catalog version"""
+
+    def __init__(self, max_entries: int = 1024, max_age: int = 60, stale_while_revalidate: int = 600,
+                 min_compress_size: int = 1024):
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+        self.cache_control = f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        """Return the cached entry for key if it belongs to the current catalog"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, version: int, body: bytes, media_type: str) -> CachedResponse:
+        """Store a response body and return the cache entry"""
+        entry = CachedResponse(version, body, media_type, self.min_compress_size)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop every cached response"""
+        with self.lock:
+            self.entries.clear()
+
+    def build_response(self, entry: CachedResponse, headers) -> Response:
+        """Build a 200 or 304 response for a cached entry"""
+        encoding = negotiate(headers.get("accept-encoding", ""), entry.encoded)
+        response_headers: Dict[str, str] = {
+            "ETag": entry.etag_for(encoding),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and entry.matches(if_none_match, encoding):
+            return Response(status_code=304, headers=response_headers)
+
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+            return Response(content=entry.encoded[encoding], media_type=entry.media_type, headers=response_headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=response_headers)
@@ -0,0 +1,59 @@
+"""
+In-process cache of computed /api/results payloads.
+
+Entries are dropped when the question's tally changes: immediately for
+votes committed on this instance, and through the invalidation bus for votes
+committed on any other instance. A per-question generation counter stops a
+result computed before an invalidation from being stored after it.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from invalidation import ALL_QUESTIONS
+
+
+class ResultsCache:
+    """Bounded LRU of results payloads keyed by question_code"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.generations: Dict[str, int] = {}
+        self.epoch = 0
+        self.lock = threading.Lock()
+
+    def generation(self, question_code: str) -> Tuple[int, int]:
+        """Token to pass to put(); taken before the results are computed"""
+        with self.lock:
+            return self.epoch, self.generations.get(question_code, 0)
+
+    def get(self, question_code: str) -> Optional[Any]:
+        """Return the cached payload, or None"""
+        with self.lock:
+            payload = self.entries.get(question_code)
+            if payload is not None:
+                self.entries.move_to_end(question_code)
+            return payload
+
+    def put(self, question_code: str, generation: Tuple[int, int], payload: Any):
+        """Store a payload unless the tally changed while it was computed"""
+        with self.lock:
+            if generation != (self.epoch, self.generations.get(question_code, 0)):
+                return
+            self.entries[question_code] = payload
+            self.entries.move_to_end(question_code)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, question_code: str):
+        """Drop one question's payload, or everything for ALL_QUESTIONS"""
+        with self.lock:
+            if question_code == ALL_QUESTIONS:
+                self.epoch += 1
+                self.entries.clear()
+                self.generations.clear()
+                return
+            self.generations[question_code] = self.generations.get(question_code, 0) + 1
+            self.entries.pop(question_code, None)
@@ -0,0 +1,58 @@
+"""
+Single-statement tally for /api/results on the raw response tables.
+
+The statement is driven from the questions row, so an unknown question
+returns no rows. It unions the question's option list (zero-vote options)
+with per-option totals from each response table and folds them with
+FILTERed aggregates. That one round trip replaces the earlier existence
+check, three aggregate queries and Python merge. Each table is summed
+inside its own branch, so the outer aggregate folds a handful of rows per
+option instead of every vote.
+
+OTHER counts single-choice and checkbox votes for OTHER. Only when there
+are none does it count free-text answers, so an answer typed into the OTHER
+box next to a ticked OTHER checkbox is not counted twice.
+"""
+
+from typing import Any, Dict, List, Optional
+
+# One row per option (a single NULL row if the question has no options and
+# no votes); no rows if the question does not exist
+RESULTS_SQL = """
+    SELECT t.option_select,
+           COALESCE(SUM(t.votes) FILTER (WHERE t.source IN ('single', 'checkbox')),
+                    SUM(t.votes) FILTER (WHERE t.source = 'other'),
+                    0) AS count
+    FROM questions q
+    LEFT JOIN LATERAL (
+        SELECT option_select, 'option' AS source, 0::float8 AS votes
+        FROM options WHERE question_code = q.question_code
+        UNION ALL
+        SELECT option_select, 'single', COUNT(*)::float8
+        FROM responses WHERE question_code = q.question_code GROUP BY option_select
+        UNION ALL
+        SELECT option_select, 'checkbox', SUM(weight::float8)
+        FROM checkbox_responses WHERE question_code = q.question_code GROUP BY option_select
+        UNION ALL
+        SELECT 'OTHER', 'other', COUNT(*)::float8
+        FROM other_responses WHERE question_code = q.question_code HAVING COUNT(*) > 0
+    ) t ON true
+    WHERE q.question_code = %s
+    GROUP BY t.option_select
+    ORDER BY t.option_select
+"""
+
+
+def count_value(value: float):
+    """Whole counts as int, as COUNT(*) returned them, weighted ones as float"""
+    return int(value) if float(value).is_integer() else value
+
+
+def read_results(rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """/api/results rows from RESULTS_SQL rows, or None if the question does not exist"""
+    if not rows:
+        return None
+    return [
+        {"option_select": row['option_select'], "count": count_value(row['count'])}
+        for row in rows if row['option_select'] is not None
+    ]
@@ -0,0 +1,98 @@
+"""
+Materialized results view for RESULTS_SOURCE=matview.
+
+For deployments that cannot change the vote write path: results_mv holds the
+merged per-option tallies of responses, checkbox_responses (summed weights)
+and other_responses, with the same OTHER rule as /api/results. A background
+thread refreshes it CONCURRENTLY, so reads never block, and records the
+refresh time in the cache_versions row 'results_mv'. Reads report how stale
+they are, and fall back to the raw tables once the view is older than the
+configured bound.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from invalidation import ALL_QUESTIONS, NOTIFY_SQL, TALLY_CHANNEL
+from results_query import count_value
+
+# Advisory lock key so only one instance refreshes at a time
+REFRESH_LOCK_KEY = 4304301
+
+# Same definition as database-scripts/migrate_results_view.sql, for scripts
+# that have to rebuild the view (migrate_compact_storage.py)
+CREATE_SQL = """
+    CREATE MATERIALIZED VIEW results_mv AS
+    SELECT question_code, option_select,
+           CASE WHEN bool_or(source <> 'other')
+                THEN SUM(votes) FILTER (WHERE source <> 'other')
+                ELSE SUM(votes)
+           END AS count
+    FROM (
+        SELECT question_code, option_select, 'single' AS source, COUNT(*)::float8 AS votes
+        FROM responses GROUP BY question_code, option_select
+        UNION ALL
+        SELECT question_code, option_select, 'checkbox', SUM(weight)::float8
+        FROM checkbox_responses GROUP BY question_code, option_select
+        UNION ALL
+        SELECT question_code, 'OTHER', 'other', COUNT(*)::float8
+        FROM other_responses GROUP BY question_code
+    ) tallies
+    GROUP BY question_code, option_select
+"""
+
+CREATE_INDEX_SQL = "CREATE UNIQUE INDEX idx_results_mv_key ON results_mv(question_code, option_select)"
+
+REFRESH_SQL = "REFRESH MATERIALIZED VIEW CONCURRENTLY results_mv"
+
+RECORD_REFRESH_SQL = """
+    INSERT INTO cache_versions (name, version, updated_at) VALUES ('results_mv', 1, now())
+    ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1, updated_at = now()
+"""
+
+# One row per option, or a single row with NULL option_select when the
+# question has no votes; no rows at all if the view was never refreshed
+RESULTS_SQL = """
+    SELECT m.option_select, SUM(m.count) AS count,
+           EXTRACT(EPOCH FROM now() - v.updated_at)::float8 AS staleness_seconds
+    FROM cache_versions v
+    LEFT JOIN (
+        SELECT option_select, count FROM results_mv WHERE question_code = %s
+        UNION ALL
+        -- Catalog options with zero votes, listed like the raw-table source lists them
+        SELECT option_select, 0 FROM options WHERE question_code = %s
+    ) m ON true
+    WHERE v.name = 'results_mv'
+    GROUP BY m.option_select, v.updated_at
+    ORDER BY m.option_select
+"""
+
+
+def refresh(conn) -> bool:
+    """Refresh the view on conn and commit; False if another instance is refreshing
+
+    Every tally may have moved, so live results streams on all instances are
+    told to recompute.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (REFRESH_LOCK_KEY,))
+    if not cursor.fetchone()[0]:
+        conn.rollback()
+        return False
+    cursor.execute(REFRESH_SQL)
+    cursor.execute(RECORD_REFRESH_SQL)
+    cursor.execute(NOTIFY_SQL, (TALLY_CHANNEL, ALL_QUESTIONS))
+    conn.commit()
+    return True
+
+
+def read_results(rows: List[Dict[str, Any]], max_staleness: float) -> Optional[Dict[str, Any]]:
+    """Results and staleness from RESULTS_SQL rows, or None if too stale to serve"""
+    if not rows or rows[0]['staleness_seconds'] > max_staleness:
+        return None
+    return {
+        "results": [
+            {"option_select": row['option_select'], "count": count_value(row['count'])}
+            for row in rows if row['option_select'] is not None
+        ],
+        "staleness_seconds": round(max(rows[0]['staleness_seconds'], 0.0), 3),
+    }
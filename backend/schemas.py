@@ -0,0 +1,56 @@
+"""
+Typed request bodies for the write endpoints.
+
+Vote ingestion is the busiest write path, so request bodies are decoded
+straight from bytes into msgspec Structs. Decoding and type validation
+happen in a single pass; unknown fields (such as the question_text the
+frontend sends along with /api/other) are ignored.
+
+user_uuid must be a hyphenated UUID: the user_uuid columns are native
+PostgreSQL uuid, so anything else would only fail later inside the
+database.
+"""
+
+import re
+from typing import Annotated, List, Optional
+
+import msgspec
+
+UUID_PATTERN = "^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+uuid_regex = re.compile(UUID_PATTERN)
+
+UserUuid = Annotated[str, msgspec.Meta(pattern=UUID_PATTERN)]
+
+
+class UserRequest(msgspec.Struct):
+    user_uuid: UserUuid
+    year_of_birth: int
+
+
+class VoteRequest(msgspec.Struct):
+    question_code: str
+    option_select: str
+    user_uuid: UserUuid
+    idempotency_key: Optional[str] = None
+
+
+class CheckboxVoteRequest(msgspec.Struct):
+    question_code: str
+    option_selects: List[str]
+    user_uuid: UserUuid
+    other_text: Optional[str] = None
+    idempotency_key: Optional[str] = None
+
+
+class OtherRequest(msgspec.Struct):
+    question_code: str
+    user_uuid: UserUuid
+    other_text: str
+    idempotency_key: Optional[str] = None
+
+
+# Decoders are compiled once per type and reused for every request
+user_decoder = msgspec.json.Decoder(UserRequest)
+vote_decoder = msgspec.json.Decoder(VoteRequest)
+checkbox_vote_decoder = msgspec.json.Decoder(CheckboxVoteRequest)
+other_decoder = msgspec.json.Decoder(OtherRequest)
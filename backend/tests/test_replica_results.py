@@ -0,0 +1,137 @@
+"""
+Replica routing for cached results, and /api/results for unknown questions.
+
+A results read that follows a vote must never cache a tally from a replica
+that has not replayed the vote yet. No database is needed: the primary and
+replica pools hand out in-memory connections that answer the results query
+from their own copy of the tally, and the replica never catches up.
+
+Usage:
+    python -m unittest discover backend/tests
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import lanes  # noqa: E402
+import main  # noqa: E402
+from replica import ReplicaRouter  # noqa: E402
+
+QUESTION = "1_1"
+
+
+class TallyCursor:
+    """Answers QUESTION's results query with the connection's (option_select, count) tally"""
+
+    def __init__(self, tally):
+        self.tally = tally
+        self.description = [("option_select",), ("count",)]
+        self.rows = []
+
+    def execute(self, query, params=None):
+        # Any other question does not exist, so its results query finds no rows
+        self.rows = sorted(self.tally.items()) if params == (QUESTION,) else []
+
+    def fetchall(self):
+        return self.rows
+
+
+class TallyConnection:
+    """Just enough of a pg8000 connection for the pools and run_query"""
+
+    _in_transaction = False
+
+    def __init__(self, tally):
+        self.tally = tally
+
+    def cursor(self):
+        return TallyCursor(self.tally)
+
+    def execute_simple(self, statement):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def tally_pool(name, tally):
+    pool = main.SimpleConnectionPool(max_connections=4, name=name)
+    pool._create_connection = lambda: TallyConnection(tally)
+    return pool
+
+
+class ReplicaResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.primary = {"A": 1, "B": 0}
+        # Snapshot before any vote below; the replica never replays them
+        self.replica = dict(self.primary)
+
+        router = ReplicaRouter(tally_pool("test-replica", self.replica), max_lag=5, check_interval=3600)
+        router.healthy = True
+        router.last_check = time.monotonic()
+
+        pools = {lane: tally_pool(f"test-{lane}", self.primary) for lane in lanes.LANES}
+        for patcher in (
+            mock.patch.dict(main.connection_pools, pools),
+            mock.patch.object(main, "replica_router", router),
+            mock.patch.object(main, "RESULTS_SOURCE", "raw"),
+            mock.patch.object(main.invalidation_bus, "listening", True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        main.results_cache.invalidate(main.invalidation.ALL_QUESTIONS)
+        self.client = TestClient(main.app)
+
+    def vote(self, option_select):
+        """Commit a vote on the primary and run its invalidation, as the vote handler does"""
+        self.primary[option_select] += 1
+        main.results_cache.invalidate(QUESTION)
+
+    def counts(self):
+        response = self.client.get(f"/api/results/{QUESTION}")
+        self.assertEqual(response.status_code, 200)
+        return {row["option_select"]: row["count"] for row in response.json()["results"]}
+
+    def test_vote_then_read_never_caches_pre_vote_tally(self):
+        self.assertEqual(self.counts(), {"A": 1, "B": 0})
+
+        self.vote("B")
+        self.assertEqual(self.counts(), {"A": 1, "B": 1})
+        # Served from the cache now, and still the post-vote tally
+        self.assertEqual(self.counts(), {"A": 1, "B": 1})
+        self.assertEqual(main.results_cache.get(QUESTION)["results"],
+                         [{"option_select": "A", "count": 1}, {"option_select": "B", "count": 1}])
+
+    def test_unknown_question_is_404(self):
+        response = self.client.get("/api/results/NOPE")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Question not found"})
+
+    def test_streamed_results_read_the_primary(self):
+        self.vote("A")
+        with mock.patch.object(lanes, "current_lane", return_value=lanes.READ):
+            payload = main.load_results(QUESTION)
+        self.assertEqual(payload["results"][0], {"option_select": "A", "count": 2})
+
+    def test_uncached_results_still_use_the_replica(self):
+        # Without trusted invalidation nothing is cached, so the replica may serve the read
+        self.vote("A")
+        with mock.patch.object(main.invalidation_bus, "listening", False):
+            self.assertEqual(self.counts(), {"A": 1, "B": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
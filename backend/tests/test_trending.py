@@ -0,0 +1,59 @@
+"""
+Staleness of other instances' trending counts.
+
+A remote snapshot's counts are merged into a window only while the
+snapshot is younger than trending.MAX_STALENESS of the window's length.
+No database is needed: set_remote() takes SNAPSHOTS_SQL rows directly and
+the clock is a variable the tests move.
+
+Usage:
+    python -m unittest discover backend/tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import trending  # noqa: E402
+
+INTERVAL = trending.max_snapshot_interval()
+
+
+class TrendingStalenessTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.rates = trending.VoteRates(clock=lambda: self.now)
+
+    def remote_rows(self, age, votes=5):
+        return [{"window_name": window, "question_code": "1_1", "votes": votes, "age": age}
+                for window in trending.WINDOWS]
+
+    def test_old_snapshot_is_dropped_from_short_window_only(self):
+        # 40 s old at a 15 s interval: most of a 1m window, short of a dead instance
+        self.rates.set_remote(self.remote_rows(age=40), interval=15)
+        self.assertEqual(self.rates.trending("1m", 10), [])
+        self.assertEqual(self.rates.trending("1h", 10), [("1_1", 5)])
+
+    def test_counts_expire_while_held_between_snapshots(self):
+        self.rates.set_remote(self.remote_rows(age=10), interval=INTERVAL)
+        self.assertEqual(self.rates.trending("1m", 10), [("1_1", 5)])
+        self.now += trending.max_age("1m", INTERVAL) - 10
+        self.assertEqual(self.rates.trending("1m", 10), [])
+        self.assertEqual(self.rates.trending("15m", 10), [("1_1", 5)])
+
+    def test_default_interval_keeps_short_window_merged(self):
+        # Read one interval after it was taken and kept until the next read
+        self.rates.set_remote(self.remote_rows(age=INTERVAL), interval=INTERVAL)
+        self.now += INTERVAL - 0.01
+        self.assertEqual(self.rates.trending("1m", 10), [("1_1", 5)])
+
+    def test_remote_counts_add_to_local(self):
+        self.rates.record("1_1")
+        self.rates.set_remote(self.remote_rows(age=1), interval=INTERVAL)
+        self.assertEqual(self.rates.trending("1m", 10), [("1_1", 6)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+HyperLogLog distinct-voter sketches.
+
+Estimates must stay within about three standard errors (3 x 1.6%) of the
+true count, and merging or re-adding voters must never change an estimate.
+The voters are synthetic but fixed, so every run checks the same sketches.
+
+Usage:
+    python -m unittest discover backend/tests
+"""
+
+import os
+import sys
+import unittest
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import voter_sketches  # noqa: E402
+from voter_sketches import HyperLogLog  # noqa: E402
+
+TOLERANCE = 3 * voter_sketches.STANDARD_ERROR
+
+
+def voters(count, start=0):
+    """`count` distinct user uuids, the same on every run"""
+    return [str(uuid.UUID(int=(start + i) * 0x9E3779B97F4A7C15 % (1 << 128))) for i in range(count)]
+
+
+def sketch_of(user_uuids):
+    sketch = HyperLogLog()
+    for user_uuid in user_uuids:
+        sketch.add(user_uuid)
+    return sketch
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_estimate_within_three_standard_errors(self):
+        # Linear counting range, the crossover, and well into the HyperLogLog range
+        for count in (1000, 10000, 100000):
+            with self.subTest(count=count):
+                estimate = sketch_of(voters(count)).estimate()
+                self.assertLessEqual(abs(estimate - count), TOLERANCE * count)
+
+    def test_merge_with_itself_is_unchanged(self):
+        sketch = sketch_of(voters(20000))
+        registers, estimate = bytes(sketch.registers), sketch.estimate()
+        sketch.merge(HyperLogLog(sketch.registers))
+        self.assertEqual(bytes(sketch.registers), registers)
+        self.assertEqual(sketch.estimate(), estimate)
+
+    def test_readding_voters_is_unchanged(self):
+        users = voters(20000)
+        sketch = sketch_of(users)
+        registers, estimate = bytes(sketch.registers), sketch.estimate()
+        for user_uuid in users:
+            sketch.add(user_uuid)
+        self.assertEqual(bytes(sketch.registers), registers)
+        self.assertEqual(sketch.estimate(), estimate)
+
+    def test_merge_of_parts_equals_sketch_of_union(self):
+        # Instances (or days) that saw overlapping voters combine in any order
+        first, second = voters(30000), voters(30000, start=20000)
+        merged = sketch_of(second)
+        merged.merge(sketch_of(first))
+        self.assertEqual(bytes(merged.registers), bytes(sketch_of(first + second).registers))
+        self.assertLessEqual(abs(merged.estimate() - 50000), TOLERANCE * 50000)
+
+    def test_stored_rows_and_unflushed_sketches_merge(self):
+        stored = sketch_of(voters(5000))
+        unflushed = sketch_of(voters(5000, start=2500))
+        rows = [{"registers": stored.to_bytes()}, {"registers": stored.to_bytes()}]
+        self.assertEqual(voter_sketches.estimate(rows, [unflushed]), sketch_of(voters(7500)).estimate())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Catalog warm-up of the response cache.
+
+warm_catalog() renders every catalog response once and stores it with its
+compressed variants. No database is needed: execute_query answers the
+catalog queries from a small in-memory catalog.
+
+Usage:
+    python -m unittest discover backend/tests
+"""
+
+import gzip
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import compression  # noqa: E402
+import main  # noqa: E402
+
+# Long enough texts that every body clears the minimum compression size
+FILLER = "lorem ipsum dolor sit amet " * 60
+
+CATEGORIES = [{"id": 1, "category_name": "Music", "description": FILLER}]
+BLOCKS = [{"id": 1, "category_id": 1, "block_number": 1, "block_text": FILLER}]
+QUESTIONS = [{"id": 1, "question_code": "1_1_1", "question_text": FILLER, "question_number": 1,
+              "category_name": "Music", "category_id": 1, "block_number": 1, "check_box": False,
+              "max_select": 1}]
+OPTIONS = [{"question_code": "1_1_1", "option_select": option, "option_text": FILLER, "option_code": option}
+           for option in ("A", "B")]
+SOUNDTRACKS = [{"song_id": 1, "song_title": "Song", "mood_tag": "calm", "playlist_tag": "morning " + FILLER,
+                "lyrics_snippet": FILLER, "featured": True, "featured_order": 1, "file_url": "/song.mp3"}]
+
+
+def catalog_query(query, params=None, **kwargs):
+    """Answer the catalog loaders' and handlers' queries"""
+    if "FROM soundtracks" in query:
+        return SOUNDTRACKS
+    if "FROM categories" in query:
+        return CATEGORIES
+    if "FROM blocks" in query:
+        return BLOCKS
+    if "FROM questions" in query:
+        return QUESTIONS
+    if "FROM options" in query:
+        return OPTIONS
+    raise AssertionError(f"unexpected query: {query}")
+
+
+class WarmResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(main, "execute_query", side_effect=catalog_query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        main.catalog.bump_version()
+        main.response_cache.clear()
+        self.addCleanup(main.response_cache.clear)
+
+    def test_warm_catalog_caches_every_catalog_response(self):
+        main.warm_catalog()
+
+        self.assertEqual(set(main.response_cache.entries), {
+            "/api/soundtracks",
+            "/api/soundtracks/playlists",
+            "/api/categories",
+            "/api/categories/1/blocks",
+            "/api/blocks/1_1/questions",
+            "/api/questions/1_1_1/options",
+        })
+
+    def test_warmed_entries_hold_gzip_and_brotli_bodies(self):
+        main.warm_catalog()
+
+        self.assertEqual(len(main.response_cache.entries), 6)
+        for path, entry in main.response_cache.entries.items():
+            with self.subTest(path=path):
+                self.assertEqual(entry.version, main.catalog.get_version())
+                self.assertEqual(set(entry.encoded), {"gzip", "br"})
+                self.assertEqual(gzip.decompress(entry.encoded["gzip"]), entry.body)
+                self.assertEqual(compression.brotli.decompress(entry.encoded["br"]), entry.body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+"""
+Votes per question over sliding windows, for /api/trending.
+
+Each window (1m, 15m, 1h) is a ring buffer of SLOTS time slots. A slot
+holds a Space-Saving summary of the votes cast in it: at most `capacity`
+questions with their counts. When a new question arrives at a full
+summary it replaces the question with the smallest count and inherits that
+count as its error, so counts are upper bounds that are exact for any
+question that never got evicted. With capacity above the number of
+questions in the catalog nothing is ever evicted and every count is exact.
+
+A slot is cleared when the ring comes round to it again. A window is the
+sum of its SLOTS most recent slots, the current one still filling, so it
+covers between (SLOTS - 1) / SLOTS of its length and all of it.
+
+Reading a window merges its SLOTS summaries (bounded by SLOTS x capacity,
+whatever the vote volume) and the latest snapshots of the other instances.
+Every TRENDING_SNAPSHOT_INTERVAL seconds each instance replaces its rows in
+trending_snapshots with its merged windows and reads everyone else's.
+
+A remote count is merged only while its snapshot is younger than
+MAX_STALENESS of the window's length; an old 1m count mostly holds votes
+that have since left the window. A snapshot can be an interval old when it
+is read and is kept for another interval, so max_snapshot_interval() is
+the longest interval at which the 1m window never drops remote counts.
+"""
+
+import heapq
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Window name -> length in seconds
+WINDOWS = {"1m": 60, "15m": 15 * 60, "1h": 60 * 60}
+SLOTS = 6
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitters summary of at most `capacity` keys"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def offer(self, key: str, count: int = 1):
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            return
+        # Evicting the minimum is O(capacity); it only happens once the
+        # summary holds more keys than the catalog has questions
+        evicted = min(self.counts, key=self.counts.__getitem__)
+        floor = self.counts.pop(evicted)
+        self.errors.pop(evicted)
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+
+    def clear(self):
+        self.counts.clear()
+        self.errors.clear()
+
+
+def max_age(window: str, interval: float) -> float:
+    """Seconds a remote snapshot's counts stay merged into a window"""
+    return min(WINDOWS[window] * MAX_STALENESS, interval * STALE_INTERVALS)
+
+
+def max_snapshot_interval() -> float:
+    """Longest snapshot interval that keeps every window's remote counts merged"""
+    return min(WINDOWS.values()) * MAX_STALENESS / 2
+
+
+def top(counts: Dict[str, int], limit: int) -> List[Tuple[str, int]]:
+    """The `limit` highest (key, count) pairs, highest first"""
+    return heapq.nlargest(limit, counts.items(), key=lambda item: item[1])
+
+
+class SlidingWindow:
+    """Ring buffer of SLOTS Space-Saving summaries covering `seconds`"""
+
+    def __init__(self, seconds: int, capacity: int):
+        self.slot_seconds = seconds / SLOTS
+        self.slots = [SpaceSaving(capacity) for _ in range(SLOTS)]
+        # Absolute slot number each ring position currently holds
+        self.epochs = [-1] * SLOTS
+
+    def _slot(self, now: float) -> SpaceSaving:
+        epoch = int(now // self.slot_seconds)
+        position = epoch % SLOTS
+        if self.epochs[position] != epoch:
+            self.slots[position].clear()
+            self.epochs[position] = epoch
+        return self.slots[position]
+
+    def offer(self, key: str, now: float):
+        self._slot(now).offer(key)
+
+    def counts(self, now: float) -> Dict[str, int]:
+        """Votes per question over the window ending now"""
+        current = int(now // self.slot_seconds)
+        merged: Dict[str, int] = {}
+        for epoch, summary in zip(self.epochs, self.slots):
+            if current - SLOTS < epoch <= current:
+                for key, count in summary.counts.items():
+                    merged[key] = merged.get(key, 0) + count
+        return merged
+
+
+class VoteRates:
+    """This instance's sliding windows plus the other instances' last snapshots"""
+
+    def __init__(self, capacity: int = 256, clock: Callable[[], float] = time.time):
+        self.capacity = capacity
+        self.clock = clock
+        self.windows = {name: SlidingWindow(seconds, capacity) for name, seconds in WINDOWS.items()}
+        # Window -> (question_code, votes, expires_at) per remote instance row
+        self.remote: Dict[str, List[Tuple[str, int, float]]] = {name: [] for name in WINDOWS}
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.lock = threading.Lock()
+
+    def record(self, question_code: str):
+        """Count one committed vote on a question"""
+        now = self.clock()
+        with self.lock:
+            for window in self.windows.values():
+                window.offer(question_code, now)
+
+    def local_counts(self, window: str) -> Dict[str, int]:
+        with self.lock:
+            return self.windows[window].counts(self.clock())
+
+    def trending(self, window: str, limit: int) -> List[Tuple[str, int]]:
+        """The `limit` questions with the most votes in the window, across instances"""
+        counts = self.local_counts(window)
+        now = self.clock()
+        for question_code, votes, expires_at in self.remote[window]:
+            if now < expires_at:
+                counts[question_code] = counts.get(question_code, 0) + votes
+        return top(counts, limit)
+
+    def set_remote(self, rows: List[Dict], interval: float):
+        """Replace the other instances' counts with SNAPSHOTS_SQL rows"""
+        now = self.clock()
+        remote: Dict[str, List[Tuple[str, int, float]]] = {name: [] for name in WINDOWS}
+        for row in rows:
+            window = row['window_name']
+            if window not in remote:
+                continue
+            expires_at = now + max_age(window, interval) - float(row['age'])
+            if expires_at > now:
+                remote[window].append((row['question_code'], int(row['votes']), expires_at))
+        self.remote = remote
+
+
+DELETE_SNAPSHOT_SQL = "DELETE FROM trending_snapshots WHERE instance_id = %s"
+
+# Snapshots older than this many snapshot intervals belong to instances
+# that have stopped; they are ignored and eventually deleted
+STALE_INTERVALS = 3
+
+# Fraction of a window's length a remote snapshot may age before its
+# counts stop being merged into that window
+MAX_STALENESS = 0.25
+
+SNAPSHOTS_SQL = """
+    SELECT window_name, question_code, votes,
+           EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - taken_at)::float8 AS age
+    FROM trending_snapshots
+    WHERE instance_id <> %s AND taken_at > CURRENT_TIMESTAMP - make_interval(secs => %s)
+"""
+
+PRUNE_SQL = "DELETE FROM trending_snapshots WHERE taken_at < CURRENT_TIMESTAMP - make_interval(secs => %s)"
+
+
+def insert_snapshot_sql(rows: int) -> str:
+    """Insert `rows` (instance_id, window_name, question_code, votes) tuples"""
+    values = ", ".join(["(%s, %s, %s, %s, CURRENT_TIMESTAMP)"] * rows)
+    return f"""
+        INSERT INTO trending_snapshots (instance_id, window_name, question_code, votes, taken_at)
+        VALUES {values}
+    """
+
+
+def snapshot(conn, rates: VoteRates, interval: float) -> int:
+    """Publish this instance's windows, pick up everyone else's and commit; returns rows written"""
+    cursor = conn.cursor()
+    params = []
+    for window in WINDOWS:
+        for question_code, votes in rates.local_counts(window).items():
+            params += [rates.instance_id, window, question_code, votes]
+    cursor.execute(DELETE_SNAPSHOT_SQL, (rates.instance_id,))
+    rows = len(params) // 4
+    if rows:
+        cursor.execute(insert_snapshot_sql(rows), tuple(params))
+    cursor.execute(PRUNE_SQL, (interval * STALE_INTERVALS * 10,))
+    cursor.execute(SNAPSHOTS_SQL, (rates.instance_id, interval * STALE_INTERVALS))
+    columns = [c[0] for c in cursor.description]
+    rates.set_remote([dict(zip(columns, row)) for row in cursor.fetchall()], interval)
+    conn.commit()
+    return rows
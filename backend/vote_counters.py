@@ -0,0 +1,245 @@
+"""
+Sharded vote counters for results that do not rescan the response tables.
+
+A single counter row per question/option would serialize every concurrent
+vote on a popular question behind one row lock. Instead each vote adds to
+one of N shard rows, picked from the writing connection's backend pid (so
+two pooled connections never contend) or from a hash of the user_uuid.
+Reads sum the shards. Compaction folds the write shards into shard 0, which
+writes never use, so the table stays at a handful of rows per option.
+
+Counters are also split by the voter's year_of_birth (0 while unknown), so
+the same rows answer /api/results/{question_code}/by_age. The year is
+looked up in the increment statement itself. When a lazily created user
+reports their year, /api/users moves their votes already counted under 0 to
+that year in the same transaction (move_year_sql). A vote that commits
+concurrently with that update can still land under 0 until the counters
+are rebuilt.
+
+Each row keeps the three sources separately because /api/results merges
+them with special OTHER handling:
+
+- responses: single-choice votes
+- checkbox_weight: summed checkbox weights
+- other_responses: free-text answers (option_select 'OTHER' only)
+"""
+
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from results_query import count_value
+
+COMPACTED_SHARD = 0
+
+# Advisory lock key so only one instance compacts at a time
+COMPACT_LOCK_KEY = 4204201
+
+SHARD_BY_CONNECTION = "connection"
+SHARD_BY_USER = "user"
+
+
+def shard_expression(shard_by: str, shards: int) -> str:
+    """SQL for the shard of one counter row (1..shards)"""
+    if shard_by == SHARD_BY_USER:
+        return "%s"
+    # Always executed with parameters, so the modulo is escaped for pg8000
+    return f"(pg_backend_pid() %% {int(shards)}) + 1"
+
+
+def user_shard(user_uuid: str, shards: int) -> int:
+    """Stable shard for a user, for SHARD_BY_USER"""
+    return zlib.crc32(user_uuid.encode()) % shards + 1
+
+
+def increment_sql(rows: int, shard_by: str, shards: int) -> str:
+    """Upsert adding `rows` (question_code, option_select, responses, checkbox_weight, other_responses) tuples
+    for one user, under that user's year_of_birth"""
+    shard = shard_expression(shard_by, shards)
+    values = ", ".join([f"(%s, %s, ({shard})::smallint, %s::bigint, %s::float8, %s::bigint)"] * rows)
+    return f"""
+        INSERT INTO vote_counters (question_code, option_select, year_of_birth, shard,
+                                   responses, checkbox_weight, other_responses)
+        SELECT v.question_code, v.option_select, COALESCE(u.year_of_birth, 0), v.shard,
+               v.responses, v.checkbox_weight, v.other_responses
+        FROM (VALUES {values}) AS v(question_code, option_select, shard, responses, checkbox_weight, other_responses)
+        LEFT JOIN users u ON u.user_uuid = %s
+        ON CONFLICT (question_code, option_select, year_of_birth, shard) DO UPDATE SET
+            responses = vote_counters.responses + EXCLUDED.responses,
+            checkbox_weight = vote_counters.checkbox_weight + EXCLUDED.checkbox_weight,
+            other_responses = vote_counters.other_responses + EXCLUDED.other_responses
+    """
+
+
+def increment_params(rows: Iterable[Tuple[str, str, int, float, int]], shard_by: str,
+                     user_uuid: str, shards: int) -> Tuple:
+    """Flatten counter rows into parameters for increment_sql"""
+    params: List[Any] = []
+    for question_code, option_select, responses, checkbox_weight, other_responses in rows:
+        params += [question_code, option_select]
+        if shard_by == SHARD_BY_USER:
+            params.append(user_shard(user_uuid, shards))
+        params += [responses, checkbox_weight, other_responses]
+    params.append(user_uuid)
+    return tuple(params)
+
+
+# One user's votes as counter contributions
+USER_VOTES_SQL = """
+    SELECT question_code, option_select, 1 AS responses, 0::float8 AS checkbox_weight, 0 AS other_responses
+    FROM responses WHERE user_uuid = %s
+    UNION ALL
+    SELECT question_code, option_select, 0, weight, 0
+    FROM checkbox_responses WHERE user_uuid = %s
+    UNION ALL
+    SELECT question_code, 'OTHER', 0, 0, 1
+    FROM other_responses WHERE user_uuid = %s
+"""
+
+
+def move_year_sql(shard_by: str, shards: int) -> str:
+    """Upsert moving one user's counted votes from year 0 to the year they just reported"""
+    shard = shard_expression(shard_by, shards)
+    return f"""
+        INSERT INTO vote_counters (question_code, option_select, year_of_birth, shard,
+                                   responses, checkbox_weight, other_responses)
+        SELECT v.question_code, v.option_select, y.year_of_birth, ({shard})::smallint,
+               SUM(v.responses) * y.sign, SUM(v.checkbox_weight) * y.sign, SUM(v.other_responses) * y.sign
+        FROM ({USER_VOTES_SQL}) v
+        CROSS JOIN (VALUES (0, -1), ((%s)::int, 1)) AS y(year_of_birth, sign)
+        GROUP BY v.question_code, v.option_select, y.year_of_birth, y.sign
+        ON CONFLICT (question_code, option_select, year_of_birth, shard) DO UPDATE SET
+            responses = vote_counters.responses + EXCLUDED.responses,
+            checkbox_weight = vote_counters.checkbox_weight + EXCLUDED.checkbox_weight,
+            other_responses = vote_counters.other_responses + EXCLUDED.other_responses
+    """
+
+
+def move_year_params(shard_by: str, user_uuid: str, year_of_birth: int, shards: int) -> Tuple:
+    """Parameters for move_year_sql"""
+    params: List[Any] = [user_shard(user_uuid, shards)] if shard_by == SHARD_BY_USER else []
+    return tuple(params + [user_uuid, user_uuid, user_uuid, year_of_birth])
+
+
+# The question's catalog options are unioned in with zero counts, so options
+# nobody picked yet are listed just like the raw-table source lists them
+RESULTS_SQL = """
+    SELECT option_select,
+           SUM(responses)::bigint AS responses,
+           SUM(checkbox_weight) AS checkbox_weight,
+           SUM(other_responses)::bigint AS other_responses
+    FROM (
+        SELECT option_select, 0 AS responses, 0::float8 AS checkbox_weight, 0 AS other_responses
+        FROM options WHERE question_code = %s
+        UNION ALL
+        SELECT option_select, responses, checkbox_weight, other_responses
+        FROM vote_counters WHERE question_code = %s
+    ) c
+    GROUP BY option_select
+"""
+
+
+def merge_counts(rows: List[Dict[str, Any]], keep_zero: bool = False) -> List[Dict[str, Any]]:
+    """Turn summed counter rows into /api/results rows
+
+    OTHER counts free-text answers only when no single-choice or checkbox
+    vote selected OTHER, matching the raw-table merge in get_results. Rows
+    without votes are dropped unless keep_zero is set.
+    """
+    results = []
+    for row in rows:
+        voted = row['responses'] or row['checkbox_weight']
+        if voted:
+            count = row['responses'] + row['checkbox_weight'] if row['checkbox_weight'] else row['responses']
+        elif row['option_select'] == 'OTHER' and row['other_responses']:
+            count = row['other_responses']
+        elif keep_zero:
+            count = 0
+        else:
+            continue
+        results.append({'option_select': row['option_select'], 'count': count_value(count)})
+    results.sort(key=lambda r: r['option_select'])
+    return results
+
+
+# Fold every write shard into the compacted shard in one statement
+COMPACT_SQL = f"""
+    WITH folded AS (
+        DELETE FROM vote_counters WHERE shard <> {COMPACTED_SHARD}
+        RETURNING question_code, option_select, year_of_birth, responses, checkbox_weight, other_responses
+    )
+    INSERT INTO vote_counters (question_code, option_select, year_of_birth, shard,
+                               responses, checkbox_weight, other_responses)
+    SELECT question_code, option_select, year_of_birth, {COMPACTED_SHARD},
+           SUM(responses), SUM(checkbox_weight), SUM(other_responses)
+    FROM folded
+    GROUP BY question_code, option_select, year_of_birth
+    ON CONFLICT (question_code, option_select, year_of_birth, shard) DO UPDATE SET
+        responses = vote_counters.responses + EXCLUDED.responses,
+        checkbox_weight = vote_counters.checkbox_weight + EXCLUDED.checkbox_weight,
+        other_responses = vote_counters.other_responses + EXCLUDED.other_responses
+"""
+
+
+def compact(conn) -> Optional[int]:
+    """Compact the counters on conn and commit; None if another instance is compacting"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (COMPACT_LOCK_KEY,))
+    if not cursor.fetchone()[0]:
+        conn.rollback()
+        return None
+    cursor.execute(COMPACT_SQL)
+    folded = cursor.rowcount
+    conn.commit()
+    return folded
+
+
+# Every vote with low < id <= high in its table, as a counter contribution;
+# parameters are (low, high) for responses, checkbox_responses and other_responses
+VOTES_SQL = """
+    SELECT question_code, option_select, user_uuid, 1 AS responses, 0::float8 AS checkbox_weight, 0 AS other_responses
+    FROM responses WHERE id > %s AND id <= %s
+    UNION ALL
+    SELECT question_code, option_select, user_uuid, 0, weight, 0
+    FROM checkbox_responses WHERE id > %s AND id <= %s
+    UNION ALL
+    SELECT question_code, 'OTHER', user_uuid, 0, 0, 1
+    FROM other_responses WHERE id > %s AND id <= %s
+"""
+
+_ADD_ON_CONFLICT = """
+    ON CONFLICT (question_code, option_select, year_of_birth, shard) DO UPDATE SET
+        responses = {table}.responses + EXCLUDED.responses,
+        checkbox_weight = {table}.checkbox_weight + EXCLUDED.checkbox_weight,
+        other_responses = {table}.other_responses + EXCLUDED.other_responses
+"""
+
+
+def rebuild_sql(table: str) -> str:
+    """Add the VOTES_SQL votes to a counters table's compacted shard, under each voter's current year"""
+    return f"""
+        INSERT INTO {table} (question_code, option_select, year_of_birth, shard,
+                             responses, checkbox_weight, other_responses)
+        SELECT s.question_code, s.option_select, COALESCE(u.year_of_birth, 0), {COMPACTED_SHARD},
+               SUM(s.responses), SUM(s.checkbox_weight), SUM(s.other_responses)
+        FROM ({VOTES_SQL}) s
+        LEFT JOIN users u ON u.user_uuid = s.user_uuid
+        GROUP BY s.question_code, s.option_select, COALESCE(u.year_of_birth, 0)
+        {_ADD_ON_CONFLICT.format(table=table)}
+    """
+
+
+def move_known_years_sql(table: str, unknown_users_table: str) -> str:
+    """Move the VOTES_SQL votes of users listed in unknown_users_table who now have a
+    year_of_birth from year 0 to that year, in a counters table's compacted shard"""
+    return f"""
+        INSERT INTO {table} (question_code, option_select, year_of_birth, shard,
+                             responses, checkbox_weight, other_responses)
+        SELECT s.question_code, s.option_select, y.year_of_birth, {COMPACTED_SHARD},
+               SUM(s.responses) * y.sign, SUM(s.checkbox_weight) * y.sign, SUM(s.other_responses) * y.sign
+        FROM ({VOTES_SQL}) s
+        JOIN {unknown_users_table} k ON k.user_uuid = s.user_uuid
+        JOIN users u ON u.user_uuid = s.user_uuid AND u.year_of_birth IS NOT NULL
+        CROSS JOIN LATERAL (VALUES (0, -1), (u.year_of_birth::int, 1)) AS y(year_of_birth, sign)
+        GROUP BY s.question_code, s.option_select, y.year_of_birth, y.sign
+        {_ADD_ON_CONFLICT.format(table=table)}
+    """
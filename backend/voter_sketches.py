@@ -0,0 +1,195 @@
+"""
+Distinct-voter counts from HyperLogLog sketches.
+
+/api/results reports weighted vote counts; how many different students
+answered would take a COUNT(DISTINCT user_uuid) over every response table.
+Instead each vote adds its user to three HyperLogLog sketches - its
+question, its block ("category_block") and its category - for the UTC day
+it was cast. Each instance keeps the sketches it touched in memory and
+flushes them every VOTER_SKETCH_FLUSH_INTERVAL seconds into voter_sketches,
+one row per (scope, scope_key, day).
+
+A sketch is PRECISION_BITS = 12, i.e. 4096 one-byte registers, whatever
+the number of voters. The standard error of an estimate is
+1.04 / sqrt(4096) = 1.6%, so about 95% of estimates fall within 3.3% of
+the true count; below roughly 10,000 voters linear counting takes over
+and the error is smaller. Rows store the registers zlib-compressed, so a
+day with few voters takes tens of bytes rather than 4 KiB.
+
+Merging two sketches takes the per-register maximum. That is order-free
+and idempotent: instances, days and retried flushes combine in any order,
+and adding a voter twice (a repeated vote, a re-run backfill) changes
+nothing. Reads merge the stored days with this instance's unflushed
+sketches; other instances' last few seconds of votes show up after their
+next flush.
+"""
+
+import hashlib
+import math
+import threading
+import zlib
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PRECISION_BITS = 12
+REGISTERS = 1 << PRECISION_BITS
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+SCOPE_QUESTION = "question"
+SCOPE_BLOCK = "block"
+SCOPE_CATEGORY = "category"
+
+# Advisory lock key serializing flushes, so two instances never overwrite
+# each other's merge of the same row
+FLUSH_LOCK_KEY = 4804801
+
+_RANK_BITS = 64 - PRECISION_BITS
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def voter_hash(user_uuid: str) -> Tuple[int, int]:
+    """(register index, rank) of a user, stable across processes"""
+    value = int.from_bytes(hashlib.blake2b(user_uuid.encode(), digest_size=8).digest(), "little")
+    index = value >> _RANK_BITS
+    rest = value & ((1 << _RANK_BITS) - 1)
+    return index, _RANK_BITS - rest.bit_length() + 1
+
+
+class HyperLogLog:
+    """Fixed-size distinct counter: 4096 registers, each the highest rank seen"""
+
+    def __init__(self, registers: Optional[bytes] = None):
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    def add_hash(self, index: int, rank: int):
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, user_uuid: str):
+        self.add_hash(*voter_hash(user_uuid))
+
+    def merge(self, other: "HyperLogLog"):
+        """Fold another sketch into this one (register-wise maximum)"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        """Estimated number of distinct voters added"""
+        total = math.fsum(2.0 ** -register for register in self.registers)
+        estimate = _ALPHA * REGISTERS * REGISTERS / total
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(zlib.decompress(data))
+
+
+SketchKey = Tuple[str, str, date]
+
+
+def today() -> date:
+    """The current day bucket (UTC)"""
+    return datetime.now(timezone.utc).date()
+
+
+def sketch_keys(question: Dict[str, Any], day: date) -> List[SketchKey]:
+    """The question, block and category sketches a vote on `question` feeds"""
+    return [
+        (SCOPE_QUESTION, question['question_code'], day),
+        (SCOPE_BLOCK, f"{question['category_id']}_{question['block_number']}", day),
+        (SCOPE_CATEGORY, str(question['category_id']), day),
+    ]
+
+
+class VoterSketches:
+    """Sketches touched since the last flush, keyed by (scope, scope_key, day)"""
+
+    def __init__(self):
+        self.pending: Dict[SketchKey, HyperLogLog] = {}
+        self.lock = threading.Lock()
+
+    def add(self, user_uuid: str, question: Dict[str, Any], day: Optional[date] = None):
+        """Count a committed vote by user_uuid on question (today, UTC, by default)"""
+        index, rank = voter_hash(user_uuid)
+        day = day or today()
+        with self.lock:
+            for key in sketch_keys(question, day):
+                sketch = self.pending.get(key)
+                if sketch is None:
+                    sketch = self.pending[key] = HyperLogLog()
+                sketch.add_hash(index, rank)
+
+    def take(self) -> Dict[SketchKey, HyperLogLog]:
+        """Hand every pending sketch to a flush"""
+        with self.lock:
+            taken, self.pending = self.pending, {}
+            return taken
+
+    def restore(self, taken: Dict[SketchKey, HyperLogLog]):
+        """Put back sketches whose flush failed"""
+        with self.lock:
+            for key, sketch in taken.items():
+                if key in self.pending:
+                    sketch.merge(self.pending[key])
+                self.pending[key] = sketch
+
+    def unflushed(self, scope: str, scope_key: str, since: Optional[date] = None) -> List[HyperLogLog]:
+        """Copies of this instance's pending sketches for one scope key"""
+        with self.lock:
+            return [
+                HyperLogLog(sketch.registers) for (s, k, day), sketch in self.pending.items()
+                if s == scope and k == scope_key and (since is None or day >= since)
+            ]
+
+
+LOAD_SQL = """
+    SELECT registers FROM voter_sketches
+    WHERE scope = %s AND scope_key = %s AND bucket = %s
+    FOR UPDATE
+"""
+
+UPSERT_SQL = """
+    INSERT INTO voter_sketches (scope, scope_key, bucket, registers, updated_at)
+    VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (scope, scope_key, bucket) DO UPDATE SET
+        registers = EXCLUDED.registers,
+        updated_at = EXCLUDED.updated_at
+"""
+
+READ_SQL = """
+    SELECT registers FROM voter_sketches
+    WHERE scope = %s AND scope_key = %s AND bucket >= %s
+"""
+
+
+def flush(conn, sketches: Dict[SketchKey, HyperLogLog]) -> int:
+    """Merge sketches into voter_sketches on conn and commit; returns rows written"""
+    if not sketches:
+        return 0
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (FLUSH_LOCK_KEY,))
+    for (scope, scope_key, day), sketch in sketches.items():
+        cursor.execute(LOAD_SQL, (scope, scope_key, day))
+        row = cursor.fetchone()
+        merged = HyperLogLog(sketch.registers)
+        if row is not None:
+            merged.merge(HyperLogLog.from_bytes(bytes(row[0])))
+        cursor.execute(UPSERT_SQL, (scope, scope_key, day, merged.to_bytes()))
+    conn.commit()
+    return len(sketches)
+
+
+def estimate(rows: Iterable[Dict[str, Any]], unflushed: Iterable[HyperLogLog] = ()) -> int:
+    """Distinct voters across stored READ_SQL rows and unflushed sketches"""
+    merged = HyperLogLog()
+    for row in rows:
+        merged.merge(HyperLogLog.from_bytes(bytes(row['registers'])))
+    for sketch in unflushed:
+        merged.merge(sketch)
+    return merged.estimate()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Lane isolation benchmark: /api/vote latency with and without slow admin work.
+
+Measures single-choice vote latency on an idle server, then again while
+background threads keep slow admin-lane requests (by default GET /api/users,
+a full table read) in flight. With database handlers running in the
+threadpool the two runs should match: admin work only ties up admin-lane
+connections and threads, never the event loop the votes are served from.
+
+Run it against a scratch deployment; every vote uses a fresh user uuid.
+
+Usage:
+    python benchmark-scripts/bench_lane_isolation.py [base_url] [question_code] [option_select] [votes] [admin_workers] [admin_path]
+"""
+
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+
+def request(url: str, body: dict = None) -> float:
+    """Send one request and return its latency in seconds"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+    except urllib.error.HTTPError as e:
+        e.read()
+    return time.perf_counter() - started
+
+
+def measure_votes(base_url: str, question_code: str, option_select: str, votes: int) -> list:
+    latencies = []
+    for _ in range(votes):
+        latencies.append(request(f"{base_url}/api/vote", {
+            "user_uuid": str(uuid.uuid4()),
+            "question_code": question_code,
+            "option_select": option_select,
+        }))
+    return latencies
+
+
+def admin_worker(url: str, stop: threading.Event, done: list):
+    while not stop.is_set():
+        request(url)
+        done.append(1)
+
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"📊 {label:<22} p50 {p50:8.1f} ms   p99 {p99:8.1f} ms   max {latencies[-1] * 1000:8.1f} ms")
+
+
+def bench(base_url="http://localhost:8000", question_code="1_1", option_select="A", votes=200,
+          admin_workers=2, admin_path="/api/users"):
+    print(f"🔄 {votes} votes on {question_code}/{option_select} against {base_url}")
+    report("idle", measure_votes(base_url, question_code, option_select, votes))
+
+    stop = threading.Event()
+    done = []
+    workers = [
+        threading.Thread(target=admin_worker, args=(f"{base_url}{admin_path}", stop, done), daemon=True)
+        for _ in range(admin_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    # Let the admin requests reach the database before measuring
+    time.sleep(0.5)
+    report(f"{admin_workers} x {admin_path}", measure_votes(base_url, question_code, option_select, votes))
+    stop.set()
+    print(f"✅ {len(done)} admin requests completed during the run")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    bench(
+        *(args[:3]),
+        *(int(arg) for arg in args[3:5]),
+        *(args[5:6]),
+    )
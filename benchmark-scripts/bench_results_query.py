@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: /api/results tally as four queries + Python merge vs the
+single statement in backend/results_query.py.
+
+Builds a scratch schema (bench_results) with copies of the questions,
+options and response tables, fills it with synthetic votes spread over
+200 questions, and times both versions for one question at each size.
+Run it with the API's DB_* environment variables; the scratch schema is
+dropped at the end.
+
+Usage:
+    python benchmark-scripts/bench_results_query.py [iterations] [rows ...]
+
+    rows defaults to 1000000 10000000 (single-choice rows; checkbox rows
+    are half of that and free-text rows a tenth). Option E never gets a
+    vote, so only the single statement reports it (with count 0).
+
+Measured on PostgreSQL 16 with default settings on a 1 vCPU / 5 GB VM,
+client on the same machine, 20 iterations:
+
+            rows    four queries ms (p50/max)   one statement ms (p50/max)  speedup
+       1,000,000           16.59 / 23.21                16.68 / 23.67          1.0x
+      10,000,000          340.15 / 388.06              348.65 / 411.80         1.0x
+
+Both versions are bound by heap fetches for the target question's votes
+(about 8,000 pages at 1M rows and 80,000 at 10M), so on a local socket
+they take the same time. The single statement's gain is the three round
+trips it saves, which a local socket does not show; on a network link
+each one adds its round-trip time to the four-query version.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from db_config import connect  # noqa: E402
+import results_query  # noqa: E402
+
+SCHEMA = "bench_results"
+QUESTIONS = 200
+OPTIONS = "ABCDE"
+TARGET = "bench_1_1_1"
+
+
+def fetch(cursor, query, params=()):
+    cursor.execute(query, params)
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def legacy_results(cursor, question_code):
+    """The pre-single-statement get_results, kept here for comparison"""
+    if not fetch(cursor, "SELECT * FROM questions WHERE question_code = %s", (question_code,)):
+        return None
+    single = fetch(cursor, """
+        SELECT option_select, COUNT(*) as count FROM responses
+        WHERE question_code = %s GROUP BY option_select ORDER BY option_select
+    """, (question_code,))
+    checkbox = fetch(cursor, """
+        SELECT option_select, SUM(weight) as count FROM checkbox_responses
+        WHERE question_code = %s GROUP BY option_select ORDER BY option_select
+    """, (question_code,))
+    other = fetch(cursor, "SELECT COUNT(*) as count FROM other_responses WHERE question_code = %s", (question_code,))
+    merged = {}
+    for row in single + checkbox:
+        if row['option_select'] in merged:
+            merged[row['option_select']]['count'] += row['count']
+        else:
+            merged[row['option_select']] = dict(row)
+    if other[0]['count'] > 0 and 'OTHER' not in merged:
+        merged['OTHER'] = {'option_select': 'OTHER', 'count': other[0]['count']}
+    return sorted(merged.values(), key=lambda r: r['option_select'])
+
+
+def single_statement_results(cursor, question_code):
+    return results_query.read_results(fetch(cursor, results_query.RESULTS_SQL, (question_code,)))
+
+
+def populate(conn, rows):
+    cursor = conn.cursor()
+    print(f"📦 Loading {rows:,} single-choice rows into {SCHEMA}...")
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    # Own id sequence so the copied SERIAL defaults do not advance the real tables' sequences
+    cursor.execute(f"CREATE SEQUENCE {SCHEMA}.ids")
+    for table in ("questions", "options", "responses", "checkbox_responses", "other_responses"):
+        cursor.execute(f"CREATE TABLE {SCHEMA}.{table} (LIKE public.{table} INCLUDING DEFAULTS INCLUDING INDEXES)")
+        cursor.execute(f"ALTER TABLE {SCHEMA}.{table} ALTER COLUMN id SET DEFAULT nextval('{SCHEMA}.ids')")
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.execute(f"""
+        INSERT INTO questions (category_id, question_code, question_number, question_text, block_number)
+        SELECT 1, 'bench_1_1_' || q, q, 'Benchmark question ' || q, 1 FROM generate_series(1, {QUESTIONS}) q
+    """)
+    cursor.execute(f"""
+        INSERT INTO options (category_id, question_code, question_number, question_text, block_number, block_text,
+                             option_select, option_code, option_text)
+        SELECT 1, question_code, question_number, question_text, 1, 'Benchmark block', o, question_code || '_' || o,
+               'Option ' || o
+        FROM questions, unnest(string_to_array('{",".join(OPTIONS)}', ',')) o
+    """)
+    denormalized = """
+        'bench_1_1_' || (1 + i % {questions}), 'Benchmark question text that is about as long as a real one',
+        1 + i % {questions}, 1, 'Benchmark category', 'Benchmark category text', 1
+    """.format(questions=QUESTIONS)
+    cursor.execute(f"""
+        INSERT INTO responses (user_uuid, question_code, question_text, question_number, category_id, category_name,
+                               category_text, block_number, option_id, option_select, option_code, option_text)
+        SELECT md5(i::text)::uuid, {denormalized}, 1, substr('{OPTIONS[:-1]}', 1 + (i / {QUESTIONS}) % 4, 1), 'opt', 'Option'
+        FROM generate_series(1, {rows}) i
+    """)
+    cursor.execute(f"""
+        INSERT INTO checkbox_responses (user_uuid, question_code, question_text, question_number, category_id,
+                                        category_name, category_text, block_number, option_id, option_select,
+                                        option_code, option_text, weight, created_at)
+        SELECT md5(i::text)::uuid, {denormalized}, 1, substr('{OPTIONS[:-1]}', 1 + (i / {QUESTIONS}) % 4, 1), 'opt', 'Option',
+               0.5, now()
+        FROM generate_series(1, {rows // 2}) i
+    """)
+    cursor.execute(f"""
+        INSERT INTO other_responses (user_uuid, question_code, question_text, question_number, category_id,
+                                     category_name, category_text, block_number, other_text)
+        SELECT md5(i::text)::uuid, {denormalized}, 'free text'
+        FROM generate_series(1, {rows // 10}) i
+    """)
+    conn.commit()
+
+
+def time_it(cursor, fn, iterations):
+    fn(cursor, TARGET)  # warm the buffer cache
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(cursor, TARGET)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sizes = [int(n) for n in sys.argv[2:]] or [1_000_000, 10_000_000]
+
+    conn = connect()
+    print(f"{'rows':>12} {'four queries ms (p50/max)':>28} {'one statement ms (p50/max)':>28} {'speedup':>8}")
+    for rows in sizes:
+        populate(conn, rows)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute("ANALYZE")
+        cursor.execute(f"SET search_path TO {SCHEMA}")
+        legacy = [(r['option_select'], float(r['count'])) for r in legacy_results(cursor, TARGET)]
+        single = [(r['option_select'], float(r['count'])) for r in single_statement_results(cursor, TARGET)
+                  if r['count']]
+        assert legacy == single, f"results differ: {legacy} vs {single}"
+        old_p50, old_max = time_it(cursor, legacy_results, iterations)
+        new_p50, new_max = time_it(cursor, single_statement_results, iterations)
+        print(f"{rows:>12,} {old_p50:>15.2f} / {old_max:<10.2f} {new_p50:>15.2f} / {new_max:<10.2f} "
+              f"{old_p50 / new_p50:>7.1f}x")
+        conn.autocommit = False
+
+    conn.cursor().execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
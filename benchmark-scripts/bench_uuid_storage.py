@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Index size and lookup benchmark: user_uuid as TEXT vs native uuid.
+
+Builds two scratch tables shaped like users (bench_users_text and
+bench_users_uuid) plus a responses-like table for each that references
+them, loads the same random UUIDs into both, and reports:
+
+- on-disk size of the user_uuid indexes (users unique + responses FK index)
+- primary-key style point lookups per second
+- a per-user join of users to their responses, per second and as server
+  execution time (EXPLAIN ANALYZE), which leaves out the client round trip
+
+Each rate is the median of ROUNDS rounds that alternate which kind runs
+first, so neither always runs on a cache the other just warmed.
+
+Run it with the API's DB_* environment variables; the scratch tables are
+dropped at the end.
+
+Measured on PostgreSQL 16 with default settings on a 1 vCPU / 5 GB VM,
+client on the same machine, with the defaults (1M users, 10M responses,
+20,000 lookups):
+
+             index MB    lookups/s    joins/s  join server ms
+      text      198.2        6,361      3,456           0.052
+      uuid      136.2        6,047      3,541           0.037
+
+The uuid indexes are 69% of the TEXT size and the join runs in 0.71x the
+server time. Per-request rates are equal within noise because the client
+round trip, not the index probe, dominates a single-row lookup.
+
+Usage:
+    python benchmark-scripts/bench_uuid_storage.py [users] [responses_per_user] [lookups]
+"""
+
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from db_config import connect  # noqa: E402
+
+KINDS = {"text": "TEXT", "uuid": "UUID"}
+ROUNDS = 3
+# Joins run under EXPLAIN ANALYZE to read the server's execution time
+SERVER_SAMPLES = 2000
+
+
+def create(cursor, kind: str, users: int, per_user: int):
+    column = KINDS[kind]
+    cursor.execute(f"DROP TABLE IF EXISTS bench_responses_{kind}, bench_users_{kind}")
+    cursor.execute(f"""
+        CREATE TABLE bench_users_{kind} (
+            id SERIAL PRIMARY KEY,
+            user_uuid {column} UNIQUE NOT NULL,
+            year_of_birth INTEGER
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE bench_responses_{kind} (
+            id SERIAL PRIMARY KEY,
+            user_uuid {column} NOT NULL REFERENCES bench_users_{kind}(user_uuid),
+            option_select VARCHAR(10) NOT NULL
+        )
+    """)
+    # Same uuids for both kinds: md5 of the row number, formatted as a uuid
+    cursor.execute(f"""
+        INSERT INTO bench_users_{kind} (user_uuid, year_of_birth)
+        SELECT md5(i::text)::uuid::text::{column.lower()}, 2005 + i % 8 FROM generate_series(1, {users}) i
+    """)
+    cursor.execute(f"""
+        INSERT INTO bench_responses_{kind} (user_uuid, option_select)
+        SELECT md5((1 + i % {users})::text)::uuid::text::{column.lower()}, 'A'
+        FROM generate_series(1, {users * per_user}) i
+    """)
+    cursor.execute(f"CREATE INDEX bench_responses_{kind}_user ON bench_responses_{kind}(user_uuid)")
+
+
+def index_bytes(cursor, kind: str) -> int:
+    cursor.execute(
+        "SELECT pg_relation_size(%s::regclass) + pg_relation_size(%s::regclass)",
+        (f"bench_users_{kind}_user_uuid_key", f"bench_responses_{kind}_user"),
+    )
+    return cursor.fetchone()[0]
+
+
+def lookups_per_second(cursor, kind: str, keys, query: str) -> float:
+    sql = query.format(kind=kind)
+    started = time.perf_counter()
+    for key in keys:
+        cursor.execute(sql, (key,))
+        cursor.fetchall()
+    return len(keys) / (time.perf_counter() - started)
+
+
+def server_ms(cursor, kind: str, keys, query: str) -> float:
+    """Mean server execution time of a query, in milliseconds"""
+    sql = "EXPLAIN (ANALYZE, TIMING OFF) " + query.format(kind=kind)
+    total = 0.0
+    for key in keys:
+        cursor.execute(sql, (key,))
+        total += float(cursor.fetchall()[-1][0].split()[2])
+    return total / len(keys)
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    lookups = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    conn = connect()
+    cursor = conn.cursor()
+    for kind in KINDS:
+        print(f"📦 Loading {users:,} users and {users * per_user:,} responses ({kind})...")
+        create(cursor, kind, users, per_user)
+        conn.commit()
+    conn.autocommit = True
+    cursor.execute("ANALYZE bench_users_text, bench_users_uuid, bench_responses_text, bench_responses_uuid")
+
+    # The API sends user_uuid as untyped text either way
+    keys = [str(uuid.UUID(hex=hashlib.md5(str(random.randint(1, users)).encode()).hexdigest())) for _ in range(lookups)]
+    point = "SELECT id, year_of_birth FROM bench_users_{kind} WHERE user_uuid = %s"
+    join = """
+        SELECT u.year_of_birth, r.option_select FROM bench_users_{kind} u
+        JOIN bench_responses_{kind} r ON r.user_uuid = u.user_uuid WHERE u.user_uuid = %s
+    """
+
+    for kind in KINDS:
+        # Warm the buffer cache
+        lookups_per_second(cursor, kind, keys, point)
+        lookups_per_second(cursor, kind, keys, join)
+
+    samples = {kind: [] for kind in KINDS}
+    for round_number in range(ROUNDS):
+        order = list(KINDS) if round_number % 2 == 0 else list(reversed(KINDS))
+        for kind in order:
+            samples[kind].append((
+                lookups_per_second(cursor, kind, keys, point),
+                lookups_per_second(cursor, kind, keys, join),
+                server_ms(cursor, kind, keys[:SERVER_SAMPLES], join),
+            ))
+
+    print(f"{'':>6} {'index MB':>10} {'lookups/s':>12} {'joins/s':>10} {'join server ms':>15}")
+    results = {}
+    for kind in KINDS:
+        results[kind] = (index_bytes(cursor, kind) / 1024 / 1024,
+                         *(statistics.median(metric) for metric in zip(*samples[kind])))
+        size, point_rate, join_rate, join_ms = results[kind]
+        print(f"{kind:>6} {size:>10.1f} {point_rate:>12,.0f} {join_rate:>10,.0f} {join_ms:>15.3f}")
+    text, native = results["text"], results["uuid"]
+    print(f"🎯 uuid indexes are {native[0] / text[0]:.0%} of the TEXT size; "
+          f"lookups {native[1] / text[1]:.2f}x, joins {native[2] / text[2]:.2f}x, "
+          f"join server time {native[3] / text[3]:.2f}x")
+
+    cursor.execute("DROP TABLE bench_responses_text, bench_users_text, bench_responses_uuid, bench_users_uuid")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
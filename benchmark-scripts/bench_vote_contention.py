@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark: one counter row per option vs sharded counters.
+
+Every worker thread holds its own connection and repeatedly votes for the
+same question/option, the worst case of a start question everyone answers.
+With a single row every transaction queues on that row's lock, so
+throughput stays flat as workers are added; with per-connection shards it
+should scale until the database runs out of CPU or WAL bandwidth.
+
+Runs against a scratch copy of the vote_counters table (bench_vote_counters)
+using the API's DB_* environment variables.
+
+Measured on PostgreSQL 16 with default settings on a 1 vCPU / 5 GB VM,
+client on the same machine, 10 s per run:
+
+     workers   single row votes/s    sharded votes/s  speedup
+           1                  856                809     0.9x
+           2                  902                813     0.9x
+           4                  740                930     1.3x
+           8                  698                627     0.9x
+          16                  718                530     0.7x
+          32                  290                493     1.7x
+
+With a single core the server is CPU-bound before the row lock matters,
+so sharding only pays off at 32 workers, where the single row collapses.
+Repeat the run on the production instance class before relying on a
+speedup; the row lock only dominates once several cores commit at once.
+
+Usage:
+    python benchmark-scripts/bench_vote_contention.py [seconds_per_run] [max_workers]
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from db_config import connect  # noqa: E402
+import vote_counters  # noqa: E402
+
+SHARDS = 16
+# No such user, so every vote lands in the unknown year_of_birth bucket
+BENCH_USER = "00000000-0000-0000-0000-000000000000"
+
+
+def counter_sql(sharded: bool) -> str:
+    sql = vote_counters.increment_sql(1, vote_counters.SHARD_BY_CONNECTION, SHARDS)
+    if not sharded:
+        sql = sql.replace(vote_counters.shard_expression(vote_counters.SHARD_BY_CONNECTION, SHARDS), "1")
+    return sql.replace("vote_counters", "bench_vote_counters")
+
+
+def worker(sql: str, stop: threading.Event, counts: list, index: int):
+    conn = connect()
+    cursor = conn.cursor()
+    done = 0
+    while not stop.is_set():
+        cursor.execute(sql, ("bench_1_1", "A", 1, 0.0, 0, BENCH_USER))
+        conn.commit()
+        done += 1
+    counts[index] = done
+    conn.close()
+
+
+def run(sharded: bool, workers: int, seconds: float) -> float:
+    sql = counter_sql(sharded)
+    stop = threading.Event()
+    counts = [0] * workers
+    threads = [threading.Thread(target=worker, args=(sql, stop, counts, i)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS bench_vote_counters")
+    cursor.execute("CREATE TABLE bench_vote_counters (LIKE vote_counters INCLUDING ALL)")
+    conn.commit()
+
+    print(f"{'workers':>8} {'single row votes/s':>20} {'sharded votes/s':>18} {'speedup':>8}")
+    workers = 1
+    while workers <= max_workers:
+        single = run(False, workers, seconds)
+        sharded = run(True, workers, seconds)
+        print(f"{workers:>8} {single:>20.0f} {sharded:>18.0f} {sharded / single:>7.1f}x")
+        workers *= 2
+
+    cursor.execute("DROP TABLE bench_vote_counters")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
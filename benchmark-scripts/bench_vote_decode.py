@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: decode + validate cost per vote payload.
+
+Compares the old /api/vote request path (generic JSON into Dict[str, Any],
+FastAPI's pydantic check of the dict, then the hand-written isinstance
+checks) with the typed msgspec decoder used by backend/main.py today.
+
+Usage:
+    python benchmark-scripts/bench_vote_decode.py [iterations]
+"""
+
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import schemas  # noqa: E402
+
+try:
+    from pydantic import TypeAdapter
+    dict_adapter = TypeAdapter(Dict[str, Any])
+except ImportError:  # pydantic v1 or missing - measure the JSON + isinstance part only
+    dict_adapter = None
+
+VOTE_BODY = json.dumps({
+    "question_code": "3_2_4",
+    "option_select": "B",
+    "user_uuid": "0b7c8a52-4f5e-4d8b-9f3e-2b6a1c9d7e10",
+}).encode()
+
+CHECKBOX_BODY = json.dumps({
+    "question_code": "5_1_2",
+    "option_selects": ["A", "C", "D", "OTHER"],
+    "user_uuid": "0b7c8a52-4f5e-4d8b-9f3e-2b6a1c9d7e10",
+    "other_text": "something else entirely",
+}).encode()
+
+
+def legacy_vote(body: bytes):
+    data = json.loads(body)
+    if dict_adapter is not None:
+        data = dict_adapter.validate_python(data)
+    if not isinstance(data.get('question_code'), str):
+        raise ValueError("question_code must be a string")
+    if not isinstance(data.get('option_select'), str):
+        raise ValueError("option_select must be a string")
+    if not isinstance(data.get('user_uuid'), str):
+        raise ValueError("user_uuid must be a string")
+    return data
+
+
+def legacy_checkbox_vote(body: bytes):
+    data = json.loads(body)
+    if dict_adapter is not None:
+        data = dict_adapter.validate_python(data)
+    if not isinstance(data.get('question_code'), str):
+        raise ValueError("question_code must be a string")
+    if not isinstance(data.get('option_selects'), list):
+        raise ValueError("option_selects must be a list")
+    if not isinstance(data.get('user_uuid'), str):
+        raise ValueError("user_uuid must be a string")
+    return data
+
+
+def report(name: str, func, body: bytes, iterations: int) -> float:
+    best = min(timeit.repeat(lambda: func(body), number=iterations, repeat=5))
+    per_call = best / iterations * 1e9
+    print(f"  {name:<28} {per_call:8.0f} ns/payload")
+    return per_call
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"Decode + validate, best of 5 x {iterations} iterations")
+    if dict_adapter is None:
+        print("  (pydantic not installed - legacy path excludes FastAPI's dict validation)")
+
+    print("/api/vote")
+    legacy = report("json + Dict[str, Any] + checks", legacy_vote, VOTE_BODY, iterations)
+    typed = report("msgspec VoteRequest", schemas.vote_decoder.decode, VOTE_BODY, iterations)
+    print(f"  speedup: {legacy / typed:.1f}x")
+
+    print("/api/checkbox_vote")
+    legacy = report("json + Dict[str, Any] + checks", legacy_checkbox_vote, CHECKBOX_BODY, iterations)
+    typed = report("msgspec CheckboxVoteRequest", schemas.checkbox_vote_decoder.decode, CHECKBOX_BODY, iterations)
+    print(f"  speedup: {legacy / typed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
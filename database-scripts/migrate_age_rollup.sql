@@ -0,0 +1,10 @@
+-- Split vote_counters by the voter's year_of_birth for the by_age results
+-- endpoints (0 = year unknown). Existing counters all land in year 0; run
+-- backend/rebuild_vote_counters.py afterwards to spread them over the years.
+-- Requires migrate_vote_counters.sql.
+
+BEGIN;
+ALTER TABLE vote_counters ADD COLUMN IF NOT EXISTS year_of_birth SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE vote_counters DROP CONSTRAINT IF EXISTS vote_counters_pkey;
+ALTER TABLE vote_counters ADD PRIMARY KEY (question_code, option_select, year_of_birth, shard);
+COMMIT;
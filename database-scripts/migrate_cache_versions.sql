@@ -0,0 +1,13 @@
+-- Shared cache version counters for cross-instance invalidation
+-- /api/setup and /api/import_data bump the 'catalog' row and NOTIFY
+-- catalog_version; every instance LISTENs and also polls this table in case
+-- its listener connection dropped.
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO cache_versions (name, version) VALUES ('catalog', 1)
+ON CONFLICT (name) DO NOTHING;
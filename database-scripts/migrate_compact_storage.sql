@@ -0,0 +1,76 @@
+-- Compact storage for the response tables (STORAGE_MODE=compact)
+-- Creates the dimension and fact tables. Then run
+--     python backend/migrate_compact_storage.py copy
+-- (repeatable, safe while the API is live) and, with the API stopped,
+--     python backend/migrate_compact_storage.py cutover
+-- which renames the wide tables to *_wide and creates compatibility views
+-- in their place. Start the API again with STORAGE_MODE=compact.
+-- user_uuid must match users.user_uuid: use UUID instead of TEXT if
+-- backend/migrate_uuid_storage.py has already converted the users table.
+
+CREATE TABLE IF NOT EXISTS response_questions (
+    id SERIAL PRIMARY KEY,
+    question_code VARCHAR(50) UNIQUE NOT NULL,
+    question_text TEXT NOT NULL,
+    question_number INTEGER,
+    category_id INTEGER,
+    category_name VARCHAR(100) NOT NULL,
+    category_text TEXT,
+    block_number INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS response_options (
+    id SERIAL PRIMARY KEY,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    option_select VARCHAR(10) NOT NULL,
+    option_code VARCHAR(50) NOT NULL,
+    option_text TEXT NOT NULL,
+    UNIQUE (question_id, option_select)
+);
+
+CREATE TABLE IF NOT EXISTS response_facts (
+    id SERIAL PRIMARY KEY,
+    user_uuid TEXT NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    option_id INTEGER NOT NULL REFERENCES response_options(id),
+    block_number SMALLINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS checkbox_response_facts (
+    id SERIAL PRIMARY KEY,
+    user_uuid TEXT NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    option_id INTEGER NOT NULL REFERENCES response_options(id),
+    block_number SMALLINT,
+    weight REAL DEFAULT 1.0,
+    -- The user's own text for a checked OTHER box, NULL otherwise
+    other_text TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+-- Earlier versions of this script added UNIQUE (user_uuid, option_id, created_at),
+-- which never deduplicated anything: like checkbox_responses, the table keeps
+-- every submission
+ALTER TABLE checkbox_response_facts
+    DROP CONSTRAINT IF EXISTS checkbox_response_facts_user_uuid_option_id_created_at_key;
+
+CREATE TABLE IF NOT EXISTS other_response_facts (
+    id SERIAL PRIMARY KEY,
+    user_uuid TEXT NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    block_number SMALLINT,
+    other_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_response_facts_question ON response_facts(question_id, option_id);
+CREATE INDEX IF NOT EXISTS idx_response_facts_user ON response_facts(user_uuid);
+CREATE INDEX IF NOT EXISTS idx_response_facts_created ON response_facts(created_at);
+
+CREATE INDEX IF NOT EXISTS idx_checkbox_response_facts_question ON checkbox_response_facts(question_id, option_id);
+CREATE INDEX IF NOT EXISTS idx_checkbox_response_facts_user ON checkbox_response_facts(user_uuid);
+CREATE INDEX IF NOT EXISTS idx_checkbox_response_facts_created ON checkbox_response_facts(created_at);
+
+CREATE INDEX IF NOT EXISTS idx_other_response_facts_question ON other_response_facts(question_id);
+CREATE INDEX IF NOT EXISTS idx_other_response_facts_user ON other_response_facts(user_uuid);
+CREATE INDEX IF NOT EXISTS idx_other_response_facts_created ON other_response_facts(created_at);
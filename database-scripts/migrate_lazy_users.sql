@@ -0,0 +1,5 @@
+-- Allow votes to create their user lazily
+-- The vote endpoints insert a missing user with no year_of_birth in the same
+-- transaction as the vote; /api/users fills it in on the next visit.
+
+ALTER TABLE users ALTER COLUMN year_of_birth DROP NOT NULL;
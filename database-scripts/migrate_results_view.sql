@@ -0,0 +1,25 @@
+-- Materialized results view for RESULTS_SOURCE=matview
+-- The API refreshes it CONCURRENTLY every RESULTS_MATVIEW_REFRESH_INTERVAL
+-- seconds and records the refresh time in cache_versions ('results_mv').
+-- Requires migrate_cache_versions.sql.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS results_mv AS
+SELECT question_code, option_select,
+       CASE WHEN bool_or(source <> 'other')
+            THEN SUM(votes) FILTER (WHERE source <> 'other')
+            ELSE SUM(votes)
+       END AS count
+FROM (
+    SELECT question_code, option_select, 'single' AS source, COUNT(*)::float8 AS votes
+    FROM responses GROUP BY question_code, option_select
+    UNION ALL
+    SELECT question_code, option_select, 'checkbox', SUM(weight)::float8
+    FROM checkbox_responses GROUP BY question_code, option_select
+    UNION ALL
+    SELECT question_code, 'OTHER', 'other', COUNT(*)::float8
+    FROM other_responses GROUP BY question_code
+) tallies
+GROUP BY question_code, option_select;
+
+-- REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX IF NOT EXISTS idx_results_mv_key ON results_mv(question_code, option_select);
@@ -0,0 +1,13 @@
+-- Vote rate snapshots behind /api/trending
+-- Every TRENDING_SNAPSHOT_INTERVAL seconds each API instance replaces its
+-- rows with its votes per question over the 1m, 15m and 1h windows, and
+-- adds up the other instances' recent rows.
+
+CREATE TABLE IF NOT EXISTS trending_snapshots (
+    instance_id VARCHAR(100) NOT NULL,
+    window_name VARCHAR(10) NOT NULL,
+    question_code VARCHAR(50) NOT NULL,
+    votes BIGINT NOT NULL,
+    taken_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instance_id, window_name, question_code)
+);
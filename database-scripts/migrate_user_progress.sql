@@ -0,0 +1,29 @@
+-- Per-user answered-question bitmaps for /api/users/{uuid}/progress
+-- Bit n is set once the user has answered the question that question_bits
+-- maps to n. Populate it for existing responses with
+-- backend/backfill_user_progress.py.
+--
+-- question_bits is only ever appended to (the API assigns bits to new codes
+-- when it loads the catalog), so a code keeps its bit when /api/setup drops
+-- and renumbers the questions table. It is seeded with the current
+-- questions.id, which earlier versions of this migration used as the bit,
+-- so bitmaps written against the current catalog stay correct. Bitmaps
+-- written before a catalog reload point at the wrong questions: empty
+-- user_progress and rerun the backfill to rebuild them from the votes.
+
+CREATE TABLE IF NOT EXISTS question_bits (
+    question_code VARCHAR(50) PRIMARY KEY,
+    bit SERIAL UNIQUE
+);
+
+INSERT INTO question_bits (question_code, bit)
+SELECT question_code, id FROM questions
+ON CONFLICT (question_code) DO NOTHING;
+
+SELECT setval(pg_get_serial_sequence('question_bits', 'bit'), (SELECT COALESCE(MAX(bit), 0) + 1 FROM question_bits), false);
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_uuid TEXT PRIMARY KEY REFERENCES users(user_uuid) ON DELETE CASCADE,
+    answered BYTEA NOT NULL DEFAULT '',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
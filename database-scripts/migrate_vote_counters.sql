@@ -0,0 +1,14 @@
+-- Sharded vote counters for RESULTS_SOURCE=counters
+-- Votes add to one of N shard rows (shard 1..N, picked per connection or per
+-- user); the API compacts shards into shard 0 every few minutes.
+-- Populate from existing votes with backend/rebuild_vote_counters.py.
+
+CREATE TABLE IF NOT EXISTS vote_counters (
+    question_code VARCHAR(50) NOT NULL,
+    option_select VARCHAR(10) NOT NULL,
+    shard SMALLINT NOT NULL,
+    responses BIGINT NOT NULL DEFAULT 0,
+    checkbox_weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+    other_responses BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (question_code, option_select, shard)
+);
@@ -0,0 +1,13 @@
+-- Idempotency keys for /api/vote, /api/checkbox_vote and /api/other
+-- Each key is a 16-byte hash of (endpoint, user_uuid, client key), so the
+-- primary key index stays compact no matter how long client keys are.
+
+CREATE TABLE IF NOT EXISTS vote_idempotency_keys (
+    key_hash UUID PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Keys only need to outlive client retries. The API prunes keys older than
+-- IDEMPOTENCY_KEY_RETENTION_DAYS every IDEMPOTENCY_PRUNE_INTERVAL seconds,
+-- walking this index.
+CREATE INDEX IF NOT EXISTS idx_vote_idempotency_keys_created ON vote_idempotency_keys(created_at);
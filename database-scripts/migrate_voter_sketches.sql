@@ -0,0 +1,14 @@
+-- Distinct-voter HyperLogLog sketches behind the /voters endpoints
+-- One row per (scope, scope_key, UTC day): scope is 'question', 'block' or
+-- 'category'. The API flushes its in-memory sketches every
+-- VOTER_SKETCH_FLUSH_INTERVAL seconds; backend/backfill_voter_sketches.py
+-- adds the votes cast before this migration.
+
+CREATE TABLE IF NOT EXISTS voter_sketches (
+    scope VARCHAR(10) NOT NULL,
+    scope_key VARCHAR(50) NOT NULL,
+    bucket DATE NOT NULL,
+    registers BYTEA NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (scope, scope_key, bucket)
+);
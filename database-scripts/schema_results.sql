@@ -3,6 +3,33 @@
 -- These tables are denormalized and self-sufficient for data analysis
 
 -- Drop tables if they exist (in reverse dependency order)
+DROP MATERIALIZED VIEW IF EXISTS results_mv;
+-- In compact storage mode the response tables are views over fact tables
+DO $$
+DECLARE
+    view_name TEXT;
+BEGIN
+    FOREACH view_name IN ARRAY ARRAY['other_responses', 'checkbox_responses', 'responses'] LOOP
+        IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = current_schema() AND viewname = view_name) THEN
+            EXECUTE format('DROP VIEW %I', view_name);
+        END IF;
+    END LOOP;
+END $$;
+DROP TABLE IF EXISTS other_response_facts CASCADE;
+DROP TABLE IF EXISTS checkbox_response_facts CASCADE;
+DROP TABLE IF EXISTS response_facts CASCADE;
+DROP TABLE IF EXISTS response_options CASCADE;
+DROP TABLE IF EXISTS response_questions CASCADE;
+DROP TABLE IF EXISTS other_responses_wide CASCADE;
+DROP TABLE IF EXISTS checkbox_responses_wide CASCADE;
+DROP TABLE IF EXISTS responses_wide CASCADE;
+DROP TABLE IF EXISTS trending_snapshots CASCADE;
+DROP TABLE IF EXISTS voter_sketches CASCADE;
+DROP TABLE IF EXISTS vote_counters CASCADE;
+DROP TABLE IF EXISTS cache_versions CASCADE;
+DROP TABLE IF EXISTS user_progress CASCADE;
+DROP TABLE IF EXISTS question_bits CASCADE;
+DROP TABLE IF EXISTS vote_idempotency_keys CASCADE;
 DROP TABLE IF EXISTS other_responses CASCADE;
 DROP TABLE IF EXISTS checkbox_responses CASCADE;
 DROP TABLE IF EXISTS responses CASCADE;
@@ -11,8 +38,9 @@ DROP TABLE IF EXISTS users CASCADE;
 -- Create users table
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
-    user_uuid TEXT UNIQUE NOT NULL,
-    year_of_birth INTEGER NOT NULL CHECK (year_of_birth >= 1900 AND year_of_birth <= 2024),
+    user_uuid UUID UNIQUE NOT NULL,
+    -- NULL until /api/users fills it in for users created lazily by a vote
+    year_of_birth INTEGER CHECK (year_of_birth >= 1900 AND year_of_birth <= 2024),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -21,7 +49,7 @@ CREATE TABLE responses (
     id SERIAL PRIMARY KEY,
     
     -- Response data
-    user_uuid TEXT NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    user_uuid UUID NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
     
     -- Question data (denormalized)
     question_code VARCHAR(50) NOT NULL,
@@ -55,7 +83,7 @@ CREATE TABLE checkbox_responses (
     id SERIAL PRIMARY KEY,
     
     -- Response data
-    user_uuid TEXT NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    user_uuid UUID NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
     
     -- Question data (denormalized)
     question_code VARCHAR(50) NOT NULL,
@@ -93,7 +121,7 @@ CREATE TABLE other_responses (
     id SERIAL PRIMARY KEY,
     
     -- Response data
-    user_uuid TEXT NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    user_uuid UUID NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
     
     -- Question data (denormalized)
     question_code VARCHAR(50) NOT NULL,
@@ -118,6 +146,155 @@ CREATE TABLE other_responses (
     setup_question_code VARCHAR(50)
 );
 
+-- Create vote_idempotency_keys table to drop retried vote submissions
+-- (16-byte hash of endpoint, user_uuid and the client's idempotency key)
+CREATE TABLE vote_idempotency_keys (
+    key_hash UUID PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+-- Keys older than the retention period are pruned by the API
+CREATE INDEX idx_vote_idempotency_keys_created ON vote_idempotency_keys(created_at);
+
+-- Create question_bits table: the user_progress bit of every question_code.
+-- Only ever appended to (the API assigns bits when it loads the catalog), so
+-- a code keeps its bit when /api/setup renumbers the questions table
+CREATE TABLE question_bits (
+    question_code VARCHAR(50) PRIMARY KEY,
+    bit SERIAL UNIQUE
+);
+
+-- Create user_progress table: one bitmap per user, bit n set once the user
+-- has answered the question that question_bits maps to n
+CREATE TABLE user_progress (
+    user_uuid UUID PRIMARY KEY REFERENCES users(user_uuid) ON DELETE CASCADE,
+    answered BYTEA NOT NULL DEFAULT '',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create cache_versions table: shared version counters for in-process caches,
+-- bumped alongside NOTIFY and polled by each instance as a fallback
+CREATE TABLE cache_versions (
+    name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO cache_versions (name, version) VALUES ('catalog', 1);
+
+-- Create vote_counters table: per question/option tallies split across
+-- shards so concurrent votes never queue on one row (shard 0 holds
+-- compacted totals; writes use shards 1..N), and by the voter's
+-- year_of_birth (0 = unknown) for the by_age results endpoints
+CREATE TABLE vote_counters (
+    question_code VARCHAR(50) NOT NULL,
+    option_select VARCHAR(10) NOT NULL,
+    year_of_birth SMALLINT NOT NULL DEFAULT 0,
+    shard SMALLINT NOT NULL,
+    responses BIGINT NOT NULL DEFAULT 0,
+    checkbox_weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+    other_responses BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (question_code, option_select, year_of_birth, shard)
+);
+
+-- Create voter_sketches table: zlib-compressed HyperLogLog registers of the
+-- distinct voters per question, block or category and UTC day
+CREATE TABLE voter_sketches (
+    scope VARCHAR(10) NOT NULL,
+    scope_key VARCHAR(50) NOT NULL,
+    bucket DATE NOT NULL,
+    registers BYTEA NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (scope, scope_key, bucket)
+);
+
+-- Create trending_snapshots table: each API instance's recent votes per
+-- question and window (1m, 15m, 1h), replaced every snapshot interval so
+-- instances can merge each other's counts for /api/trending
+CREATE TABLE trending_snapshots (
+    instance_id VARCHAR(100) NOT NULL,
+    window_name VARCHAR(10) NOT NULL,
+    question_code VARCHAR(50) NOT NULL,
+    votes BIGINT NOT NULL,
+    taken_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instance_id, window_name, question_code)
+);
+
+-- Compact storage (STORAGE_MODE=compact): results-side question and option
+-- dimensions, and narrow fact tables that reference them. Nothing writes
+-- here until backend/migrate_compact_storage.py swaps the views in.
+CREATE TABLE response_questions (
+    id SERIAL PRIMARY KEY,
+    question_code VARCHAR(50) UNIQUE NOT NULL,
+    question_text TEXT NOT NULL,
+    question_number INTEGER,
+    category_id INTEGER,
+    category_name VARCHAR(100) NOT NULL,
+    category_text TEXT,
+    block_number INTEGER
+);
+
+CREATE TABLE response_options (
+    id SERIAL PRIMARY KEY,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    option_select VARCHAR(10) NOT NULL,
+    option_code VARCHAR(50) NOT NULL,
+    option_text TEXT NOT NULL,
+    UNIQUE (question_id, option_select)
+);
+
+CREATE TABLE response_facts (
+    id SERIAL PRIMARY KEY,
+    user_uuid UUID NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    option_id INTEGER NOT NULL REFERENCES response_options(id),
+    block_number SMALLINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE checkbox_response_facts (
+    id SERIAL PRIMARY KEY,
+    user_uuid UUID NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    option_id INTEGER NOT NULL REFERENCES response_options(id),
+    block_number SMALLINT,
+    weight REAL DEFAULT 1.0,
+    -- The user's own text for a checked OTHER box, NULL otherwise
+    other_text TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE other_response_facts (
+    id SERIAL PRIMARY KEY,
+    user_uuid UUID NOT NULL REFERENCES users(user_uuid) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES response_questions(id),
+    block_number SMALLINT,
+    other_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create results_mv materialized view: merged tallies per question/option
+-- (single-choice counts + checkbox weights; free-text answers count as OTHER
+-- only when no single-choice or checkbox vote picked OTHER)
+CREATE MATERIALIZED VIEW results_mv AS
+SELECT question_code, option_select,
+       CASE WHEN bool_or(source <> 'other')
+            THEN SUM(votes) FILTER (WHERE source <> 'other')
+            ELSE SUM(votes)
+       END AS count
+FROM (
+    SELECT question_code, option_select, 'single' AS source, COUNT(*)::float8 AS votes
+    FROM responses GROUP BY question_code, option_select
+    UNION ALL
+    SELECT question_code, option_select, 'checkbox', SUM(weight)::float8
+    FROM checkbox_responses GROUP BY question_code, option_select
+    UNION ALL
+    SELECT question_code, 'OTHER', 'other', COUNT(*)::float8
+    FROM other_responses GROUP BY question_code
+) tallies
+GROUP BY question_code, option_select;
+
+-- REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX idx_results_mv_key ON results_mv(question_code, option_select);
+
 -- Create indexes for better performance
 CREATE INDEX idx_responses_user ON responses(user_uuid);
 CREATE INDEX idx_responses_question ON responses(question_code);
@@ -134,6 +311,18 @@ CREATE INDEX idx_other_responses_question ON other_responses(question_code);
 CREATE INDEX idx_other_responses_category ON other_responses(category_name);
 CREATE INDEX idx_other_responses_created ON other_responses(created_at);
 
+CREATE INDEX idx_response_facts_question ON response_facts(question_id, option_id);
+CREATE INDEX idx_response_facts_user ON response_facts(user_uuid);
+CREATE INDEX idx_response_facts_created ON response_facts(created_at);
+
+CREATE INDEX idx_checkbox_response_facts_question ON checkbox_response_facts(question_id, option_id);
+CREATE INDEX idx_checkbox_response_facts_user ON checkbox_response_facts(user_uuid);
+CREATE INDEX idx_checkbox_response_facts_created ON checkbox_response_facts(created_at);
+
+CREATE INDEX idx_other_response_facts_question ON other_response_facts(question_id);
+CREATE INDEX idx_other_response_facts_user ON other_response_facts(user_uuid);
+CREATE INDEX idx_other_response_facts_created ON other_response_facts(created_at);
+
 CREATE INDEX idx_users_uuid ON users(user_uuid);
 CREATE INDEX idx_users_year ON users(year_of_birth);
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import axios from 'axios'
 import OptionsList from './OptionsList.jsx'
@@ -214,6 +214,13 @@ const Question = ({ question, onAnswered }) => {
   const [expandedPlaylist, setExpandedPlaylist] = useState(false)
   const navigate = useNavigate()
 
+  // Idempotency key for the current answer: double taps and retries reuse it,
+  // so the backend records the vote only once. A fresh key is made after each recorded vote.
+  const newVoteKey = () => (window.crypto && window.crypto.randomUUID)
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(16).slice(2)}`
+  const voteKeyRef = useRef(newVoteKey())
+
   useEffect(() => {
     console.log('Question useEffect triggered for:', question.question_code)
     fetchOptions()
@@ -247,6 +254,29 @@ const Question = ({ question, onAnswered }) => {
     return () => clearInterval(interval)
   }, [question.question_code, votingOnCooldown])
 
+  // Keep the results chart live once it is shown: the server pushes a snapshot,
+  // then only the options whose counts changed
+  useEffect(() => {
+    if (!showResults || !window.EventSource) return
+
+    const source = new EventSource(`${API_BASE}/api/results/${question.question_code}/stream`)
+    source.addEventListener('snapshot', (event) => {
+      setResults(JSON.parse(event.data))
+    })
+    source.addEventListener('update', (event) => {
+      const { changed } = JSON.parse(event.data)
+      setResults(prev => {
+        if (!prev) return prev
+        const counts = new Map(prev.results.map(r => [r.option_select, r]))
+        changed.forEach(r => counts.set(r.option_select, { ...counts.get(r.option_select), ...r }))
+        const merged = Array.from(counts.values()).sort((a, b) => a.option_select.localeCompare(b.option_select))
+        return { ...prev, results: merged }
+      })
+    })
+
+    return () => source.close()
+  }, [showResults, question.question_code])
+
   const fetchOptions = async () => {
     try {
       setLoading(true)
@@ -290,12 +320,14 @@ const Question = ({ question, onAnswered }) => {
       const voteData = {
         question_code: question.question_code,
         option_select: optionSelect,
-        user_uuid: userUuid
+        user_uuid: userUuid,
+        idempotency_key: voteKeyRef.current
       }
       console.log('Submitting vote data:', voteData)
 
       // Submit vote
       await axios.post(`${API_BASE}/api/vote`, voteData)
+      voteKeyRef.current = newVoteKey()
 
       // Get results
       const resultsResponse = await axios.get(`${API_BASE}/api/results/${question.question_code}`)
@@ -361,7 +393,8 @@ const Question = ({ question, onAnswered }) => {
         await axios.post(`${API_BASE}/api/checkbox_vote`, {
           question_code: question.question_code,
           option_selects: checkboxOptions,
-          user_uuid: userUuid
+          user_uuid: userUuid,
+          idempotency_key: voteKeyRef.current
         })
       }
 
@@ -371,9 +404,11 @@ const Question = ({ question, onAnswered }) => {
           question_code: question.question_code,
           question_text: question.question_text,
           other_text: otherText,
-          user_uuid: userUuid
+          user_uuid: userUuid,
+          idempotency_key: voteKeyRef.current
         })
       }
+      voteKeyRef.current = newVoteKey()
 
       // Get results
       const resultsResponse = await axios.get(`${API_BASE}/api/results/${question.question_code}`)
@@ -437,8 +472,10 @@ const Question = ({ question, onAnswered }) => {
         question_code: question.question_code,
         question_text: question.question_text,
         other_text: otherText,
-        user_uuid: userUuid
+        user_uuid: userUuid,
+        idempotency_key: voteKeyRef.current
       })
+      voteKeyRef.current = newVoteKey()
 
       // Get results after submitting
       const resultsResponse = await axios.get(`${API_BASE}/api/results/${question.question_code}`)
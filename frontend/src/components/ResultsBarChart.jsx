@@ -20,8 +20,8 @@ const ResultsBarChart = ({ results, questionText, options = [] }) => {
     return genericTexts[option] || `Option ${option}`
   }
 
-  // Safety check - if no results, show empty state
-  if (!results || !results.results || results.results.length === 0) {
+  // Safety check - if no results (or only zero-vote options), show empty state
+  if (!results || !results.results || results.results.every(item => !parseFloat(item.count))) {
     return (
       <div style={styles.container}>
         <div style={styles.emptyState}>
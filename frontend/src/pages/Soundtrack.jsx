@@ -90,9 +90,20 @@ const Soundtrack = () => {
     loadSoundtracks()
   }, [searchParams])
 
-  const filteredSongs = selectedPlaylist === 'All Songs' 
-    ? soundtracks 
-    : soundtracks.filter(song => song.playlist.includes(selectedPlaylist))
+  // Playlist filtering is served by the backend playlist index
+  const [filteredSongs, setFilteredSongs] = useState([])
+
+  useEffect(() => {
+    if (selectedPlaylist === 'All Songs') {
+      setFilteredSongs(soundtracks)
+      return
+    }
+    let cancelled = false
+    soundtrackService.fetchSongs({ playlist: selectedPlaylist }).then(songs => {
+      if (!cancelled) setFilteredSongs(songs)
+    })
+    return () => { cancelled = true }
+  }, [selectedPlaylist, soundtracks])
 
 
 
@@ -21,16 +21,7 @@ class SoundtrackService {
       console.log('Loaded soundtracks from API:', data.soundtracks.length)
       
       // Transform the data to match our component's format
-      this.soundtracks = data.soundtracks.map(song => ({
-        id: song.song_id,
-        title: song.song_title,
-        mood: song.mood_tag,
-        playlist: song.playlist_tag,
-        lyrics: song.lyrics_snippet,
-        featured: song.featured,
-        featuredOrder: song.featured_order || 0,
-        fileUrl: song.file_url
-      }))
+      this.soundtracks = data.soundtracks.map(song => this.toSong(song))
       
       // Load playlists from API
       await this.loadPlaylists()
@@ -44,6 +35,44 @@ class SoundtrackService {
     }
   }
   
+  // Map an API soundtrack row to our component's format
+  toSong(song) {
+    return {
+      id: song.song_id,
+      title: song.song_title,
+      mood: song.mood_tag,
+      playlist: song.playlist_tag,
+      lyrics: song.lyrics_snippet,
+      featured: song.featured,
+      featuredOrder: song.featured_order || 0,
+      fileUrl: song.file_url
+    }
+  }
+
+  // Fetch songs filtered by playlist and/or mood from the backend index
+  async fetchSongs({ playlist, mood } = {}) {
+    const params = new URLSearchParams()
+    if (playlist && playlist !== 'All Songs') params.set('playlist', playlist)
+    if (mood) params.set('mood', mood)
+    try {
+      const query = params.toString()
+      const response = await fetch(`${API_BASE}/api/soundtracks${query ? `?${query}` : ''}`)
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+      const data = await response.json()
+      return data.soundtracks.map(song => this.toSong(song))
+    } catch (error) {
+      console.error('Error fetching filtered soundtracks from API:', error)
+      // Fallback to filtering what we already have
+      let songs = this.getSongsByPlaylist(playlist || 'All Songs')
+      if (mood) {
+        songs = songs.filter(song => song.mood && song.mood.toLowerCase().includes(mood.toLowerCase()))
+      }
+      return songs
+    }
+  }
+
   // Load playlists from backend API
   async loadPlaylists() {
     try {